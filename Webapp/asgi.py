@@ -0,0 +1,365 @@
+# Webapp/asgi.py
+"""
+Mode asynchrone (ASGI) du serveur web : mêmes routes que app.py, mêmes états de
+partie et même logique (game_logic.py), servis par une boucle asyncio. Ce module
+n'importe pas app.py : pas de pool psycopg2 ni de tables créées à l'import.
+
+- base : psycopg 3 asynchrone (db/aio.py), la boucle n'attend jamais une requête SQL ;
+- IA : best_ai_col tourne dans un pool de threads (AI_THREADS), les recherches
+  profondes partent dans les processus d'EnginePool (AI_WORKERS) : une recherche
+  "hard" ne bloque plus /api/play ni /api/state des autres parties ;
+- un verrou asyncio par partie sérialise les coups d'une même partie ;
+- /api/events : flux SSE sans thread par abonné.
+
+    pip install starlette uvicorn "psycopg[binary]" psycopg-pool
+    python Webapp/asgi.py                        # ou : uvicorn asgi:app --app-dir Webapp
+Un seul processus (les parties sont en mémoire).
+"""
+import asyncio
+import os
+import sys
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(HERE)
+import game_logic as web  # noqa: E402  (états et logique de jeu partagés avec app.py, sans effet de bord)
+from db import aio  # noqa: E402
+from db.compact import DDL_PARTIE_COUPS, LOAD_COMPACT_SQL, STORAGE, compact_from_row  # noqa: E402
+from db.db import DDL_SITUATION_PLY, SITUATION_LINKS, configure_pool  # noqa: E402
+from db.journal import MoveJournal  # noqa: E402
+from event_hub import AsyncSubscriber, format_event  # noqa: E402
+
+# threads qui lancent les recherches IA (chacune verrouille le moteur de sa partie)
+AI_THREADS = int(os.getenv("AI_THREADS", "4"))
+
+# écriture différée des coups (MOVE_JOURNAL=chemin du journal), ouverte au démarrage
+MOVE_JOURNAL = os.getenv("MOVE_JOURNAL")
+
+ai_executor = ThreadPoolExecutor(max_workers=AI_THREADS, thread_name_prefix="ai")
+# parties en mémoire, abonnés /api/events et moteurs IA par partie
+server = web.make_server()
+# verrou gardé tant qu'une requête l'utilise : les parties évincées ne laissent rien ici
+_game_locks = weakref.WeakValueDictionary()
+
+
+def game_lock(game_id):
+    lock = _game_locks.get(game_id)
+    if lock is None:
+        lock = _game_locks[game_id] = asyncio.Lock()
+    return lock
+
+
+def error(msg, status=400):
+    return JSONResponse({"error": msg}, status_code=status)
+
+
+async def read_json(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+async def run_ai(*args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(ai_executor, server.best_ai_col, *args)
+
+
+# =======================
+# ÉTAT DES PARTIES / BASE
+# =======================
+async def get_game_state(game_id):
+    game_id = web.normalize_game_id(game_id)
+    if game_id is None:
+        return None
+
+    game = server.games.get(game_id)
+    if game is not None:
+        return game
+
+    game = await load_game_from_db(game_id)
+    if game is not None:
+        # une autre requête a pu charger la partie pendant l'attente
+        game = server.games.put(game_id, game, loaded=True)
+    return game
+
+
+async def load_game_from_db(game_id):
+    if server.move_journal is not None:
+        # les derniers coups peuvent encore être dans la file
+        await asyncio.to_thread(server.move_journal.flush, 5)
+
+    partie = await aio.q_one(web.PARTIE_SQL, (game_id,))
+    if not partie:
+        return None
+
+    compact = compact_from_row(await aio.q_one(LOAD_COMPACT_SQL, (game_id,)))
+    last_sit = None
+    if compact is None:
+        last_sit = await aio.q_one(web.LAST_SITUATION_SQL, (game_id,))
+    return web.state_from_rows(partie, last_sit, compact)
+
+
+async def register_client(game, client_id):
+    if server.register_client(game, client_id):
+        # place enregistrée : elle est reprise si la partie est évincée puis rechargée
+        await aio.q_one(web.SEATS_SQL, web.seats_params(game))
+
+
+async def store_move(s, record):
+    finish = record["finish"]
+    if server.move_journal is not None:
+        # écriture différée : append ne fait qu'écrire une ligne de journal
+        server.journal_move(s, record)
+    elif STORAGE == "compact":
+        await aio.commit_move_compact(s["id_partie"], record["numero"], record["col"], record["joueur"],
+                                      record["plateau"], web.ROWS, web.COLS,
+                                      signature=record["signature"], **finish)
+        s["last_situation_id"] = None
+    else:
+        s["last_situation_id"] = await aio.commit_move(
+            s["id_partie"], record["numero"], record["plateau"], record["joueur"],
+            precedent=s["last_situation_id"], signature=record["signature"], **finish,
+        )
+
+
+# =======================
+# ROUTES
+# =======================
+async def home(request):
+    return FileResponse(os.path.join(HERE, "templates", "index.html"))
+
+
+async def api_state(request):
+    game_id = web.normalize_game_id(request.query_params.get("game_id"))
+    client_id = request.query_params.get("client_id")
+    since_version = web.normalize_game_id(request.query_params.get("since_version"))
+
+    if game_id is None:
+        return JSONResponse(web.make_empty_state())
+
+    game = await get_game_state(game_id)
+    if game is None:
+        return error("Partie introuvable", 404)
+
+    try:
+        await register_client(game, client_id)
+    except ValueError as e:
+        return error(str(e))
+
+    etag = f'"{web.state_etag(game)}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if since_version is not None and since_version == game["version"]:
+        return JSONResponse({"changed": False, "version": since_version})
+    if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(web.export_state(game), headers=headers)
+
+
+async def api_events(request):
+    game_id = web.normalize_game_id(request.query_params.get("game_id"))
+    client_id = request.query_params.get("client_id")
+
+    game = await get_game_state(game_id)
+    if game is None:
+        return error("Partie introuvable", 404)
+
+    sub = AsyncSubscriber(asyncio.get_running_loop(), server.events.max_queue)
+    server.events.subscribe(game_id, sub)
+    try:
+        await register_client(game, client_id)
+    except ValueError:
+        pass   # partie pleine : spectateur
+    first = format_event("state", web.export_state(game))
+
+    async def stream():
+        try:
+            yield first
+            while True:
+                msg = await sub.get(web.EVENTS_KEEPALIVE_S)
+                if msg is None:
+                    return
+                yield msg or ": keepalive\n\n"
+        finally:
+            server.events.unsubscribe(game_id, sub)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+async def api_new(request):
+    data = await read_json(request)
+
+    g = web.new_game_state(data)
+    if g["mode"] == "LOCAL":
+        return JSONResponse(g)
+
+    sig, params = web.create_partie_params(g)
+    row = await aio.q_one(web.CREATE_PARTIE_SQL, params)
+    server.start_game(g, int(row["id_partie"]), sig)
+    await register_client(g, data.get("client_id"))
+    return JSONResponse(web.export_state(g))
+
+
+async def api_play(request):
+    data = await read_json(request)
+    col = data.get("col")
+    client_id = data.get("client_id")
+    game_id = web.normalize_game_id(data.get("game_id"))
+
+    game = await get_game_state(game_id)
+    if game is None:
+        return error("Partie introuvable", 404)
+
+    try:
+        await register_client(game, client_id)
+    except ValueError as e:
+        return error(str(e))
+
+    s = game
+    if s["id_partie"] is None:
+        return error("Aucune partie. Clique sur Nouvelle partie.")
+
+    async with game_lock(game_id):
+        if s["game_over"]:
+            return JSONResponse(web.export_state(s))
+
+        msg = web.play_error(s, client_id)
+        if msg:
+            return error(msg)
+
+        try:
+            row, line, joueur, record = web.place_move(col, s)
+        except ValueError as e:
+            return error(str(e))
+
+        await store_move(s, record)
+        server.end_turn(s, row, col, line, joueur)
+        return JSONResponse(web.export_state(s))
+
+
+async def api_ai_move(request):
+    data = await read_json(request)
+    game_id = web.normalize_game_id(data.get("game_id"))
+
+    game = await get_game_state(game_id)
+    if game is None:
+        return error("Partie introuvable", 404)
+
+    s = game
+    if s["id_partie"] is None:
+        return error("Aucune partie")
+
+    async with game_lock(game_id):
+        if s["game_over"]:
+            return JSONResponse(web.export_state(s))
+
+        msg = web.ai_move_error(s)
+        if msg:
+            return error(msg)
+
+        ai_col = await run_ai(*web.ai_search_args(s))
+        if ai_col is None:
+            return error("Aucun coup IA possible")
+
+        row, line, joueur, record = web.place_move(ai_col, s)
+        await store_move(s, record)
+        server.end_turn(s, row, ai_col, line, joueur)
+        return JSONResponse(web.export_state(s))
+
+
+async def api_hint(request):
+    data = await read_json(request)
+    game_id = web.normalize_game_id(data.get("game_id"))
+
+    game = await get_game_state(game_id)
+    if game is None:
+        return error("Partie introuvable", 404)
+
+    s = game
+    if s.get("game_over"):
+        return error("Partie terminée")
+
+    col = await run_ai(*web.ai_search_args(s, player=s.get("current_player", "R")))
+    if col is None:
+        return error("Aucun coup possible")
+    return JSONResponse({"suggested_col": col, "openings": server.opening_stats(s)})
+
+
+async def api_stats(request):
+    return JSONResponse({"db_pool_async": aio.pool_stats(), **server.stats()})
+
+
+async def ensure_tables():
+    async with aio.connection() as conn:
+        await conn.execute(web.DDL_PARTIE)
+        await conn.execute(web.DDL_PARTIE_WEB)
+        await conn.execute(web.DDL_SITUATION)
+        await conn.execute(DDL_PARTIE_COUPS)
+        if SITUATION_LINKS == "ply":
+            # échoue si des situations sont en double (id_partie, numero_coup)
+            await conn.execute(DDL_SITUATION_PLY)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await startup()
+    try:
+        yield
+    finally:
+        await shutdown()
+
+
+async def startup():
+    await aio.open_pool(
+        minconn=int(os.getenv("PGPOOL_MIN", "2")),
+        maxconn=int(os.getenv("PGPOOL_MAX", "20")),
+    )
+    await ensure_tables()
+    if MOVE_JOURNAL:
+        # seul le thread d'écriture du journal utilise psycopg2
+        configure_pool(minconn=1, maxconn=2)
+        journal = MoveJournal(MOVE_JOURNAL, storage=STORAGE, rows=web.ROWS, cols=web.COLS)
+        replayed = await asyncio.to_thread(journal.start)
+        if replayed:
+            print(f"Journal : {replayed} coups non enregistrés repris")
+        server.move_journal = journal
+
+
+async def shutdown():
+    if server.move_journal is not None:
+        await asyncio.to_thread(server.move_journal.close)
+    await aio.close_pool()
+    ai_executor.shutdown(wait=False, cancel_futures=True)
+    server.ai_pool.shutdown()
+
+
+app = Starlette(
+    routes=[
+        Route("/", home),
+        Route("/api/state", api_state),
+        Route("/api/events", api_events),
+        Route("/api/new", api_new, methods=["POST"]),
+        Route("/api/play", api_play, methods=["POST"]),
+        Route("/api/ai_move", api_ai_move, methods=["POST"]),
+        Route("/api/hint", api_hint, methods=["POST"]),
+        Route("/api/stats", api_stats),
+        Mount("/static", StaticFiles(directory=os.path.join(HERE, "static")), name="static"),
+    ],
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    port = int(os.environ.get("PORT", 5000))
+    uvicorn.run(app, host="0.0.0.0", port=port, workers=1)
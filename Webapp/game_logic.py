@@ -0,0 +1,777 @@
+# Webapp/game_logic.py
+"""
+États de partie et logique de jeu du serveur web, partagés par app.py (Flask) et
+asgi.py (Starlette).
+
+Aucun effet de bord à l'import : ni pool de connexions, ni table créée, ni moteur
+IA, ni journal. Chaque serveur crée ses ressources (GameServer) et garde son
+propre accès à la base.
+
+    server = make_server(move_journal=None)
+    g = new_game_state({"mode": "IA", "difficulty": "hard"})
+    server.start_game(g, id_partie, signature)
+    row, line, joueur, record = place_move(col, g)   # record : à écrire en base
+    server.end_turn(g, row, col, line, joueur)
+"""
+import ast
+import os
+import random
+import sys
+import time
+import uuid
+
+# ai.py dans le dossier parent
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from engine_pool import EnginePool  # noqa: E402
+from event_hub import EventHub  # noqa: E402
+from game_store import GameStore  # noqa: E402
+from opening_book import DEFAULT_PATH as OPENING_BOOK_PATH, load_book  # noqa: E402
+from signature_index import DEFAULT_PATH as SIGNATURE_INDEX_PATH, load_index  # noqa: E402
+
+# =======================
+# CONFIG
+# =======================
+ROWS = 9
+COLS = 9
+CONFIANCE_WEB = 2
+
+# profondeur max de l'approfondissement itératif ...
+DIFF_TO_DEPTH = {
+    "easy": 2,
+    "medium": 4,
+    "hard": 12
+}
+
+# ... et budget de temps (ms) par coup : la latence de /api/ai_move ne dépend plus du plateau
+DIFF_TO_TIME_MS = {
+    "easy": 150,
+    "medium": 400,
+    "hard": 1500
+}
+DEFAULT_AI_TIME_MS = 400
+
+# table de transposition (Mo) de chaque partie active, fixe pour toute la vie du serveur
+AI_TT_MB = int(os.getenv("AI_TT_MB", "8"))
+
+# parties dont le moteur (et sa table) reste en mémoire ; au-delà, la moins récente est évincée
+AI_MAX_GAMES = int(os.getenv("AI_MAX_GAMES", "16"))
+
+# une partie sans appel à l'IA depuis ce délai (s) libère son moteur
+AI_IDLE_S = int(os.getenv("AI_IDLE_S", "900"))
+
+# processus de recherche pour les profondeurs >= 6 (0 = nombre de coeurs, 1 = pas de parallélisme)
+AI_WORKERS = int(os.getenv("AI_WORKERS", "0")) or None
+
+# livre d'ouvertures (python opening_book.py) : premiers coups joués sans recherche
+OPENING_BOOK = os.getenv("OPENING_BOOK", str(OPENING_BOOK_PATH))
+
+# explorateur d'ouvertures (python signature_index.py) : parties en base par coup suivant
+SIGNATURE_INDEX = os.getenv("SIGNATURE_INDEX", str(SIGNATURE_INDEX_PATH))
+
+# parties en mémoire : au plus GAMES_MAX (terminées évincées d'abord), une partie sans
+# requête depuis GAMES_IDLE_S (s) est évincée ; une partie évincée est relue en base
+GAMES_MAX = int(os.getenv("GAMES_MAX", "1000"))
+GAMES_IDLE_S = int(os.getenv("GAMES_IDLE_S", "3600"))
+
+# commentaire SSE envoyé sans évènement pendant ce délai (s), pour garder la connexion ouverte
+EVENTS_KEEPALIVE_S = 15
+
+
+# =======================
+# ÉTATS
+# =======================
+def make_empty_state():
+    """Etat vide renvoyé quand aucune partie serveur n'est ciblée."""
+    return {
+        "id_partie": None,
+        "mode": "LOCAL",
+        "type_partie": "HUMAIN",
+        "status": "Aucune partie",
+        "ai_enabled": False,
+        "ai_depth": 0,
+        "board": [[0 for _ in range(COLS)] for _ in range(ROWS)],
+        "current_player": "R",
+        "game_over": False,
+        "starting_player": "R",
+        "ai_player": None,
+        "signature": "init",
+        "last_situation_id": None,
+        "winning_line": None,
+        "version": 0,
+        "player_count": 0,
+        "client_r": None,
+        "client_j": None,
+
+        "player_r_name": "Joueur Rouge",
+        "player_j_name": "Joueur Jaune",
+    }
+
+
+def make_fresh_state():
+    """Nouvel état de partie côté serveur."""
+    return {
+        "id_partie": None,
+        "mode": "WEB",              # WEB pour serveur
+        "type_partie": "IA",        # IA ou HUMAIN
+        "status": "Aucune partie",
+
+        "ai_enabled": True,
+        "ai_depth": 4,
+        "ai_time_ms": DEFAULT_AI_TIME_MS,
+
+        "board": [[0 for _ in range(COLS)] for _ in range(ROWS)],
+        "current_player": "R",
+        "game_over": False,
+        "starting_player": "R",
+        "ai_player": "J",
+
+        "signature": "init",
+        "move_count": 0,
+        "last_situation_id": None,
+        "winning_line": None,
+
+        # incrémentée à chaque changement visible (ETag de /api/state) ; part de l'heure de
+        # création pour ne pas reprendre une valeur déjà vue si la partie est rechargée
+        "version": time.time_ns() // 1_000_000,
+
+        "client_ids": [],
+        "client_r": None,
+        "client_j": None,
+
+        "player_r_name": "Joueur Rouge",
+        "player_j_name": "Joueur Jaune",
+    }
+
+def bump_version(game):
+    game["version"] = game.get("version", 0) + 1
+
+
+def state_etag(game):
+    return f'{game["id_partie"]}-{game["version"]}'
+
+
+def next_turn(s):
+    s["current_player"] = "J" if s["current_player"] == "R" else "R"
+    bump_version(s)
+
+
+def normalize_game_id(game_id):
+    if game_id is None:
+        return None
+    try:
+        return int(game_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def export_state(game):
+    if game is None:
+        return make_empty_state()
+
+    g = dict(game)
+    clients = list(g.pop("client_ids", []))
+    g["player_count"] = len(clients)
+    return g
+
+
+def new_game_state(data):
+    """
+    État d'une nouvelle partie demandée par /api/new (pas encore en base).
+    """
+    mode = str(data.get("mode") or "IA").upper()           # IA / LOCAL / ONLINE
+    diff = str(data.get("difficulty") or "medium").lower()
+    starting_player = str(data.get("starting_player") or "R").upper()
+
+    # nouveaux noms envoyés par le front
+    player_r_name = str(data.get("player_r_name") or "Joueur Rouge").strip()
+    player_j_name = str(data.get("player_j_name") or "Joueur Jaune").strip()
+
+    if mode == "ONLINE":
+        starting_player = random.choice(["R", "J"])
+
+    # -------------------------
+    # MODE LOCAL
+    # -------------------------
+    if mode == "LOCAL":
+        g = make_empty_state()
+        g["mode"] = "LOCAL"
+        g["type_partie"] = "HUMAIN"
+        g["status"] = "EN_COURS"
+        g["current_player"] = starting_player if starting_player in ("R", "J") else "R"
+        g["starting_player"] = g["current_player"]
+
+        g["player_r_name"] = player_r_name or "Joueur Rouge"
+        g["player_j_name"] = player_j_name or "Joueur Jaune"
+
+        return g
+
+    # -------------------------
+    # MODE SERVEUR
+    # -------------------------
+    g = make_fresh_state()
+
+    g["mode"] = "WEB"
+    g["type_partie"] = "IA" if mode == "IA" else "HUMAIN"
+
+    g["ai_enabled"] = (mode == "IA")
+    g["ai_depth"] = DIFF_TO_DEPTH.get(diff, 4)
+    g["ai_time_ms"] = DIFF_TO_TIME_MS.get(diff, DEFAULT_AI_TIME_MS)
+
+    g["current_player"] = starting_player if starting_player in ("R", "J") else "R"
+    g["starting_player"] = g["current_player"]
+
+    # stockage des noms
+    g["player_r_name"] = player_r_name or "Joueur Rouge"
+    g["player_j_name"] = player_j_name or "Joueur Jaune"
+
+    # gestion IA
+    if g["ai_enabled"]:
+        g["ai_player"] = "J" if g["current_player"] == "R" else "R"
+
+        if g["ai_player"] == "R":
+            g["player_r_name"] = "IA"
+        else:
+            g["player_j_name"] = "IA"
+    else:
+        g["ai_player"] = None
+
+    return g
+
+
+# =======================
+# BASE (requêtes partagées, sans connexion)
+# =======================
+DDL_PARTIE = """
+CREATE TABLE IF NOT EXISTS partie (
+    id_partie SERIAL PRIMARY KEY,
+    mode TEXT,
+    type_partie TEXT,
+    status TEXT,
+    joueur_depart TEXT,
+    signature TEXT UNIQUE,
+    rows INTEGER,
+    cols INTEGER,
+    nb_colonnes INTEGER,
+    confiance INTEGER,
+    joueur_gagnant TEXT,
+    ligne_gagnante TEXT
+);
+"""
+
+DDL_SITUATION = """
+CREATE TABLE IF NOT EXISTS situation (
+    id_situation SERIAL PRIMARY KEY,
+    id_partie INTEGER REFERENCES partie(id_partie),
+    numero_coup INTEGER,
+    plateau TEXT,
+    joueur TEXT,
+    precedent INTEGER,
+    suivant INTEGER
+);
+"""
+
+# réglages d'une partie web relus quand elle est rechargée (difficulté, places des joueurs)
+DDL_PARTIE_WEB = """
+ALTER TABLE partie
+    ADD COLUMN IF NOT EXISTS ai_depth INTEGER,
+    ADD COLUMN IF NOT EXISTS ai_time_ms INTEGER,
+    ADD COLUMN IF NOT EXISTS client_r TEXT,
+    ADD COLUMN IF NOT EXISTS client_j TEXT;
+"""
+
+PARTIE_SQL = "SELECT * FROM partie WHERE id_partie=%s"
+
+# dernière situation (numero_coup le plus grand) et plateaux de tous les coups, pour
+# refaire la signature si celle de la partie est en retard (collision UNIQUE au coup)
+LAST_SITUATION_SQL = """
+SELECT s.*, p.plateaux
+FROM situation s,
+     LATERAL (SELECT array_agg(plateau ORDER BY numero_coup) AS plateaux
+              FROM situation WHERE id_partie = s.id_partie) p
+WHERE s.id_partie=%s
+ORDER BY s.numero_coup DESC, s.id_situation DESC
+LIMIT 1
+"""
+
+CREATE_PARTIE_SQL = """
+INSERT INTO partie (mode, type_partie, status, joueur_depart, signature, rows, cols, nb_colonnes, confiance,
+                    ai_depth, ai_time_ms)
+VALUES (%s::text, %s::text, %s::text, %s::text, %s::text, %s::integer, %s::integer, %s::integer, %s::integer,
+        %s::integer, %s::integer)
+RETURNING id_partie
+"""
+
+SEATS_SQL = """
+UPDATE partie SET client_r = %s::text, client_j = %s::text
+WHERE id_partie = %s::integer
+RETURNING id_partie
+"""
+
+
+def create_partie_params(g):
+    sig = f"init_{uuid.uuid4().hex[:12]}_{int(time.time() * 1000)}"
+    return sig, ("WEB", g["type_partie"], "EN_COURS", g["starting_player"], sig, ROWS, COLS, COLS,
+                 CONFIANCE_WEB, g.get("ai_depth"), g.get("ai_time_ms"))
+
+
+def seats_params(g):
+    return g.get("client_r"), g.get("client_j"), g["id_partie"]
+
+
+def board_to_text(board):
+    return "\n".join("".join(str(x) if x == 0 else x for x in row) for row in board)
+
+def text_to_board(plateau_text):
+    if not plateau_text:
+        return [[0 for _ in range(COLS)] for _ in range(ROWS)]
+
+    lines = plateau_text.strip().splitlines()
+    board = []
+
+    for line in lines:
+        row = []
+        for ch in line.strip():
+            if ch == "0":
+                row.append(0)
+            elif ch in ("R", "J"):
+                row.append(ch)
+            else:
+                row.append(0)
+        board.append(row)
+
+    # sécurité dimensions
+    while len(board) < ROWS:
+        board.append([0 for _ in range(COLS)])
+
+    board = board[:ROWS]
+    for i in range(len(board)):
+        if len(board[i]) < COLS:
+            board[i] += [0] * (COLS - len(board[i]))
+        board[i] = board[i][:COLS]
+
+    return board
+
+
+def signature_from_plateaux(plateaux):
+    """
+    Signature (colonnes 1..COLS) des plateaux texte successifs d'une partie, ou None
+    si deux plateaux consécutifs ne diffèrent pas d'exactement une case.
+    """
+    sig = []
+    prev = text_to_board("")
+    for plateau in plateaux:
+        board = text_to_board(plateau)
+        changed = [c for r in range(ROWS) for c in range(COLS) if board[r][c] != prev[r][c]]
+        if len(changed) != 1:
+            return None
+        sig.append(str(changed[0] + 1))
+        prev = board
+    return "".join(sig)
+
+
+def state_from_rows(partie, last_sit, compact):
+    """
+    État serveur d'une partie relue en base (ligne partie + dernière situation ou CompactGame).
+    Le nombre de coups vient des coups enregistrés, pas de partie.signature.
+    """
+    g = make_fresh_state()
+    g["id_partie"] = int(partie["id_partie"])
+    g["mode"] = "WEB"
+    g["type_partie"] = partie["type_partie"] or "HUMAIN"
+    g["status"] = partie["status"] or "EN_COURS"
+    g["starting_player"] = (partie["joueur_depart"] or "R").upper()
+    g["signature"] = partie["signature"] or "init"
+    g["winning_line"] = None
+    g["game_over"] = (g["status"] == "TERMINEE")
+
+    if g["type_partie"] == "IA":
+        g["ai_enabled"] = True
+        g["ai_depth"] = int(partie.get("ai_depth") or 4)
+        g["ai_time_ms"] = int(partie.get("ai_time_ms") or DEFAULT_AI_TIME_MS)
+        g["ai_player"] = "J" if g["starting_player"] == "R" else "R"
+    else:
+        g["ai_enabled"] = False
+        g["ai_depth"] = 0
+        g["ai_player"] = None
+
+    move_count = 0
+    if compact is not None:
+        g["board"] = compact.board_at(len(compact))
+        g["last_situation_id"] = None
+        move_count = len(compact)
+        if move_count:
+            g["signature"] = compact.coups
+    elif last_sit:
+        g["board"] = text_to_board(last_sit["plateau"])
+        g["last_situation_id"] = int(last_sit["id_situation"])
+        move_count = int(last_sit["numero_coup"] or 0)
+        if len(g["signature"]) != move_count or not g["signature"].isdigit():
+            g["signature"] = signature_from_plateaux(last_sit.get("plateaux") or []) or g["signature"]
+    else:
+        g["board"] = [[0 for _ in range(COLS)] for _ in range(ROWS)]
+        g["last_situation_id"] = None
+
+    if partie.get("ligne_gagnante"):
+        try:
+            g["winning_line"] = ast.literal_eval(partie["ligne_gagnante"])
+        except Exception:
+            g["winning_line"] = None
+
+    if g["game_over"]:
+        winner = partie.get("joueur_gagnant")
+        g["current_player"] = winner if winner in ("R", "J") else g["starting_player"]
+    else:
+        # si nb coups pair => c'est au joueur de départ
+        # sinon => à l'autre
+        if move_count % 2 == 0:
+            g["current_player"] = g["starting_player"]
+        else:
+            g["current_player"] = "J" if g["starting_player"] == "R" else "R"
+
+    g["move_count"] = move_count
+
+    # places des joueurs enregistrées par register_client : un 3e navigateur reste spectateur
+    g["client_r"] = partie.get("client_r")
+    g["client_j"] = partie.get("client_j")
+    g["client_ids"] = [c for c in (g["client_r"], g["client_j"]) if c]
+
+    return g
+
+
+# =======================
+# GAME LOGIC
+# =======================
+def check_win(board, r, c, player):
+    directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
+
+    for dr, dc in directions:
+        count = 1
+
+        rr, cc = r + dr, c + dc
+        while 0 <= rr < ROWS and 0 <= cc < COLS and board[rr][cc] == player:
+            count += 1
+            rr += dr
+            cc += dc
+
+        rr, cc = r - dr, c - dc
+        while 0 <= rr < ROWS and 0 <= cc < COLS and board[rr][cc] == player:
+            count += 1
+            rr -= dr
+            cc -= dc
+
+        if count >= 4:
+            return True
+
+    return False
+
+
+def valid_cols(board):
+    return [c for c in range(COLS) if board[0][c] == 0]
+
+
+def next_open_row(board, col):
+    for r in range(ROWS - 1, -1, -1):
+        if board[r][col] == 0:
+            return r
+    return None
+
+
+def immediate_win_or_block(board, player):
+    opponent = "J" if player == "R" else "R"
+    valid = valid_cols(board)
+
+    # gagner immédiatement
+    for col in valid:
+        r = next_open_row(board, col)
+        if r is None:
+            continue
+        board[r][col] = player
+        ok = check_win(board, r, col, player)
+        board[r][col] = 0
+        if ok:
+            return col
+
+    # bloquer l'adversaire
+    for col in valid:
+        r = next_open_row(board, col)
+        if r is None:
+            continue
+        board[r][col] = opponent
+        ok = check_win(board, r, col, opponent)
+        board[r][col] = 0
+        if ok:
+            return col
+
+    return None
+
+
+def find_winning_line(r, c, s):
+    directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
+    player = s["board"][r][c]
+
+    for dr, dc in directions:
+        coords = []
+        for i in range(-3, 4):
+            nr = r + dr * i
+            nc = c + dc * i
+
+            if 0 <= nr < ROWS and 0 <= nc < COLS and s["board"][nr][nc] == player:
+                coords.append((nr, nc))
+                if len(coords) == 4:
+                    return coords
+            else:
+                coords = []
+
+    return None
+
+
+def place_move(col, s):
+    """
+    Joue le coup dans l'état en mémoire. Retourne (ligne, ligne gagnante, joueur,
+    enregistrement à écrire en base avec store_move).
+    """
+    if col is None or not isinstance(col, int) or not (0 <= col < COLS):
+        raise ValueError("Colonne invalide")
+
+    placed_row = None
+
+    for r in range(ROWS - 1, -1, -1):
+        if s["board"][r][col] == 0:
+            s["board"][r][col] = s["current_player"]
+            placed_row = r
+            break
+
+    if placed_row is None:
+        raise ValueError("Colonne pleine")
+
+    if str(s["signature"]).startswith("init_"):
+        s["signature"] = ""
+
+    s["signature"] += str(col + 1)
+    s["move_count"] = numero = s.get("move_count", 0) + 1
+    bump_version(s)
+
+    plateau = board_to_text(s["board"])
+    joueur = s["current_player"]
+    line = find_winning_line(placed_row, col, s)
+
+    finish = {}
+    if line:
+        finish = dict(
+            status="TERMINEE",
+            joueur_gagnant=joueur,
+            ligne_gagnante=str([[r, c] for (r, c) in line]),
+        )
+    record = dict(numero=numero, col=col, plateau=plateau, joueur=joueur,
+                  signature=s["signature"], finish=finish)
+    return placed_row, line, joueur, record
+
+
+def play_error(s, client_id):
+    """
+    Message d'erreur si ce client ne peut pas jouer maintenant, sinon None.
+    """
+    # ONLINE HUMAIN : attendre les 2 joueurs
+    if s.get("mode") == "WEB" and s.get("type_partie") == "HUMAIN":
+        if len(s.get("client_ids", [])) < 2:
+            return "En attente d'un adversaire."
+
+    # contrôle du tour
+    if s.get("mode") == "WEB" and s.get("type_partie") == "HUMAIN" and client_id:
+        if s.get("client_r") == client_id and s["current_player"] == "J":
+            return "Ce n'est pas ton tour."
+
+        if s.get("client_j") == client_id and s["current_player"] == "R":
+            return "Ce n'est pas ton tour."
+
+        expected = s.get("client_r") if s["current_player"] == "R" else s.get("client_j")
+        if expected and client_id != expected:
+            return "Ce n'est pas ton tour."
+
+    # mode IA : interdit de jouer à la place de l'IA
+    if s.get("ai_enabled", False) and s["current_player"] == s.get("ai_player"):
+        return "C'est au tour de l'IA."
+    return None
+
+
+def ai_move_error(s):
+    if not s.get("ai_enabled", False):
+        return "IA désactivée"
+    if s["current_player"] != s.get("ai_player"):
+        return "Ce n'est pas au tour de l'IA"
+    return None
+
+
+def ai_search_args(s, player=None):
+    """
+    (game_id, copie du plateau, joueur, profondeur, budget ms) pour GameServer.best_ai_col.
+    """
+    depth = int(s.get("ai_depth", 4))
+    time_ms = int(s.get("ai_time_ms", DEFAULT_AI_TIME_MS))
+    player = player or s.get("ai_player")
+    return s["id_partie"], [row[:] for row in s["board"]], player, depth, time_ms
+
+
+# =======================
+# SERVEUR (parties en mémoire, abonnés, moteurs IA)
+# =======================
+class GameServer:
+    def __init__(self, games, events, ai_pool, signature_index=None, move_journal=None):
+        self.games = games
+        self.events = events
+        self.ai_pool = ai_pool
+        self.signature_index = signature_index
+        self.move_journal = move_journal
+
+    def register_client(self, game, client_id):
+        """
+        Enregistre un navigateur dans une partie WEB/HUMAIN.
+        - max 2 clients joueurs
+        - attribue client_r / client_j selon starting_player
+        Retourne True si une place a été prise (à enregistrer en base : SEATS_SQL).
+        """
+        if game is None or not client_id:
+            return False
+
+        if game.get("mode") != "WEB" or game.get("type_partie") != "HUMAIN":
+            return False
+
+        clients = game.setdefault("client_ids", [])
+
+        if client_id in clients:
+            return False
+
+        if len(clients) >= 2:
+            raise ValueError("Partie pleine")
+
+        clients.append(client_id)
+
+        first = game.get("starting_player", "R")
+        second = "J" if first == "R" else "R"
+
+        if game.get(f"client_{first.lower()}") is None:
+            game[f"client_{first.lower()}"] = client_id
+        elif game.get(f"client_{second.lower()}") is None:
+            game[f"client_{second.lower()}"] = client_id
+
+        bump_version(game)
+        self.publish_players(game)
+        return True
+
+    def publish_players(self, game):
+        self.events.publish(game["id_partie"], "player", {
+            "player_count": len(game.get("client_ids", [])),
+            "client_r": game.get("client_r"),
+            "client_j": game.get("client_j"),
+            "version": game["version"],
+        })
+
+    def publish_move(self, game, row, col, joueur):
+        """
+        Delta d'un coup joué (après changement de tour / fin de partie).
+        """
+        self.events.publish(game["id_partie"], "move", {
+            "row": row,
+            "col": col,
+            "player": joueur,
+            "signature": game["signature"],
+            "current_player": game["current_player"],
+            "game_over": game["game_over"],
+            "status": game["status"],
+            "winning_line": game["winning_line"],
+            "version": game["version"],
+        })
+
+    def start_game(self, g, pid, sig):
+        """
+        Partie créée en base : elle rejoint les parties du serveur (son premier client
+        est ensuite inscrit par register_client).
+        """
+        g["id_partie"] = pid
+        g["signature"] = sig
+        g["status"] = "EN_COURS"
+
+        self.games.put(pid, g)
+
+    def best_ai_col(self, game_id, board, ai_player, depth, time_ms=None):
+        valid = valid_cols(board)
+        if not valid:
+            return None
+
+        obvious = immediate_win_or_block(board, ai_player)
+        if obvious is not None:
+            return obvious
+
+        # moteur de la partie : sa table garde les recherches des coups précédents
+        col, _score, _depth = self.ai_pool.search(game_id, board, ai_player, depth, time_ms=time_ms)
+        return col if col is not None else valid[0]
+
+    def journal_move(self, s, record):
+        """
+        Écriture différée du coup (move_journal) : la situation précédente est
+        retrouvée par numero_coup à l'écriture.
+        """
+        self.move_journal.append(s["id_partie"], record["numero"], record["plateau"], record["joueur"],
+                                 signature=record["signature"], col=record["col"], **record["finish"])
+        s["last_situation_id"] = None
+
+    def finalize_win(self, winner, line, s):
+        s["game_over"] = True
+        s["status"] = "TERMINEE"
+        s["winning_line"] = [[r, c] for (r, c) in line]
+        bump_version(s)
+
+        # la fin de partie est déjà enregistrée avec le coup gagnant (store_move)
+        self.ai_pool.release(s["id_partie"])
+
+    def end_turn(self, s, row, col, line, joueur):
+        """
+        Après un coup enregistré : fin de partie ou changement de tour, puis diffusion.
+        """
+        if line:
+            self.finalize_win(joueur, line, s)
+        else:
+            next_turn(s)
+        self.publish_move(s, row, col, joueur)
+
+    def opening_stats(self, s):
+        """
+        Statistiques des parties en base par colonne suivante ({col: {...}}), ou None sans index.
+        """
+        if self.signature_index is None:
+            return None
+        sig = str(s.get("signature") or "")
+        return self.signature_index.next_moves(sig if sig.isdigit() else "")
+
+    def stats(self):
+        # parties et moteurs IA en mémoire (le pool de connexions est ajouté par chaque serveur)
+        return {
+            "games": self.games.stats(),
+            "ai_pool": self.ai_pool.stats(),
+            "journal": self.move_journal.stats() if self.move_journal is not None else None,
+            "events": self.events.stats(),
+            "process_cpu_s": round(time.process_time(), 3),
+        }
+
+
+def make_server(move_journal=None):
+    """
+    Parties, abonnés SSE et moteurs IA configurés par l'environnement (AI_*, GAMES_*,
+    OPENING_BOOK, SIGNATURE_INDEX). Les processus de recherche démarrent au premier besoin.
+    """
+    ai_pool = EnginePool(
+        ROWS, COLS,
+        tt_mb=AI_TT_MB,
+        max_games=AI_MAX_GAMES,
+        idle_s=AI_IDLE_S,
+        book=load_book(ROWS, COLS, OPENING_BOOK),
+        workers=AI_WORKERS,
+        min_depth=6,
+    )
+    return GameServer(
+        games=GameStore(max_games=GAMES_MAX, idle_s=GAMES_IDLE_S),
+        events=EventHub(),
+        ai_pool=ai_pool,
+        signature_index=load_index(ROWS, COLS, SIGNATURE_INDEX),
+        move_journal=move_journal,
+    )
@@ -32,7 +32,7 @@ let hoverCol = null;
 let lastMove = null;
 let aiTimer = null;
 let busy = false;
-let pollTimer = null;
+let eventSource = null;
 let GAME_ID = null;
 
 // ===== helpers =====
@@ -69,10 +69,10 @@ function cancelAiTimer() {
   }
 }
 
-function stopPolling() {
-  if (pollTimer) {
-    clearInterval(pollTimer);
-    pollTimer = null;
+function stopEvents() {
+  if (eventSource) {
+    eventSource.close();
+    eventSource = null;
   }
 }
 
@@ -142,10 +142,12 @@ function jsFindWinningLine(r, c, board) {
 }
 
 // ===== API =====
-async function getState(id) {
+// sinceVersion : version connue ; si rien n'a changé le serveur répond {changed: false}
+async function getState(id, sinceVersion) {
   let url = "/api/state";
   if (id) {
     url += `?game_id=${encodeURIComponent(id)}&client_id=${encodeURIComponent(CLIENT_ID)}`;
+    if (sinceVersion != null) url += `&since_version=${encodeURIComponent(sinceVersion)}`;
   }
 
   const res = await fetch(url);
@@ -173,6 +175,7 @@ async function newGame() {
     : (($("colorSelect")?.value || playerColor || "R").toUpperCase());
 
   GAME_ID = null;
+  stopEvents();
   history.replaceState({}, "", location.pathname);
 
   if (mode === "LOCAL") {
@@ -194,7 +197,7 @@ async function newGame() {
       client_r: null,
       client_j: null
     };
-    stopPolling();
+    stopEvents();
     render(lastState);
     return;
   }
@@ -230,7 +233,7 @@ async function newGame() {
     if (linkInput) linkInput.value = window.location.href;
 
     if (state.mode === "WEB") {
-      startPolling();
+      startEvents();
     }
   }
 
@@ -333,7 +336,8 @@ async function play(col) {
     return;
   }
 
-  lastMove = findLastMove(lastState.board, data.board);
+  // le coup a pu arriver avant par le flux d'évènements
+  lastMove = findLastMove(lastState.board, data.board) || lastMove;
   lastState = data;
   render(lastState);
 
@@ -373,7 +377,7 @@ async function aiMove() {
 
   const dt = Math.round(performance.now() - t0);
 
-  lastMove = findLastMove(lastState.board, data.board);
+  lastMove = findLastMove(lastState.board, data.board) || lastMove;
   lastState = data;
   render(lastState);
 
@@ -384,55 +388,76 @@ async function aiMove() {
   }
 }
 
-function startPolling() {
-  if (pollTimer) return;
+// ===== mises à jour poussées par le serveur (SSE /api/events) =====
+function movesOf(sig) {
+  sig = String(sig || "");
+  return sig.startsWith("init_") ? "" : sig;
+}
 
-  (async () => {
-    if (!lastState || lastState.game_over || lastState.mode !== "WEB" || !GAME_ID) return;
+async function resyncState() {
+  const data = await getState(GAME_ID, lastState?.version);
+  if (!data || data.changed === false) return;
+  lastMove = findLastMove(lastState.board, data.board) || lastMove;
+  lastState = data;
+  render(lastState);
+}
 
-    const data = await getState(GAME_ID);
-    if (!data) return;
+function onMoveEvent(ev) {
+  const d = JSON.parse(ev.data);
+  if (!lastState) return;
 
-    const changed =
-      JSON.stringify(data.board) !== JSON.stringify(lastState.board) ||
-      data.signature !== lastState.signature ||
-      data.current_player !== lastState.current_player ||
-      data.game_over !== lastState.game_over ||
-      data.player_count !== lastState.player_count ||
-      data.client_r !== lastState.client_r ||
-      data.client_j !== lastState.client_j;
+  const known = movesOf(lastState.signature);
+  if (d.signature === known) return;  // déjà appliqué (réponse de /api/play ou /api/ai_move)
 
-    if (changed) {
-      lastMove = findLastMove(lastState.board, data.board);
-      lastState = data;
-      render(lastState);
-    }
-  })();
+  // un évènement manqué : on recharge l'état complet
+  if (d.signature.length !== known.length + 1 || !d.signature.startsWith(known)) {
+    resyncState();
+    return;
+  }
 
-  pollTimer = setInterval(async () => {
-    if (!lastState || lastState.game_over || lastState.mode !== "WEB" || !GAME_ID) {
-      stopPolling();
-      return;
-    }
+  lastState.board[d.row][d.col] = d.player;
+  lastState.signature = d.signature;
+  lastState.current_player = d.current_player;
+  lastState.game_over = d.game_over;
+  lastState.status = d.status;
+  lastState.winning_line = d.winning_line;
+  lastState.version = d.version;
+  lastMove = { r: d.row, c: d.col };
+  render(lastState);
 
-    const data = await getState(GAME_ID);
-    if (!data) return;
-
-    const changed =
-      JSON.stringify(data.board) !== JSON.stringify(lastState.board) ||
-      data.signature !== lastState.signature ||
-      data.current_player !== lastState.current_player ||
-      data.game_over !== lastState.game_over ||
-      data.player_count !== lastState.player_count ||
-      data.client_r !== lastState.client_r ||
-      data.client_j !== lastState.client_j;
-
-    if (changed) {
-      lastMove = findLastMove(lastState.board, data.board);
-      lastState = data;
-      render(lastState);
-    }
-  }, 800);
+  if (lastState.game_over) {
+    showMessage(`🏁 Victoire de ${nameFor(lastState.current_player)} !`);
+    stopEvents();
+  }
+}
+
+function startEvents() {
+  if (eventSource || !GAME_ID) return;
+
+  const url = `/api/events?game_id=${encodeURIComponent(GAME_ID)}&client_id=${encodeURIComponent(CLIENT_ID)}`;
+  eventSource = new EventSource(url);
+
+  // état complet à chaque (re)connexion
+  eventSource.addEventListener("state", (ev) => {
+    const data = JSON.parse(ev.data);
+    if (data.id_partie !== GAME_ID) return;
+    lastMove = findLastMove(lastState?.board, data.board) || lastMove;
+    lastState = data;
+    render(lastState);
+    if (lastState.game_over) stopEvents();
+  });
+
+  eventSource.addEventListener("move", onMoveEvent);
+
+  eventSource.addEventListener("player", (ev) => {
+    if (!lastState) return;
+    const d = JSON.parse(ev.data);
+    lastState.player_count = d.player_count;
+    lastState.client_r = d.client_r;
+    lastState.client_j = d.client_j;
+    lastState.version = d.version;
+    render(lastState);
+  });
 }
 
 // ===== rendu =====
@@ -853,9 +878,18 @@ window.addEventListener("load", async () => {
     }
 
     const colHuman = data.suggested_col + 1;
-    showMessage(`💡 Suggestion IA : jouer en colonne ${colHuman}`);
+    showMessage(`💡 Suggestion IA : jouer en colonne ${colHuman}` + formatOpenings(data.openings));
   });
 
+  // parties en base par coup suivant (index des signatures), les 3 plus jouées
+  function formatOpenings(openings) {
+    const moves = Object.entries(openings || {})
+      .sort((a, b) => b[1].games - a[1].games)
+      .slice(0, 3)
+      .map(([col, m]) => `col ${Number(col) + 1} : ${m.games} parties, ${Math.round(m.win_rate * 100)} %`);
+    return moves.length ? ` — en base : ${moves.join(" · ")}` : "";
+  }
+
   $("btnCopyLink")?.addEventListener("click", () => {
     const link = $("shareLink")?.value || "";
     if (!link) return;
@@ -905,7 +939,7 @@ window.addEventListener("load", async () => {
       lastState = await getState();
     } else {
       if ($("shareLink")) $("shareLink").value = window.location.href;
-      if (lastState.mode === "WEB") startPolling();
+      if (lastState.mode === "WEB") startEvents();
 
       if (lastState.game_over) {
         setMessageOnly("Cette partie est terminée. Clique sur “Nouvelle partie” 🙂");
@@ -1,19 +1,121 @@
+import time
+
+from bitboard import BitBoard
+from evaluation import IncrementalEval, window_score
+from transposition import EXACT, LOWER, UPPER, SIDE_KEYS, TranspositionTable, zobrist_keys
+
+BACKENDS = ("list", "bitboard")
+
+# nombre de noeuds entre deux lectures de l'horloge pendant une recherche limitée en temps
+TIME_CHECK_NODES = 1024
+
+
+class SearchTimeout(Exception):
+    """Budget de temps épuisé : l'itération en cours est abandonnée."""
+
+
+def move_first(cols, col):
+    """Place 'col' en tête de 'cols' (s'il y figure), sans changer l'ordre du reste."""
+    if col < 0 or col not in cols or cols[0] == col:
+        return cols
+    return [col] + [c for c in cols if c != col]
+
+
 class MinimaxAI:
-    def __init__(self, rows, cols):
+    def __init__(self, rows, cols, backend="bitboard", tt_mb=16, pvs=False, book=None, mirror=True):
+        """
+        backend : "bitboard" (rapide) ou "list" (référence, plateau liste).
+        pvs : (backend bitboard) recherche à fenêtre nulle + coups killers + table
+              d'historique. Sans pvs (défaut), alpha-beta simple (coup de la table,
+              puis coups gagnants, puis centre) : sur bench_ai.py, PVS cherche ~10 %
+              de noeuds en moins mais n'est pas plus rapide en temps.
+        book : OpeningBook consulté par search() avant toute recherche (None = pas de livre).
+        mirror : (backend bitboard) une position et son miroir gauche-droite partagent
+                 leur entrée de la table ; le coup mémorisé est retourné à la lecture.
+                 Seulement si le nombre de colonnes est impair : sinon le bonus de la
+                 colonne centrale (cols // 2) n'est pas symétrique.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"backend inconnu: {backend}")
         self.rows = rows
         self.cols = cols
-        self.tt = {}
+        self.backend = backend
+        self.pvs = pvs
+        self.book = book
+        self.mirror = mirror
+        self.mirror_tt = mirror and cols % 2 == 1
+        self.tt = TranspositionTable(tt_mb)
+        self.nodes = 0
+        self.deadline = None
+        self._center_order = None
+        self.reset_ordering()
+
+    def reset_ordering(self):
+        """
+        Oublie les coups killers (2 par ply) et la table d'historique (par joueur et par case).
+        """
+        self.killers = [[-1, -1] for _ in range(self.rows * self.cols + 1)]
+        n = self.cols * (self.rows + 1)
+        self.history = {"R": [0] * n, "J": [0] * n}
 
     def reset_params(self, rows, cols):
         self.rows = rows
         self.cols = cols
+        self.mirror_tt = self.mirror and cols % 2 == 1
         self.tt.clear()
+        self.reset_ordering()
 
     def clear_cache(self):
         self.tt.clear()
 
-    def board_key(self, board, maximizing, ai_player):
-        return (ai_player, maximizing, tuple(map(tuple, board)))
+    def board_key(self, board):
+        """
+        Clé Zobrist 64 bits du plateau liste (même valeur que BitBoard.key).
+        """
+        z = zobrist_keys(self.rows, self.cols)
+        h = self.rows + 1
+        key = 0
+        for r in range(self.rows):
+            for c in range(self.cols):
+                p = board[r][c]
+                if p != 0:
+                    key ^= z[p][c * h + (self.rows - 1 - r)]
+        return key
+
+    def tt_lookup(self, key, depth, alpha, beta):
+        """
+        Consulte la table : retourne (score, alpha, beta, coup). score n'est pas None
+        si l'entrée suffit à conclure (valeur exacte ou bornes qui se croisent) ;
+        coup est le meilleur coup mémorisé (-1 si aucun), à essayer en premier.
+        """
+        entry = self.tt.probe(key)
+        if entry is None:
+            return None, alpha, beta, -1
+        edepth, flag, value, move = entry
+        if edepth >= depth:
+            if flag == EXACT:
+                return value, alpha, beta, move
+            if flag == LOWER:
+                if value > alpha:
+                    alpha = value
+            elif value < beta:
+                beta = value
+            if alpha >= beta:
+                return value, alpha, beta, move
+        return None, alpha, beta, move
+
+    def check_time(self):
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+
+    def tt_save(self, key, depth, alpha0, beta0, value, best_col):
+        if value <= alpha0:
+            flag = UPPER
+        elif value >= beta0:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(key, depth, flag, value, best_col)
 
     def valid_cols(self, board):
         return [c for c in range(self.cols) if board[0][c] == 0]
@@ -42,6 +144,31 @@ class MinimaxAI:
                         cc += dc
         return None
 
+    def winner_from_move(self, board, row, col):
+        """
+        Comme Connect4Game.check_win : ne regarde que les 4 lignes passant par (row, col),
+        la case qui vient d'être jouée. Retourne 'R' / 'J' si alignement, sinon None.
+        """
+        p = board[row][col]
+        if p == 0:
+            return None
+
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            cnt = 1
+            r, c = row + dr, col + dc
+            while 0 <= r < self.rows and 0 <= c < self.cols and board[r][c] == p:
+                cnt += 1
+                r += dr
+                c += dc
+            r, c = row - dr, col - dc
+            while 0 <= r < self.rows and 0 <= c < self.cols and board[r][c] == p:
+                cnt += 1
+                r -= dr
+                c -= dc
+            if cnt >= 4:
+                return p
+        return None
+
     def ordered_valid_cols(self, board, ai_player, maximizing):
         valid = self.valid_cols(board)
         if not valid:
@@ -58,7 +185,7 @@ class MinimaxAI:
                 return -10**9
 
             board[r][col] = player_to_play
-            w = self.winner_on_board(board)
+            w = self.winner_from_move(board, r, col)
             board[r][col] = 0
             if w == player_to_play:
                 score += 10**6
@@ -71,24 +198,7 @@ class MinimaxAI:
         opp = "J" if ai_player == "R" else "R"
 
         def score_window(w):
-            ai = w.count(ai_player)
-            op = w.count(opp)
-            empty = w.count(0)
-            if ai > 0 and op > 0:
-                return 0
-            if ai == 4:
-                return 100000
-            if op == 4:
-                return -100000
-            if ai == 3 and empty == 1:
-                return 80
-            if ai == 2 and empty == 2:
-                return 10
-            if op == 3 and empty == 1:
-                return -90
-            if op == 2 and empty == 2:
-                return -12
-            return 0
+            return window_score(w.count(ai_player), w.count(opp), w.count(0))
 
         score = 0
         center = self.cols // 2
@@ -109,8 +219,37 @@ class MinimaxAI:
 
         return score
 
-    def minimax(self, board, depth, alpha, beta, maximizing, ai_player):
-        winner = self.winner_on_board(board)
+    def minimax(self, board, depth, alpha, beta, maximizing, ai_player, last_move=None):
+        """
+        Score minimax de 'board' (plateau liste) du point de vue de ai_player.
+        Le backend "bitboard" convertit le plateau une fois puis cherche sur des entiers.
+
+        last_move = (row, col) du dernier pion posé : seule une ligne passant par
+        cette case peut être gagnante, on évite ainsi de rescanner tout le plateau.
+        Sans last_move, le plateau entier est vérifié une fois à la racine.
+        """
+        if self.backend == "bitboard":
+            bb = BitBoard.from_board(board, self.rows, self.cols)
+            if last_move is None:
+                winner = bb.winner()
+                if winner is not None:
+                    self.nodes += 1
+                    return 10**7 + depth if winner == ai_player else -10**7 - depth
+            ev = IncrementalEval.from_board(board, self.rows, self.cols)
+            return self.minimax_bb(bb, ev, depth, alpha, beta, maximizing, ai_player)
+        return self.minimax_list(board, depth, alpha, beta, maximizing, ai_player, last_move)
+
+    def minimax_list(self, board, depth, alpha, beta, maximizing, ai_player, last_move=None, pos_key=None):
+        """
+        pos_key = clé Zobrist de 'board', passée aux fils par un simple XOR.
+        """
+        self.nodes += 1
+        if not self.nodes % TIME_CHECK_NODES:
+            self.check_time()
+        if last_move is None:
+            winner = self.winner_on_board(board)
+        else:
+            winner = self.winner_from_move(board, *last_move)
         opp = "J" if ai_player == "R" else "R"
 
         if winner == ai_player:
@@ -122,37 +261,322 @@ class MinimaxAI:
         if depth == 0 or not valid:
             return self.heuristic(board, ai_player)
 
-        key = self.board_key(board, maximizing, ai_player)
-        cached = self.tt.get(key)
+        if pos_key is None:
+            pos_key = self.board_key(board)
+        key = pos_key ^ SIDE_KEYS[ai_player, maximizing]
+        cached, alpha, beta, tt_move = self.tt_lookup(key, depth, alpha, beta)
         if cached is not None:
-            cd, cs = cached
-            if cd >= depth:
-                return cs
+            return cached
+        alpha0, beta0 = alpha, beta
 
+        z = zobrist_keys(self.rows, self.cols)
+        h = self.rows + 1
+        best_col = -1
         if maximizing:
             value = -10**9
-            for col in self.ordered_valid_cols(board, ai_player, True):
+            for col in move_first(self.ordered_valid_cols(board, ai_player, True), tt_move):
                 r = self.next_open_row(board, col)
                 if r is None:
                     continue
                 board[r][col] = ai_player
-                value = max(value, self.minimax(board, depth-1, alpha, beta, False, ai_player))
+                child_key = pos_key ^ z[ai_player][col * h + (self.rows - 1 - r)]
+                v = self.minimax_list(board, depth-1, alpha, beta, False, ai_player, (r, col), child_key)
                 board[r][col] = 0
+                if v > value:
+                    value, best_col = v, col
                 alpha = max(alpha, value)
                 if alpha >= beta:
                     break
         else:
             value = 10**9
-            for col in self.ordered_valid_cols(board, ai_player, False):
+            for col in move_first(self.ordered_valid_cols(board, ai_player, False), tt_move):
                 r = self.next_open_row(board, col)
                 if r is None:
                     continue
                 board[r][col] = opp
-                value = min(value, self.minimax(board, depth-1, alpha, beta, True, ai_player))
+                child_key = pos_key ^ z[opp][col * h + (self.rows - 1 - r)]
+                v = self.minimax_list(board, depth-1, alpha, beta, True, ai_player, (r, col), child_key)
                 board[r][col] = 0
+                if v < value:
+                    value, best_col = v, col
                 beta = min(beta, value)
                 if alpha >= beta:
                     break
 
-        self.tt[key] = (depth, value)
-        return value
\ No newline at end of file
+        self.tt_save(key, depth, alpha0, beta0, value, best_col)
+        return value
+
+    # ============================================================
+    # BACKEND BITBOARD
+    # ============================================================
+    def center_order(self):
+        order = self._center_order
+        if order is None or len(order) != self.cols:
+            center = self.cols // 2
+            order = self._center_order = sorted(range(self.cols), key=lambda c: abs(c - center))
+        return order
+
+    def ordered_cols_bb(self, bb, player_to_play, wins=None):
+        """
+        Même ordre que ordered_valid_cols : coups gagnants en tête, puis du centre vers les bords.
+        wins : bb.winning_cells(player_to_play) s'il est déjà calculé.
+        """
+        if wins is None:
+            wins = bb.winning_cells(player_to_play)
+        h, rows, heights = bb.h, bb.rows, bb.heights
+        first, rest = [], []
+        for col in self.center_order():
+            hgt = heights[col]
+            if hgt >= rows:
+                continue
+            if wins >> (col * h + hgt) & 1:
+                first.append(col)
+            else:
+                rest.append(col)
+        return first + rest
+
+    def ordered_cols_pvs(self, bb, player_to_play, tt_move, wins=None):
+        """
+        Ordre des coups pour la PVS :
+        coups gagnants, coup de la table (variation principale), 2 killers du ply,
+        puis score d'historique ; à égalité, du centre vers les bords.
+        """
+        if wins is None:
+            wins = bb.winning_cells(player_to_play)
+        h, rows, heights = bb.h, bb.rows, bb.heights
+        k1, k2 = self.killers[bb.count]
+        hist = self.history[player_to_play]
+
+        scored = []
+        for col in self.center_order():
+            hgt = heights[col]
+            if hgt >= rows:
+                continue
+            bit = col * h + hgt
+            if wins >> bit & 1:
+                score = 1 << 62
+            elif col == tt_move:
+                score = 1 << 61
+            elif col == k1:
+                score = 1 << 60
+            elif col == k2:
+                score = 1 << 59
+            else:
+                score = hist[bit]
+            scored.append((score, col))
+
+        scored.sort(key=lambda t: t[0], reverse=True)
+        return [col for _s, col in scored]
+
+    def record_cutoff(self, bb, player, col, depth):
+        """
+        Le coup 'col' a provoqué une coupure : killer du ply + bonus d'historique.
+        """
+        killers = self.killers[bb.count]
+        if killers[0] != col:
+            killers[1] = killers[0]
+            killers[0] = col
+        self.history[player][col * bb.h + bb.heights[col]] += depth * depth
+
+    def minimax_bb(self, bb, ev, depth, alpha, beta, maximizing, ai_player):
+        """
+        Seul le joueur qui vient de poser (l'adversaire si c'est à l'IA de jouer)
+        peut avoir gagné : on ne teste que ses bits.
+        'ev' suit les mêmes coups que 'bb' et donne l'heuristique des feuilles en O(1).
+
+        Avec self.pvs, le premier coup est cherché avec la fenêtre complète et les
+        suivants avec une fenêtre nulle ; un coup qui la dépasse est recherché à nouveau.
+        """
+        self.nodes += 1
+        if not self.nodes % TIME_CHECK_NODES:
+            self.check_time()
+        opp = "J" if ai_player == "R" else "R"
+
+        if maximizing:
+            if bb.is_win(bb.bits[opp]):
+                return -10**7 - depth
+        elif bb.is_win(bb.bits[ai_player]):
+            return 10**7 + depth
+
+        bits_r, bits_j = bb.bits["R"], bb.bits["J"]
+        if depth == 0 or (bits_r | bits_j) == bb.board_mask:
+            return ev.total[ai_player]
+
+        key = bb.key
+        mirrored = self.mirror_tt and bb.mkey < key
+        if mirrored:
+            key = bb.mkey
+        key ^= SIDE_KEYS[ai_player, maximizing]
+        cached, alpha, beta, tt_move = self.tt_lookup(key, depth, alpha, beta)
+        if cached is not None:
+            return cached
+        if mirrored and tt_move >= 0:
+            tt_move = self.cols - 1 - tt_move
+        alpha0, beta0 = alpha, beta
+
+        pvs = self.pvs
+        player = ai_player if maximizing else opp
+        wins = bb.winning_cells(player)
+        if pvs:
+            cols = self.ordered_cols_pvs(bb, player, tt_move, wins)
+        else:
+            cols = move_first(self.ordered_cols_bb(bb, player, wins), tt_move)
+
+        best_col = -1
+        if depth == 1:
+            value, best_col = self.leaves_bb(bb, ev, alpha, beta, maximizing, ai_player, cols, wins)
+        elif maximizing:
+            value = -10**9
+            for i, col in enumerate(cols):
+                r = bb.play(col, ai_player)
+                ev.play(r, col, ai_player)
+                if pvs and i:
+                    v = self.minimax_bb(bb, ev, depth-1, alpha, alpha + 1, False, ai_player)
+                    if alpha < v < beta:
+                        v = self.minimax_bb(bb, ev, depth-1, alpha, beta, False, ai_player)
+                else:
+                    v = self.minimax_bb(bb, ev, depth-1, alpha, beta, False, ai_player)
+                ev.undo(r, col, ai_player)
+                bb.undo(col, ai_player)
+                if v > value:
+                    value, best_col = v, col
+                if value > alpha:
+                    alpha = value
+                if alpha >= beta:
+                    if pvs:
+                        self.record_cutoff(bb, ai_player, col, depth)
+                    break
+        else:
+            value = 10**9
+            for i, col in enumerate(cols):
+                r = bb.play(col, opp)
+                ev.play(r, col, opp)
+                if pvs and i:
+                    v = self.minimax_bb(bb, ev, depth-1, beta - 1, beta, True, ai_player)
+                    if alpha < v < beta:
+                        v = self.minimax_bb(bb, ev, depth-1, alpha, beta, True, ai_player)
+                else:
+                    v = self.minimax_bb(bb, ev, depth-1, alpha, beta, True, ai_player)
+                ev.undo(r, col, opp)
+                bb.undo(col, opp)
+                if v < value:
+                    value, best_col = v, col
+                if value < beta:
+                    beta = value
+                if alpha >= beta:
+                    if pvs:
+                        self.record_cutoff(bb, opp, col, depth)
+                    break
+
+        if mirrored and best_col >= 0:
+            best_col = self.cols - 1 - best_col
+        self.tt_save(key, depth, alpha0, beta0, value, best_col)
+        return value
+
+    def leaves_bb(self, bb, ev, alpha, beta, maximizing, ai_player, cols, wins):
+        """
+        Boucle d'un noeud de profondeur 1 : chaque fils est une feuille, évaluée sans
+        poser le pion (coup gagnant lu dans wins = winning_cells du joueur, heuristique
+        par ev.gain). Mêmes valeurs et mêmes coupures que minimax_bb ; seules les feuilles
+        évaluées sont comptées (pas de re-recherche PVS d'une feuille, sa valeur est exacte).
+        Retourne (valeur, meilleur coup).
+        """
+        player = ai_player if maximizing else ("J" if ai_player == "R" else "R")
+        h, rows, heights = bb.h, bb.rows, bb.heights
+        base = ev.total[ai_player]
+        win_value = 10**7 if maximizing else -10**7
+        pvs = self.pvs
+        best_col = -1
+        value = -10**9 if maximizing else 10**9
+        for col in cols:
+            self.nodes += 1
+            if not self.nodes % TIME_CHECK_NODES:
+                self.check_time()
+            hgt = heights[col]
+            if wins >> (col * h + hgt) & 1:
+                v = win_value
+            else:
+                v = base + ev.gain(rows - 1 - hgt, col, player, ai_player)
+            if maximizing:
+                if v > value:
+                    value, best_col = v, col
+                if value > alpha:
+                    alpha = value
+            else:
+                if v < value:
+                    value, best_col = v, col
+                if value < beta:
+                    beta = value
+            if alpha >= beta:
+                if pvs:
+                    self.record_cutoff(bb, player, col, 1)
+                break
+        return value, best_col
+
+    # ============================================================
+    # APPROFONDISSEMENT ITERATIF
+    # ============================================================
+    def book_move(self, board, player):
+        """
+        (col, score, profondeur) du livre d'ouvertures pour cette position, ou None.
+        """
+        if self.book is None:
+            return None
+        return self.book.lookup(board, player)
+
+    def search(self, board, ai_player, max_depth, time_ms=None):
+        """
+        Cherche le meilleur coup de ai_player par approfondissement itératif :
+        profondeur 1, 2, ..., max_depth, jusqu'à épuisement du budget time_ms
+        (millisecondes, None = pas de limite). La profondeur 1 est toujours terminée.
+        Si le livre d'ouvertures connaît la position, son coup est joué sans recherche.
+
+        Le meilleur coup de l'itération précédente est essayé en premier à la racine,
+        et dans l'arbre la table de transposition fournit le coup de la variation
+        principale en tête de l'ordre des coups.
+
+        Retourne (col, score, profondeur) de la dernière itération terminée,
+        ou (None, None, 0) si aucun coup n'est possible.
+        """
+        hit = self.book_move(board, ai_player)
+        if hit is not None:
+            return hit
+
+        board = [row[:] for row in board]   # une recherche interrompue peut laisser des pions posés
+        root = self.ordered_valid_cols(board, ai_player, maximizing=True)
+        if not root:
+            return None, None, 0
+
+        self.reset_ordering()
+        start = time.perf_counter()
+        best_col, best_score, done = root[0], None, 0
+        self.deadline = None
+        try:
+            for depth in range(1, max_depth + 1):
+                it_col, it_score = None, -10**18
+                for col in move_first(root, best_col if done else -1):
+                    r = self.next_open_row(board, col)
+                    board[r][col] = ai_player
+                    try:
+                        score = self.minimax(board, depth - 1, it_score, 10**18, False, ai_player,
+                                             last_move=(r, col))
+                    finally:
+                        board[r][col] = 0
+                    if it_col is None or score > it_score:
+                        it_col, it_score = col, score
+
+                best_col, best_score, done = it_col, it_score, depth
+
+                # victoire / défaite forcée : chercher plus profond ne change rien
+                if abs(best_score) >= 10**7:
+                    break
+                if time_ms is not None:
+                    self.deadline = start + time_ms / 1000.0
+                    if time.perf_counter() >= self.deadline:
+                        break
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+
+        return best_col, best_score, done
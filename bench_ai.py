@@ -0,0 +1,158 @@
+# bench_ai.py
+"""
+Benchmark de la recherche minimax sur une suite fixe de positions.
+
+Pour chaque configuration : noeuds cherchés, temps, noeuds/s et facteur de
+branchement effectif (EBF = noeuds ** (1 / profondeur)), par position et au total.
+
+    python bench_ai.py                 # alpha-beta simple vs PVS, profondeur 6
+    python bench_ai.py --depth 7
+    python bench_ai.py --with-list     # ajoute le backend liste (lent) et le rapport des noeuds/s
+    python bench_ai.py --no-mirror     # ajoute PVS sans partage des positions miroir dans la table
+    python bench_ai.py --parallel 8    # accélération de la recherche parallèle, 1..8 workers
+"""
+import argparse
+import time
+from concurrent.futures import wait
+
+from ai import MinimaxAI
+from game import Connect4Game
+from parallel_search import ParallelSearch
+
+ROWS = 9
+COLS = 9
+
+# signatures (colonnes 1..9, Rouge commence), de l'ouverture au milieu de partie
+POSITIONS = [
+    "",
+    "37",
+    "785495",
+    "6927517262",
+    "587364981748856",
+    "215796749964447",
+    "791784733813114456",
+    "658528513656655555146",
+    "995799754119233422",
+    "29673494499847227966637",
+]
+
+CONFIGS = {
+    "list": dict(backend="list", pvs=False),
+    "alphabeta": dict(backend="bitboard", pvs=False),
+    "pvs": dict(backend="bitboard", pvs=True),
+    "pvs_nomirror": dict(backend="bitboard", pvs=True, mirror=False),
+}
+
+
+def position_from_signature(sig):
+    g = Connect4Game(rows=ROWS, cols=COLS, starting_player="R")
+    for ch in sig:
+        g.drop(int(ch) - 1)
+    return g.board, g.current_player
+
+
+def run_config(name, depth):
+    total_nodes = 0
+    total_time = 0.0
+    probes = hits = 0
+    rows = []
+    for sig in POSITIONS:
+        board, player = position_from_signature(sig)
+        ai = MinimaxAI(ROWS, COLS, **CONFIGS[name])
+
+        t0 = time.perf_counter()
+        col, score, done = ai.search(board, player, depth)
+        dt = time.perf_counter() - t0
+
+        total_nodes += ai.nodes
+        total_time += dt
+        probes += ai.tt.probes
+        hits += ai.tt.hits
+        rows.append((sig or "(vide)", col, score, done, ai.nodes, dt))
+
+    print(f"\n=== {name} (profondeur {depth}) ===")
+    print(f"{'position':<30} {'col':>3} {'score':>9} {'noeuds':>9} {'EBF':>6} {'ms':>8}")
+    for sig, col, score, done, nodes, dt in rows:
+        ebf = nodes ** (1.0 / done) if done else 0.0
+        print(f"{sig[:30]:<30} {col:>3} {score:>9} {nodes:>9} {ebf:>6.2f} {dt * 1000:>8.1f}")
+
+    n = len(POSITIONS)
+    mean_ebf = (total_nodes / n) ** (1.0 / depth)
+    nps = total_nodes / total_time if total_time else 0.0
+    hit_rate = hits / probes if probes else 0.0
+    print(f"TOTAL noeuds={total_nodes} temps={total_time:.2f}s noeuds/s={nps:.0f} "
+          f"EBF moyen={mean_ebf:.2f} succès table={hit_rate:.1%}")
+    return total_nodes, total_time
+
+
+def run_parallel(depth, max_workers):
+    """
+    Temps total de la suite par nombre de workers, accélération par rapport à 1 worker.
+    """
+    counts = []
+    n = 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+
+    print(f"\n=== recherche parallèle (profondeur {depth}) ===")
+    print(f"{'workers':>7} {'temps s':>8} {'accél.':>7} {'effic.':>7} {'noeuds':>9}  coups")
+    base_time = None
+    base_moves = None
+    for n in counts:
+        ps = ParallelSearch(MinimaxAI(ROWS, COLS), workers=n, min_depth=depth)
+        if n > 1:
+            # démarrage des processus hors chrono
+            board, player = position_from_signature("")
+            wait(ps.submit_root(board, player, list(range(COLS)), 1))
+
+        moves = []
+        t0 = time.perf_counter()
+        for sig in POSITIONS:
+            board, player = position_from_signature(sig)
+            col, _score, _done = ps.search(board, player, depth)
+            moves.append(col)
+        dt = time.perf_counter() - t0
+        ps.shutdown()
+
+        if base_time is None:
+            base_time, base_moves = dt, moves
+        same = "identiques" if moves == base_moves else "différents"
+        print(f"{n:>7} {dt:>8.2f} {base_time / dt:>7.2f} {base_time / dt / n:>7.2f} {ps.nodes:>9}  {same}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark minimax (noeuds, EBF)")
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--with-list", action="store_true", help="inclure le backend liste")
+    parser.add_argument("--no-mirror", action="store_true", help="inclure PVS sans table symétrique")
+    parser.add_argument("--parallel", type=int, metavar="N", help="mesurer la recherche parallèle jusqu'à N workers")
+    args = parser.parse_args()
+
+    if args.parallel:
+        run_parallel(args.depth, args.parallel)
+        return
+
+    names = ["alphabeta", "pvs"]
+    if args.with_list:
+        names.insert(0, "list")
+    if args.no_mirror:
+        names.append("pvs_nomirror")
+
+    results = {name: run_config(name, args.depth) for name in names}
+
+    base_nodes, base_time = results["alphabeta"]
+    pvs_nodes, pvs_time = results["pvs"]
+    print(
+        f"\npvs / alphabeta : noeuds x{pvs_nodes / base_nodes:.2f}, "
+        f"temps x{pvs_time / base_time:.2f}"
+    )
+    if "list" in results:
+        # même recherche alpha-beta sur les deux backends : objectif x20 en noeuds/s
+        list_nodes, list_time = results["list"]
+        print(f"bitboard / liste : noeuds/s x{(base_nodes / base_time) / (list_nodes / list_time):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# bench_db.py
+"""
+Débit d'enregistrement des coups (PostgreSQL), par worker.
+
+Chaque worker (thread) joue des parties aléatoires et enregistre chaque coup :
+- "separe" : comme l'ancien apply_move du serveur web (INSERT situation, 2 UPDATE
+  de chaînage, UPDATE signature, puis 3 UPDATE de fin de partie), une requête à la fois ;
+- "cte" : db.db.commit_move, une seule requête / transaction par coup ;
+- "ply" : le même avec SITUATION_LINKS=ply (pas de mise à jour de la situation
+  précédente, liens posés en une requête au dernier coup).
+
+    python bench_db.py                    # 1, 2, 4 workers, 200 coups chacun
+    python bench_db.py --workers 8 --moves 500
+    python bench_db.py --create-index     # crée l'index du mode "ply" s'il manque
+
+Le mode "ply" n'est mesuré que si l'index unique (id_partie, numero_coup) existe :
+le benchmark ne modifie pas le schéma sans --create-index.
+
+Les parties créées (mode "BENCH") sont supprimées à la fin.
+"""
+import argparse
+import random
+import threading
+import time
+
+import db.db
+from game import Connect4Game
+from db.db import (
+    board_to_text, commit_move, configure_pool, connection, create_partie,
+    ensure_ply_index, has_ply_index, insert_situation, pool_stats, update_links, update_partie_signature,
+)
+
+ROWS = 9
+COLS = 9
+
+
+def _finish_separately(id_partie, winner, ligne):
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute("UPDATE partie SET status=%s WHERE id_partie=%s", ("TERMINEE", id_partie))
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute("UPDATE partie SET joueur_gagnant=%s WHERE id_partie=%s", (winner, id_partie))
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute("UPDATE partie SET ligne_gagnante=%s WHERE id_partie=%s", (ligne, id_partie))
+
+
+def play_and_store(mode, n_moves, rnd, created):
+    """
+    Joue des parties jusqu'à avoir enregistré n_moves coups. Retourne le temps passé en base.
+    """
+    db_time = 0.0
+    done = 0
+    while done < n_moves:
+        g = Connect4Game(rows=ROWS, cols=COLS, starting_player="R")
+        pid = create_partie(mode="BENCH", type_partie="IA_VS_IA", status="EN_COURS",
+                            joueur_depart="R", rows=ROWS, cols=COLS, nb_colonnes=COLS)
+        created.append(pid)
+        sig = f"bench_{pid}_"
+        last_sid = None
+
+        while not g.game_over and done < n_moves:
+            ok, line = g.drop(rnd.choice(g.valid_columns()))
+            if not ok:
+                break
+            r, c, joueur = g.history[-1]
+            sig += str(c + 1)
+            plateau = board_to_text(g.board)
+            ligne = str([list(x) for x in line]) if line else None
+
+            t0 = time.perf_counter()
+            if mode in ("cte", "ply"):
+                finish = dict(status="TERMINEE", joueur_gagnant=joueur, ligne_gagnante=ligne) if line else {}
+                last_sid = commit_move(pid, len(g.history), plateau, joueur,
+                                       precedent=last_sid, signature=sig, **finish)
+            else:
+                sid = insert_situation(pid, len(g.history), plateau, joueur, precedent=last_sid)
+                if last_sid is not None:
+                    update_links(last_sid, sid)
+                last_sid = sid
+                update_partie_signature(pid, sig)
+                if line:
+                    _finish_separately(pid, joueur, ligne)
+            db_time += time.perf_counter() - t0
+            done += 1
+    return db_time
+
+
+def cleanup(ids):
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute("DELETE FROM situation WHERE id_partie = ANY(%s)", (ids,))
+        cur.execute("DELETE FROM partie WHERE id_partie = ANY(%s)", (ids,))
+
+
+def run(mode, workers, n_moves):
+    created = []
+    times = [0.0] * workers
+    db.db.SITUATION_LINKS = "ply" if mode == "ply" else "stored"
+
+    def worker(i):
+        times[i] = play_and_store(mode, n_moves, random.Random(i), created)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    cleanup(created)
+
+    per_worker = sum(n_moves / t for t in times) / workers
+    total = workers * n_moves / wall
+    return per_worker, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark d'enregistrement des coups")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--moves", type=int, default=200, help="coups par worker")
+    parser.add_argument("--create-index", action="store_true",
+                        help="créer l'index unique du mode ply (modifie le schéma)")
+    args = parser.parse_args()
+
+    configure_pool(minconn=1, maxconn=max(args.workers) + 1)
+    modes = ["separe", "cte"]
+    if args.create_index:
+        try:
+            ensure_ply_index()
+        except ValueError as e:
+            print("index ply non créé :", e)
+    if has_ply_index():
+        modes.append("ply")
+    else:
+        print("mode ply ignoré : pas d'index situation_partie_coup (--create-index pour le créer)")
+
+    print(f"{'mode':<8} {'workers':>7} {'coups/s/worker':>15} {'coups/s total':>14}")
+    for workers in args.workers:
+        for mode in modes:
+            per_worker, total = run(mode, workers, args.moves)
+            print(f"{mode:<8} {workers:>7} {per_worker:>15.0f} {total:>14.0f}")
+    print("pool :", pool_stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# bench_web.py
+"""
+Charge du serveur web par client connecté : polling de /api/state (ancien app.js,
+une requête toutes les 800 ms), le même avec If-None-Match (304 si la partie n'a
+pas changé), et flux SSE /api/events (état poussé à chaque coup).
+
+Le serveur doit tourner (python Webapp/app.py). Les clients sont répartis par 2
+dans des parties en ligne ; un joueur factice joue un coup par partie toutes les
+--move-interval secondes. Le temps CPU du serveur est lu dans /api/stats.
+
+    python bench_web.py --clients 20 --duration 30
+    python bench_web.py --url http://localhost:5000 --clients 50 --modes sse
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+POLL_INTERVAL_S = 0.8
+
+
+def _get(url, timeout=10):
+    with urllib.request.urlopen(url, timeout=timeout) as res:
+        return json.loads(res.read())
+
+
+def _post(url, payload, timeout=30):
+    req = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                 headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as res:
+            return json.loads(res.read())
+    except urllib.error.HTTPError as e:
+        return json.loads(e.read() or b"{}")
+
+
+def poll_client(base, game_id, client_id, stop, counts, conditional=False):
+    url = f"{base}/api/state?game_id={game_id}&client_id={client_id}"
+    etag = None
+    while not stop.is_set():
+        req = urllib.request.Request(url)
+        if conditional and etag:
+            req.add_header("If-None-Match", etag)
+        try:
+            with urllib.request.urlopen(req, timeout=10) as res:
+                counts["bytes"] += len(res.read())
+                etag = res.headers.get("ETag")
+            counts["requests"] += 1
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                counts["requests"] += 1
+                counts["not_modified"] += 1
+            else:
+                counts["errors"] += 1
+        except OSError:
+            counts["errors"] += 1
+        stop.wait(POLL_INTERVAL_S)
+
+
+def etag_client(base, game_id, client_id, stop, counts):
+    poll_client(base, game_id, client_id, stop, counts, conditional=True)
+
+
+def sse_client(base, game_id, client_id, stop, counts):
+    url = f"{base}/api/events?game_id={game_id}&client_id={client_id}"
+    try:
+        # le serveur envoie au moins un keepalive toutes les 15 s
+        with urllib.request.urlopen(url, timeout=30) as res:
+            counts["requests"] += 1
+            while not stop.is_set():
+                line = res.readline()
+                if not line:
+                    break
+                counts["bytes"] += len(line)
+                if line.startswith(b"event:"):
+                    counts["events"] += 1
+    except OSError:
+        if not stop.is_set():
+            counts["errors"] += 1
+
+
+def player(base, games, interval, stop, counts):
+    """
+    Un coup par partie toutes les 'interval' secondes, en alternant les deux joueurs.
+    """
+    rnd = random.Random(0)
+    while not stop.wait(interval):
+        for gid, clients in games:
+            state = _get(f"{base}/api/state?game_id={gid}")
+            if state.get("game_over"):
+                continue
+            cols = [c for c in range(len(state["board"][0])) if state["board"][0][c] == 0]
+            client = state["client_r"] if state["current_player"] == "R" else state["client_j"]
+            _post(f"{base}/api/play", {"game_id": gid, "client_id": client, "col": rnd.choice(cols)})
+            counts["moves"] += 1
+
+
+def run(base, mode, n_clients, duration, move_interval):
+    games = []
+    for _ in range((n_clients + 1) // 2):
+        a, b = str(uuid.uuid4()), str(uuid.uuid4())
+        g = _post(f"{base}/api/new", {"mode": "ONLINE", "client_id": a})
+        _get(f"{base}/api/state?game_id={g['id_partie']}&client_id={b}")
+        games.append((g["id_partie"], (a, b)))
+
+    stop = threading.Event()
+    counts = {"requests": 0, "not_modified": 0, "bytes": 0, "events": 0, "errors": 0, "moves": 0}
+    target = {"poll": poll_client, "etag": etag_client, "sse": sse_client}[mode]
+    threads = []
+    for i in range(n_clients):
+        gid, clients = games[i // 2]
+        threads.append(threading.Thread(target=target, args=(base, gid, clients[i % 2], stop, counts), daemon=True))
+    threads.append(threading.Thread(target=player, args=(base, games, move_interval, stop, counts), daemon=True))
+
+    for t in threads:
+        t.start()
+    time.sleep(1.0)   # connexions établies
+
+    cpu0 = _get(f"{base}/api/stats")["process_cpu_s"]
+    t0 = time.perf_counter()
+    time.sleep(duration)
+    cpu1 = _get(f"{base}/api/stats")["process_cpu_s"]
+    wall = time.perf_counter() - t0
+
+    # les flux SSE restent ouverts jusqu'au prochain évènement : threads daemon, pas d'attente
+    stop.set()
+    deadline = time.monotonic() + 5
+    for t in threads:
+        t.join(max(0.0, deadline - time.monotonic()))
+
+    cpu_ms_per_client_s = (cpu1 - cpu0) * 1000.0 / wall / n_clients
+    return cpu_ms_per_client_s, (cpu1 - cpu0) / wall * 100.0, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU serveur par client : polling, polling conditionnel, SSE")
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--move-interval", type=float, default=2.0, help="s entre deux coups d'une partie")
+    parser.add_argument("--modes", nargs="+", choices=("poll", "etag", "sse"),
+                        default=["poll", "etag", "sse"])
+    args = parser.parse_args()
+
+    base = args.url.rstrip("/")
+    print(f"{'mode':<6} {'clients':>7} {'CPU ms/s/client':>16} {'CPU serveur %':>14} "
+          f"{'requêtes':>9} {'304':>6} {'Ko reçus':>9} {'évènements':>11} {'coups':>6}")
+    for mode in args.modes:
+        per_client, total_pct, counts = run(base, mode, args.clients, args.duration, args.move_interval)
+        print(f"{mode:<6} {args.clients:>7} {per_client:>16.2f} {total_pct:>14.1f} "
+              f"{counts['requests']:>9} {counts['not_modified']:>6} {counts['bytes'] / 1024:>9.1f} "
+              f"{counts['events']:>11} {counts['moves']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,40 +10,28 @@ Important:
 """
 
 import json
-import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import sys
 from psycopg2 import errors
 
 from game import Connect4Game
+from db.bulk import BulkImporter, build_game_rows
 from db.db import (
-    create_partie, insert_situation, update_links,
-    finish_partie, board_to_text, update_partie_signature, delete_partie
+    create_partie, insert_situation,
+    finish_partie, board_to_text, update_partie_signature, delete_partie,
+    connection,
 )
 
 # ---------------- DB helpers ----------------
-def get_conn():
-    host = os.getenv("PGHOST", "localhost")
-    port = int(os.getenv("PGPORT", "5432"))
-    dbname = os.getenv("PGDATABASE", "Connect4DB")
-    user = os.getenv("PGUSER", "postgres")
-    # Never hardcode credentials. If password is None, psycopg2 will rely on local auth.
-    password = os.getenv("PGPASSWORD")
-    return psycopg2.connect(
-        host=host, port=port, dbname=dbname, user=user, password=password,
-        cursor_factory=RealDictCursor
-    )
-
 def find_partie_id_by_signature(signature: str):
     sql = "SELECT id_partie FROM partie WHERE signature = %s LIMIT 1;"
-    with get_conn() as conn, conn.cursor() as cur:
+    with connection() as conn, conn.cursor() as cur:
         cur.execute(sql, (signature,))
         row = cur.fetchone()
         return row["id_partie"] if row else None
 
 def count_situations_for_partie(id_partie: int) -> int:
     sql = "SELECT COUNT(*) AS n FROM situation WHERE id_partie = %s;"
-    with get_conn() as conn, conn.cursor() as cur:
+    with connection() as conn, conn.cursor() as cur:
         cur.execute(sql, (id_partie,))
         return int(cur.fetchone()["n"])
 
@@ -55,49 +43,14 @@ def _canonical_signature_from_cols(cols_list, nb_cols: int) -> str:
     return s if s <= m else m
 
 
-def import_bga_moves(moves, rows=9, cols=9, confiance=3):
+def replay_bga_moves(moves, rows=9, cols=9):
     """
-    moves: list of dicts like {"move_id":2, "col":5, "player_id":"3368422"}
-    col is 1..9
+    Rejoue les moves (triés par move_id) avec la couleur réelle de chaque coup.
+    Retourne (game, winning_line) ; s'arrête au premier coup invalide ou à la fin de partie.
     """
-
-    # 1) tri + construction signature (canonical to dedupe mirror games)
     moves = sorted(moves, key=lambda m: int(m.get("move_id", 0)))
-    cols_seq = [int(m["col"]) for m in moves]
-    signature = _canonical_signature_from_cols(cols_seq, cols)
-
-    # 2) éviter doublons
-    existing_pid = find_partie_id_by_signature(signature)
-    if existing_pid is not None:
-        n = count_situations_for_partie(existing_pid)
-        print(f"⚠️ Signature déjà en base (id_partie={existing_pid}, situations={n}). Stop.")
-        return existing_pid
-
-    # 3) créer partie (on fixera rows/cols dans db.create_partie, voir section 3)
-    pid = create_partie(
-        mode="BGA",
-        type_partie="HUMAIN",
-        status="EN_COURS",
-        joueur_depart="R",
-        rows=rows,
-        cols=cols,
-        confiance=confiance,
-        nb_colonnes=cols
-    )
 
-    # 4) set signature (sécurisé)
-    try:
-        update_partie_signature(pid, signature)
-    except errors.UniqueViolation:
-        try:
-            delete_partie(pid)
-        except Exception:
-            pass
-        existing_pid = find_partie_id_by_signature(signature)
-        print(f"⚠️ Signature importée ailleurs, réutilisation id_partie={existing_pid}")
-        return existing_pid
-
-    # 5) Color resolution strategy
+    # Color resolution strategy
     # Preferred: moves already contain "color" (R/J) from gamereview logs.
     # Fallback (old format): map first seen player_id -> R, second -> J.
     pid_to_color = {}
@@ -113,9 +66,7 @@ def import_bga_moves(moves, rows=9, cols=9, confiance=3):
             raise ValueError("Impossible: je ne vois qu'un seul player_id dans les moves")
         pid_to_color = {pids[0]: "R", pids[1]: "J"}
 
-    # 6) rejouer
     game = Connect4Game(rows=rows, cols=cols, starting_player="R")
-    prev_sid = None
     winning_line = None
 
     for i, mv in enumerate(moves, start=1):
@@ -141,27 +92,13 @@ def import_bga_moves(moves, rows=9, cols=9, confiance=3):
         if wl:
             winning_line = wl
 
-        # ✅ INSERT TOUJOURS la situation APRÈS le drop, AVANT de stopper
-        joueur = game.history[-1][2]
-        plateau_txt = board_to_text(game.board)
-
-        sid = insert_situation(
-            id_partie=pid,
-            numero_coup=i,
-            plateau=plateau_txt,
-            joueur=joueur,
-            precedent=None,
-            suivant=None
-        )
-
-        if prev_sid is not None:
-            update_links(prev_sid, sid)
-        prev_sid = sid
-
         if game.game_over:
             break
 
-    # 7) finish_partie (gagnant en CHAR(1))
+    return game, winning_line
+
+
+def _result_fields(game, winning_line):
     if game.result == "Rouge":
         gagnant = "R"
     elif game.result == "Jaune":
@@ -171,15 +108,100 @@ def import_bga_moves(moves, rows=9, cols=9, confiance=3):
     else:
         gagnant = None
 
-    # winning_line -> texte simple (optionnel)
-    ligne_txt = None
-    if winning_line:
-        # ex: [(r,c), ...]
-        ligne_txt = json.dumps(winning_line)
+    # winning_line -> texte simple (optionnel), ex: [(r,c), ...]
+    ligne_txt = json.dumps(winning_line) if winning_line else None
+    status = "TERMINEE" if game.game_over else "EN_COURS"
+    return status, gagnant, ligne_txt
+
+
+def bga_game_rows(moves, rows=9, cols=9, confiance=3):
+    """
+    Partie BGA en mémoire pour db.bulk (même contenu que import_bga_moves).
+    """
+    moves = sorted(moves, key=lambda m: int(m.get("move_id", 0)))
+    signature = _canonical_signature_from_cols([int(m["col"]) for m in moves], cols)
+    game, winning_line = replay_bga_moves(moves, rows, cols)
+    status, gagnant, ligne_txt = _result_fields(game, winning_line)
+    return build_game_rows(
+        game.history, rows, cols, mode="BGA", type_partie="HUMAIN", status=status,
+        joueur_depart="R", joueur_gagnant=gagnant, ligne_gagnante=ligne_txt,
+        confiance=confiance, signature=signature,
+    )
 
+
+def import_bga_batch(games_moves, rows=9, cols=9, confiance=3, batch_size=2000):
+    """
+    Import en masse (COPY) d'une liste de parties BGA (une liste de moves par partie).
+    Les signatures déjà en base sont ignorées. Retourne le nombre de parties insérées.
+    """
+    importer = BulkImporter(batch_size=batch_size)
+    rows_iter = (bga_game_rows(m, rows, cols, confiance) for m in games_moves if m)
+    inserted = importer.ingest(rows_iter)
+    print(f"✅ Import en masse : {inserted} parties insérées, {importer.duplicates} déjà en base")
+    return inserted
+
+
+def import_bga_moves(moves, rows=9, cols=9, confiance=3):
+    """
+    moves: list of dicts like {"move_id":2, "col":5, "player_id":"3368422"}
+    col is 1..9
+    """
+
+    # 1) tri + construction signature (canonical to dedupe mirror games)
+    moves = sorted(moves, key=lambda m: int(m.get("move_id", 0)))
+    cols_seq = [int(m["col"]) for m in moves]
+    signature = _canonical_signature_from_cols(cols_seq, cols)
+
+    # 2) éviter doublons
+    existing_pid = find_partie_id_by_signature(signature)
+    if existing_pid is not None:
+        n = count_situations_for_partie(existing_pid)
+        print(f"⚠️ Signature déjà en base (id_partie={existing_pid}, situations={n}). Stop.")
+        return existing_pid
+
+    # 3) créer partie (on fixera rows/cols dans db.create_partie, voir section 3)
+    pid = create_partie(
+        mode="BGA",
+        type_partie="HUMAIN",
+        status="EN_COURS",
+        joueur_depart="R",
+        rows=rows,
+        cols=cols,
+        confiance=confiance,
+        nb_colonnes=cols
+    )
+
+    # 4) set signature (sécurisé)
+    try:
+        update_partie_signature(pid, signature)
+    except errors.UniqueViolation:
+        try:
+            delete_partie(pid)
+        except Exception:
+            pass
+        existing_pid = find_partie_id_by_signature(signature)
+        print(f"⚠️ Signature importée ailleurs, réutilisation id_partie={existing_pid}")
+        return existing_pid
+
+    # 5) rejouer (couleurs réelles, voir replay_bga_moves)
+    game, winning_line = replay_bga_moves(moves, rows, cols)
+
+    # 6) situations après chaque coup joué (chaînées par finish_partie)
+    board = [[0] * cols for _ in range(rows)]
+    for i, (r, c, joueur) in enumerate(game.history, start=1):
+        board[r][c] = joueur
+        insert_situation(
+            id_partie=pid,
+            numero_coup=i,
+            plateau=board_to_text(board),
+            joueur=joueur,
+        )
+
+    # 7) finish_partie (gagnant en CHAR(1)) + precedent / suivant en une requête
+    status, gagnant, ligne_txt = _result_fields(game, winning_line)
     finish_partie(
         id_partie=pid,
-        status="TERMINEE" if game.game_over else "EN_COURS",
+        status=status,
         joueur_gagnant=gagnant,
         ligne_gagnante=ligne_txt,
         signature=signature
@@ -189,6 +211,13 @@ def import_bga_moves(moves, rows=9, cols=9, confiance=3):
     return pid
 
 if __name__ == "__main__":
-    with open("moves.json", "r", encoding="utf-8") as f:
-        moves = json.load(f)
-    import_bga_moves(moves, rows=9, cols=9, confiance=3)
\ No newline at end of file
+    # python bga_import.py [moves1.json moves2.json ...] : plusieurs fichiers -> import en masse
+    paths = sys.argv[1:] or ["moves.json"]
+    all_moves = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            all_moves.append(json.load(f))
+    if len(all_moves) == 1:
+        import_bga_moves(all_moves[0], rows=9, cols=9, confiance=3)
+    else:
+        import_bga_batch(all_moves, rows=9, cols=9, confiance=3)
\ No newline at end of file
@@ -0,0 +1,143 @@
+# bitboard.py
+"""
+Représentation compacte d'une position de Puissance 4 :
+- un entier par joueur ("R" / "J"), un bit par case
+- la hauteur de chaque colonne
+
+Les colonnes sont rangées les unes après les autres, chacune sur (rows + 1) bits :
+la rangée supplémentaire (sentinelle) reste toujours à 0, ce qui empêche les
+décalages de "déborder" d'une colonne sur la suivante. Un plateau 9x9 tient donc
+sur 9 * 10 = 90 bits.
+
+Bit d'une case (row, col) du plateau liste (row 0 = en haut) :
+    col * (rows + 1) + (rows - 1 - row)
+"""
+
+from transposition import mirror_zobrist_keys, zobrist_keys
+
+_GEOMETRY = {}
+
+
+class BitBoard:
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.h = rows + 1
+        self.bits = {"R": 0, "J": 0}
+        self.heights = [0] * cols
+        self.count = 0   # nombre de pions posés (= ply)
+        # clés Zobrist de la position et de son miroir, mises à jour à chaque play / undo
+        self.zobrist = zobrist_keys(rows, cols)
+        self.mzobrist = mirror_zobrist_keys(rows, cols)
+        self.key = 0
+        self.mkey = 0
+
+        geo = _GEOMETRY.get((rows, cols))
+        if geo is None:
+            geo = _GEOMETRY[(rows, cols)] = self._build_geometry()
+        self.shifts, self.board_mask = geo
+
+    @classmethod
+    def from_board(cls, board, rows, cols):
+        """
+        Construit le bitboard à partir d'un plateau liste [[0|'R'|'J']].
+        """
+        bb = cls(rows, cols)
+        for c in range(cols):
+            for r in range(rows - 1, -1, -1):
+                p = board[r][c]
+                if p == 0:
+                    break
+                idx = bb.bit_index(r, c)
+                bb.bits[p] |= 1 << idx
+                bb.key ^= bb.zobrist[p][idx]
+                bb.mkey ^= bb.mzobrist[p][idx]
+                bb.heights[c] += 1
+                bb.count += 1
+        return bb
+
+    def to_board(self):
+        board = [[0 for _ in range(self.cols)] for _ in range(self.rows)]
+        for r in range(self.rows):
+            for c in range(self.cols):
+                bit = 1 << self.bit_index(r, c)
+                if self.bits["R"] & bit:
+                    board[r][c] = "R"
+                elif self.bits["J"] & bit:
+                    board[r][c] = "J"
+        return board
+
+    def bit_index(self, row, col):
+        return col * self.h + (self.rows - 1 - row)
+
+    # ----------------- coups
+    def can_play(self, col):
+        return self.heights[col] < self.rows
+
+    def valid_cols(self):
+        return [c for c in range(self.cols) if self.heights[c] < self.rows]
+
+    def play(self, col, player):
+        """
+        Pose un pion de 'player' dans 'col' et retourne la ligne (index liste) occupée.
+        """
+        hgt = self.heights[col]
+        idx = col * self.h + hgt
+        self.bits[player] |= 1 << idx
+        self.key ^= self.zobrist[player][idx]
+        self.mkey ^= self.mzobrist[player][idx]
+        self.heights[col] = hgt + 1
+        self.count += 1
+        return self.rows - 1 - hgt
+
+    def undo(self, col, player):
+        hgt = self.heights[col] - 1
+        idx = col * self.h + hgt
+        self.bits[player] &= ~(1 << idx)
+        self.key ^= self.zobrist[player][idx]
+        self.mkey ^= self.mzobrist[player][idx]
+        self.heights[col] = hgt
+        self.count -= 1
+
+    # ----------------- victoire
+    def is_win(self, b):
+        for s in self.shifts:
+            m = b & (b >> s)
+            if m & (m >> (2 * s)):
+                return True
+        return False
+
+    def winner(self):
+        if self.is_win(self.bits["R"]):
+            return "R"
+        if self.is_win(self.bits["J"]):
+            return "J"
+        return None
+
+    def winning_cells(self, player):
+        """
+        Masque des cases vides qui compléteraient un alignement de 4 pour 'player'
+        (jouables ou non).
+        """
+        p = self.bits[player]
+        r = (p << 1) & (p << 2) & (p << 3)
+        for s in self.shifts[1:]:
+            t = (p << s) & (p << (2 * s))
+            r |= t & (p << (3 * s))
+            r |= t & (p >> s)
+            t = (p >> s) & (p >> (2 * s))
+            r |= t & (p << s)
+            r |= t & (p >> (3 * s))
+        return r & (self.board_mask ^ self.bits["R"] ^ self.bits["J"])
+
+    # ----------------- géométrie (partagée par toutes les positions de même taille)
+    def _build_geometry(self):
+        """
+        Décalages de test d'alignement et masque des cases du plateau.
+        """
+        rows, cols, h = self.rows, self.cols, self.h
+        # vertical, horizontal, diagonale /, diagonale \
+        shifts = (1, h, h + 1, h - 1)
+        column = (1 << rows) - 1
+        board_mask = sum(column << (c * h) for c in range(cols))
+        return shifts, board_mask
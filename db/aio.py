@@ -0,0 +1,130 @@
+# db/aio.py
+"""
+Accès PostgreSQL asynchrone (mode ASGI du serveur web, Webapp/asgi.py).
+
+psycopg 3 (psycopg_pool.AsyncConnectionPool) : mêmes paramètres de connexion et
+mêmes requêtes que db.db (paramètres %s / %(nom)s), lignes en dict.
+
+    await open_pool(minconn=2, maxconn=20)
+    async with connection() as conn: ...   # commit à la sortie, rollback sur exception
+    await close_pool()
+"""
+from contextlib import asynccontextmanager
+
+import psycopg
+import psycopg.errors
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from db.compact import COMMIT_MOVE_COMPACT_SQL, check_applied, commit_move_params
+from db.db import (
+    LINK_SITUATIONS_SQL, POOL_MAX, POOL_MIN, POOL_TIMEOUT_S, SITUATION_LINKS,
+    _COMMIT_MOVE_PLY_SQL, _COMMIT_MOVE_SQL, conn_params,
+)
+
+_pool = None
+
+
+def conninfo():
+    params = dict(conn_params())
+    params.pop("cursor_factory", None)
+    return make_conninfo(**params)
+
+
+async def open_pool(minconn=None, maxconn=None, timeout_s=None):
+    global _pool
+    if _pool is not None:
+        return _pool
+    _pool = AsyncConnectionPool(
+        conninfo(),
+        min_size=minconn or POOL_MIN,
+        max_size=maxconn or POOL_MAX,
+        timeout=timeout_s or POOL_TIMEOUT_S,
+        kwargs={"row_factory": dict_row},
+        open=False,
+    )
+    await _pool.open()
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+@asynccontextmanager
+async def connection():
+    if _pool is None:
+        await open_pool()
+    async with _pool.connection() as conn:
+        yield conn
+
+
+def pool_stats():
+    if _pool is None:
+        return None
+    s = _pool.get_stats()
+    return {
+        "min": _pool.min_size,
+        "max": _pool.max_size,
+        "size": s.get("pool_size", 0),
+        "available": s.get("pool_available", 0),
+        "waiting": s.get("requests_waiting", 0),
+        "waited": s.get("requests_queued", 0),
+        "wait_total_ms": s.get("requests_wait_ms", 0),
+        "timeouts": s.get("requests_errors", 0),
+    }
+
+
+async def q_one(sql, params=()):
+    async with connection() as conn, conn.cursor() as cur:
+        await cur.execute(sql, params)
+        return await cur.fetchone()
+
+
+async def commit_move(id_partie, numero_coup, plateau, joueur, precedent=None, signature=None,
+                      status=None, joueur_gagnant=None, ligne_gagnante=None):
+    """
+    Équivalent asynchrone de db.db.commit_move. Retourne l'id_situation.
+    """
+    params = dict(
+        id_partie=id_partie, numero_coup=numero_coup, plateau=plateau, joueur=joueur,
+        precedent=precedent, signature=signature, set_signature=signature is not None,
+        status=status, joueur_gagnant=joueur_gagnant, ligne_gagnante=ligne_gagnante,
+    )
+    try:
+        return await _commit_move(params)
+    except psycopg.errors.UniqueViolation:
+        params["set_signature"] = False
+        return await _commit_move(params)
+
+
+async def _commit_move(params):
+    ply = SITUATION_LINKS == "ply"
+    async with connection() as conn, conn.cursor() as cur:
+        await cur.execute(_COMMIT_MOVE_PLY_SQL if ply else _COMMIT_MOVE_SQL, params)
+        sid = (await cur.fetchone())["id_situation"]
+        if ply and params["status"] is not None:
+            await cur.execute(LINK_SITUATIONS_SQL, {"ids": [params["id_partie"]]})
+        return sid
+
+
+async def commit_move_compact(id_partie, numero_coup, col, joueur, plateau, rows, cols, signature=None,
+                              status=None, joueur_gagnant=None, ligne_gagnante=None):
+    """
+    Équivalent asynchrone de db.compact.commit_move_compact.
+    """
+    params = commit_move_params(id_partie, numero_coup, col, joueur, plateau, rows, cols,
+                                signature, status, joueur_gagnant, ligne_gagnante)
+    try:
+        async with connection() as conn, conn.cursor() as cur:
+            await cur.execute(COMMIT_MOVE_COMPACT_SQL, params)
+            check_applied(await cur.fetchone(), id_partie, numero_coup)
+    except psycopg.errors.UniqueViolation:
+        params["set_signature"] = False
+        async with connection() as conn, conn.cursor() as cur:
+            await cur.execute(COMMIT_MOVE_COMPACT_SQL, params)
+            check_applied(await cur.fetchone(), id_partie, numero_coup)
@@ -0,0 +1,206 @@
+# db/bulk.py
+"""
+Import en masse de parties complètes (fill_random_db, imports BGA).
+
+Au lieu d'un INSERT par situation suivi de deux UPDATE de chaînage, les lignes
+partie / situation sont construites en mémoire avec leurs id déjà réservés
+(nextval sur les séquences, precedent / suivant calculés à l'avance), envoyées
+par COPY FROM STDIN dans des tables temporaires, puis recopiées en une requête :
+
+    INSERT INTO partie ... ON CONFLICT (signature) DO NOTHING RETURNING id_partie
+    -> INSERT INTO situation ... des seules parties insérées
+
+Une partie dont la signature est déjà en base (ou en double dans le lot) est
+ignorée avec ses situations. Un lot = une transaction.
+
+    importer = BulkImporter()
+    inserted = importer.ingest(game_rows_iterable)   # GameRows, voir build_game_rows
+"""
+import io
+
+from db.compact import STORAGE, CompactGame, ensure_compact_table
+from db.db import board_to_text, canonical_signature_from_history, connection
+
+PARTIE_COLS = ("id_partie", "mode", "type_partie", "status", "joueur_depart", "signature",
+               "rows", "cols", "nb_colonnes", "confiance", "joueur_gagnant", "ligne_gagnante")
+SITUATION_COLS = ("id_situation", "id_partie", "numero_coup", "plateau", "joueur", "precedent", "suivant")
+COMPACT_COLS = ("id_partie", "coups", "joueurs", "snapshots")
+
+
+class GameRows:
+    """
+    Une partie à importer : colonnes de partie (sans id) + historique [(row, col, joueur)].
+    """
+    __slots__ = ("partie", "history", "rows", "cols")
+
+    def __init__(self, partie, history, rows, cols):
+        self.partie = partie
+        self.history = history
+        self.rows = rows
+        self.cols = cols
+
+
+def build_game_rows(history, rows, cols, mode, type_partie, status, joueur_depart="R",
+                    joueur_gagnant=None, ligne_gagnante=None, confiance=None, signature=None):
+    """
+    GameRows d'une partie jouée (signature canonique calculée si absente).
+    """
+    if signature is None:
+        signature = canonical_signature_from_history(history, cols)
+    partie = dict(
+        mode=mode, type_partie=type_partie, status=status, joueur_depart=joueur_depart,
+        signature=signature, rows=rows, cols=cols, nb_colonnes=cols, confiance=confiance,
+        joueur_gagnant=joueur_gagnant, ligne_gagnante=ligne_gagnante,
+    )
+    return GameRows(partie, list(history), rows, cols)
+
+
+# ----------------- format texte de COPY
+def _copy_value(v):
+    if v is None:
+        return "\\N"
+    if isinstance(v, (bytes, bytearray, memoryview)):
+        return "\\\\x" + bytes(v).hex()
+    return (str(v).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def _copy_line(values):
+    return "\t".join(_copy_value(v) for v in values) + "\n"
+
+
+def _copy(cur, table, cols, lines):
+    buf = io.StringIO("".join(lines))
+    cur.copy_expert(f"COPY {table} ({', '.join(cols)}) FROM STDIN", buf)
+
+
+def _reserve_ids(cur, table, column, n):
+    if n == 0:
+        return []
+    cur.execute(
+        "SELECT nextval(pg_get_serial_sequence(%s, %s)) AS id FROM generate_series(1, %s)",
+        (table, column, n),
+    )
+    return [int(r["id"]) for r in cur.fetchall()]
+
+
+def situation_lines(id_partie, sids, history, rows, cols):
+    """
+    Lignes COPY des situations d'une partie (sids : un id réservé par coup), chaînées.
+    """
+    board = [[0] * cols for _ in range(rows)]
+    n = len(history)
+    out = []
+    for i, (r, c, p) in enumerate(history):
+        board[r][c] = p
+        out.append(_copy_line((
+            sids[i], id_partie, i + 1, board_to_text(board), p,
+            sids[i - 1] if i > 0 else None,
+            sids[i + 1] if i < n - 1 else None,
+        )))
+    return out
+
+
+class BulkImporter:
+    def __init__(self, batch_size=2000, storage=None):
+        """
+        batch_size : parties par transaction.
+        storage : "text" (situation) ou "compact" (partie_coups) ; par défaut SITUATION_STORAGE.
+        """
+        self.batch_size = batch_size
+        self.storage = storage or STORAGE
+        self.inserted = 0
+        self.duplicates = 0
+        self.situations = 0
+        if self.storage == "compact":
+            ensure_compact_table()
+
+    def ingest(self, games, on_batch=None):
+        """
+        Importe les GameRows de l'itérable par lots. Retourne le nombre de parties insérées.
+        on_batch(inserted, duplicates) est appelé après chaque lot.
+        """
+        total = 0
+        batch = []
+        for g in games:
+            batch.append(g)
+            if len(batch) >= self.batch_size:
+                total += self._ingest_batch(batch)
+                batch = []
+                if on_batch:
+                    on_batch(self.inserted, self.duplicates)
+        if batch:
+            total += self._ingest_batch(batch)
+            if on_batch:
+                on_batch(self.inserted, self.duplicates)
+        return total
+
+    def _ingest_batch(self, batch):
+        # doublons dans le lot : le premier gagne (ceux déjà en base : ON CONFLICT)
+        seen = set()
+        games = []
+        for g in batch:
+            sig = g.partie.get("signature")
+            if sig is not None and sig in seen:
+                continue
+            seen.add(sig)
+            games.append(g)
+        dups = len(batch) - len(games)
+
+        compact = self.storage == "compact"
+        with connection() as conn, conn.cursor() as cur:
+            pids = _reserve_ids(cur, "partie", "id_partie", len(games))
+            n_sit = 0 if compact else sum(len(g.history) for g in games)
+            sids = _reserve_ids(cur, "situation", "id_situation", n_sit)
+            k = 0
+
+            partie_lines, child_lines = [], []
+            for pid, g in zip(pids, games):
+                partie_lines.append(_copy_line([pid] + [g.partie.get(c) for c in PARTIE_COLS[1:]]))
+                if compact:
+                    cg = CompactGame.from_history(g.history, g.rows, g.cols)
+                    child_lines.append(_copy_line((pid, cg.coups, cg.joueurs, cg.snapshots)))
+                else:
+                    n = len(g.history)
+                    child_lines.extend(situation_lines(pid, sids[k:k + n], g.history, g.rows, g.cols))
+                    k += n
+
+            child_table, child_cols = ("partie_coups", COMPACT_COLS) if compact else ("situation", SITUATION_COLS)
+            cur.execute(
+                f"""
+                CREATE TEMP TABLE stage_partie (LIKE partie) ON COMMIT DROP;
+                CREATE TEMP TABLE stage_child (LIKE {child_table}) ON COMMIT DROP;
+                """
+            )
+            _copy(cur, "stage_partie", PARTIE_COLS, partie_lines)
+            _copy(cur, "stage_child", child_cols, child_lines)
+
+            pcols = ", ".join(PARTIE_COLS)
+            ccols = ", ".join(child_cols)
+            cur.execute(
+                f"""
+                WITH ins AS (
+                    INSERT INTO partie ({pcols})
+                    SELECT {pcols} FROM stage_partie
+                    ON CONFLICT (signature) DO NOTHING
+                    RETURNING id_partie
+                ), child AS (
+                    INSERT INTO {child_table} ({ccols})
+                    SELECT {", ".join("s." + c for c in child_cols)}
+                    FROM stage_child s JOIN ins USING (id_partie)
+                    RETURNING 1
+                )
+                SELECT (SELECT count(*) FROM ins) AS parties, (SELECT count(*) FROM child) AS lignes;
+                """
+            )
+            row = cur.fetchone()
+
+        inserted = int(row["parties"])
+        self.inserted += inserted
+        self.duplicates += dups + len(games) - inserted
+        if not compact:
+            self.situations += int(row["lignes"])
+        return inserted
+
+    def stats(self):
+        return {"inserted": self.inserted, "duplicates": self.duplicates, "situations": self.situations}
@@ -0,0 +1,272 @@
+# db/compact.py
+"""
+Stockage compact des parties : au lieu d'une ligne situation par coup (plateau
+texte complet, ~90 octets), une ligne partie_coups par partie :
+
+- coups : colonnes jouées dans l'ordre réel (1..cols), "4453..." ;
+- joueurs : couleur de chaque coup ("RJRJ..."), BGA pouvant inverser les couleurs ;
+- snapshots : le plateau tous les SNAPSHOT_EVERY coups, en bitboards packés
+  (2 entiers de cols * (rows + 1) bits : 24 octets en 9x9), concaténés.
+
+N'importe quel coup se reconstruit depuis le snapshot précédent en rejouant au
+plus SNAPSHOT_EVERY - 1 coups.
+
+Un coup = un caractère dans coups : MAX_COLS colonnes au plus (au-delà, garder
+le stockage texte). Un coup qui ne suit pas le dernier coup stocké (ligne
+partie_coups absente ou en retard) lève CompactSyncError au lieu d'être perdu.
+
+SITUATION_STORAGE=compact fait écrire les nouveaux coups du serveur web dans
+partie_coups au lieu de situation ; migrate_compact.py convertit les parties existantes.
+"""
+import os
+
+import psycopg2.errors
+
+from bitboard import BitBoard
+from db.db import connection
+
+SNAPSHOT_EVERY = 8
+MAX_COLS = 9   # une colonne par caractère (1..9)
+STORAGE = os.getenv("SITUATION_STORAGE", "text")   # "text" (situation) ou "compact"
+
+DDL_PARTIE_COUPS = """
+CREATE TABLE IF NOT EXISTS partie_coups (
+    id_partie INTEGER PRIMARY KEY REFERENCES partie(id_partie) ON DELETE CASCADE,
+    coups TEXT NOT NULL DEFAULT '',
+    joueurs TEXT NOT NULL DEFAULT '',
+    snapshots BYTEA NOT NULL DEFAULT ''::bytea
+);
+"""
+
+# un coup : ajouté seulement si la partie en a exactement numero_coup - 1 (rejouer un coup est sans effet).
+# applied : lignes écrites ; stored : nombre de coups avant la requête (NULL si pas de ligne)
+COMMIT_MOVE_COMPACT_SQL = """
+WITH mv AS (
+    INSERT INTO partie_coups (id_partie, coups, joueurs, snapshots)
+    SELECT %(id_partie)s::integer, %(coup)s::text, %(joueur)s::text, COALESCE(%(snapshot)s::bytea, ''::bytea)
+    WHERE %(numero_coup)s::integer = 1
+    ON CONFLICT (id_partie) DO NOTHING
+    RETURNING 1
+), upd AS (
+    UPDATE partie_coups SET
+        coups = coups || %(coup)s::text,
+        joueurs = joueurs || %(joueur)s::text,
+        snapshots = snapshots || COALESCE(%(snapshot)s::bytea, ''::bytea)
+    WHERE id_partie = %(id_partie)s::integer AND %(numero_coup)s::integer > 1
+      AND length(coups) = %(numero_coup)s::integer - 1
+    RETURNING 1
+), part AS (
+    UPDATE partie SET
+        signature = CASE WHEN %(set_signature)s::boolean THEN %(signature)s::text ELSE signature END,
+        status = COALESCE(%(status)s::text, status),
+        joueur_gagnant = COALESCE(%(joueur_gagnant)s::text, joueur_gagnant),
+        ligne_gagnante = COALESCE(%(ligne_gagnante)s::text, ligne_gagnante)
+    WHERE id_partie = %(id_partie)s::integer
+)
+SELECT (SELECT count(*) FROM mv) + (SELECT count(*) FROM upd) AS applied,
+       (SELECT length(coups) FROM partie_coups WHERE id_partie = %(id_partie)s::integer) AS stored;
+"""
+
+# coups stockés par partie, pour vérifier un lot écrit avec execute_batch
+COMPACT_LENGTHS_SQL = """
+SELECT id_partie, length(coups) AS stored FROM partie_coups WHERE id_partie = ANY(%(ids)s::integer[])
+"""
+
+
+class CompactSyncError(Exception):
+    """
+    Coup non ajouté : la partie n'a pas de ligne partie_coups ou pas les coups précédents.
+    """
+
+
+def check_cols(cols):
+    if cols > MAX_COLS:
+        raise ValueError(f"stockage compact : {MAX_COLS} colonnes au plus (ici {cols})")
+
+
+def check_applied(row, id_partie, numero_coup):
+    """
+    row : résultat de COMMIT_MOVE_COMPACT_SQL. Un coup déjà stocké (rejoué) n'est pas une erreur.
+    """
+    if row["applied"] or (row["stored"] or 0) >= numero_coup:
+        return
+    raise CompactSyncError(
+        f"partie {id_partie} : coup {numero_coup} non ajouté "
+        f"({'pas de ligne partie_coups' if row['stored'] is None else str(row['stored']) + ' coups stockés'})"
+    )
+
+
+def check_lengths(rows, recs):
+    """
+    Après un lot : chaque partie doit avoir au moins son dernier numéro de coup du lot.
+    Les coups d'une partie sont ajoutés dans l'ordre, donc un trou bloque les suivants.
+    """
+    stored = {r["id_partie"]: r["stored"] for r in rows}
+    last = {}
+    for rec in recs:
+        last[rec["id_partie"]] = max(last.get(rec["id_partie"], 0), rec["numero_coup"])
+    for pid, n in last.items():
+        if (stored.get(pid) or 0) < n:
+            raise CompactSyncError(f"partie {pid} : {stored.get(pid)} coups stockés, {n} attendus")
+
+
+def snapshot_size(rows, cols):
+    return 2 * ((cols * (rows + 1) + 7) // 8)
+
+
+def pack_board(board, rows, cols):
+    bb = BitBoard.from_board(board, rows, cols)
+    n = snapshot_size(rows, cols) // 2
+    return bb.bits["R"].to_bytes(n, "little") + bb.bits["J"].to_bytes(n, "little")
+
+
+def unpack_board(data, rows, cols):
+    n = snapshot_size(rows, cols) // 2
+    bb = BitBoard(rows, cols)
+    bb.bits["R"] = int.from_bytes(data[:n], "little")
+    bb.bits["J"] = int.from_bytes(data[n:2 * n], "little")
+    return bb.to_board()
+
+
+def parse_plateau(plateau, rows, cols):
+    lines = (plateau or "").strip().splitlines()
+    board = [[0] * cols for _ in range(rows)]
+    for r, line in enumerate(lines[:rows]):
+        for c, ch in enumerate(line.strip()[:cols]):
+            if ch in ("R", "J"):
+                board[r][c] = ch
+    return board
+
+
+def snapshot_for(numero_coup, plateau, rows, cols):
+    """
+    Snapshot à stocker avec le coup numero_coup (plateau texte après le coup), ou None.
+    """
+    if numero_coup % SNAPSHOT_EVERY:
+        return None
+    return pack_board(parse_plateau(plateau, rows, cols), rows, cols)
+
+
+class CompactGame:
+    def __init__(self, rows, cols, coups="", joueurs="", snapshots=b""):
+        check_cols(cols)
+        self.rows = rows
+        self.cols = cols
+        self.coups = coups
+        self.joueurs = joueurs
+        self.snapshots = bytes(snapshots or b"")
+
+    def __len__(self):
+        return len(self.coups)
+
+    @classmethod
+    def from_history(cls, history, rows, cols):
+        """
+        history : [(row, col, joueur)] dans l'ordre joué.
+        """
+        g = cls(rows, cols)
+        board = [[0] * cols for _ in range(rows)]
+        snaps = []
+        for i, (r, c, p) in enumerate(history, start=1):
+            board[r][c] = p
+            g.coups += str(c + 1)
+            g.joueurs += p
+            if i % SNAPSHOT_EVERY == 0:
+                snaps.append(pack_board(board, rows, cols))
+        g.snapshots = b"".join(snaps)
+        return g
+
+    def history(self, upto=None):
+        """
+        [(row, col, joueur)] des 'upto' premiers coups (tous par défaut).
+        """
+        heights = [0] * self.cols
+        out = []
+        for ch, p in zip(self.coups[:upto], self.joueurs[:upto]):
+            c = int(ch) - 1
+            out.append((self.rows - 1 - heights[c], c, p))
+            heights[c] += 1
+        return out
+
+    def board_at(self, ply):
+        """
+        Plateau après 'ply' coups : snapshot précédent + au plus SNAPSHOT_EVERY - 1 coups rejoués.
+        """
+        ply = max(0, min(ply, len(self.coups)))
+        size = snapshot_size(self.rows, self.cols)
+        k = min(ply // SNAPSHOT_EVERY, len(self.snapshots) // size)
+        if k:
+            board = unpack_board(self.snapshots[(k - 1) * size:k * size], self.rows, self.cols)
+        else:
+            board = [[0] * self.cols for _ in range(self.rows)]
+
+        heights = [self.rows] * self.cols
+        for c in range(self.cols):
+            for r in range(self.rows):
+                if board[r][c] != 0:
+                    heights[c] = r
+                    break
+        for i in range(k * SNAPSHOT_EVERY, ply):
+            c = int(self.coups[i]) - 1
+            heights[c] -= 1
+            board[heights[c]][c] = self.joueurs[i]
+        return board
+
+
+def ensure_compact_table():
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(DDL_PARTIE_COUPS)
+
+
+LOAD_COMPACT_SQL = """
+SELECT pc.coups, pc.joueurs, pc.snapshots, p.rows, p.cols
+FROM partie_coups pc JOIN partie p USING (id_partie)
+WHERE pc.id_partie = %s
+"""
+
+
+def compact_from_row(row):
+    if row is None:
+        return None
+    return CompactGame(row["rows"] or 9, row["cols"] or 9,
+                       row["coups"], row["joueurs"], row["snapshots"])
+
+
+def load_compact(id_partie):
+    """
+    CompactGame de la partie, ou None si elle n'est pas en stockage compact.
+    """
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(LOAD_COMPACT_SQL, (id_partie,))
+        return compact_from_row(cur.fetchone())
+
+
+def commit_move_params(id_partie, numero_coup, col, joueur, plateau, rows, cols, signature=None,
+                       status=None, joueur_gagnant=None, ligne_gagnante=None, set_signature=True):
+    check_cols(cols)
+    snap = snapshot_for(numero_coup, plateau, rows, cols)
+    return dict(
+        id_partie=id_partie, numero_coup=numero_coup, coup=str(col + 1), joueur=joueur,
+        snapshot=snap, signature=signature,
+        set_signature=set_signature and signature is not None,
+        status=status, joueur_gagnant=joueur_gagnant, ligne_gagnante=ligne_gagnante,
+    )
+
+
+def commit_move_compact(id_partie, numero_coup, col, joueur, plateau, rows, cols, signature=None,
+                        status=None, joueur_gagnant=None, ligne_gagnante=None):
+    """
+    Équivalent de db.db.commit_move en stockage compact (une requête, une transaction).
+    Lève CompactSyncError si le coup ne suit pas les coups stockés.
+    """
+    params = commit_move_params(id_partie, numero_coup, col, joueur, plateau, rows, cols,
+                                signature, status, joueur_gagnant, ligne_gagnante)
+    try:
+        with connection() as conn, conn.cursor() as cur:
+            cur.execute(COMMIT_MOVE_COMPACT_SQL, params)
+            check_applied(cur.fetchone(), id_partie, numero_coup)
+    except psycopg2.errors.UniqueViolation:
+        params["set_signature"] = False
+        with connection() as conn, conn.cursor() as cur:
+            cur.execute(COMMIT_MOVE_COMPACT_SQL, params)
+            check_applied(cur.fetchone(), id_partie, numero_coup)
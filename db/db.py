@@ -1,19 +1,91 @@
 import os
+import threading
 import psycopg2
+import psycopg2.errors
 from psycopg2.extras import RealDictCursor
 
-def get_conn():
-    host = os.getenv("PGHOST", "localhost")
-    port = int(os.getenv("PGPORT", "5432"))
-    dbname = os.getenv("PGDATABASE", "Connect4DB")  # ✅ ton nom exact
-    user = os.getenv("PGUSER", "postgres")
-    password = os.getenv("Celina123")  # set via env; can be None if local trust auth  # mets en variable d'env si tu veux
-
-    return psycopg2.connect(
-        host=host, port=port, dbname=dbname, user=user, password=password,
-        cursor_factory=RealDictCursor
+from db.pool import ConnectionPool
+
+# taille du pool de connexions (par processus) et attente max d'une connexion libre
+POOL_MIN = int(os.getenv("PGPOOL_MIN", "1"))
+POOL_MAX = int(os.getenv("PGPOOL_MAX", "10"))
+POOL_TIMEOUT_S = float(os.getenv("PGPOOL_TIMEOUT", "10"))
+
+# chaînage precedent / suivant des situations :
+# "stored" : mis à jour à chaque coup ;
+# "ply" : aucune écriture par coup, index unique (id_partie, numero_coup), liens posés
+#         en une requête à la fin de la partie (link_situations) ou lus dans la vue situation_liens
+SITUATION_LINKS = os.getenv("SITUATION_LINKS", "stored")
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def conn_params():
+    return dict(
+        host=os.getenv("PGHOST", "localhost"),
+        port=int(os.getenv("PGPORT", "5432")),
+        dbname=os.getenv("PGDATABASE", "Connect4DB"),  # ✅ ton nom exact
+        user=os.getenv("PGUSER", "postgres"),
+        password=os.getenv("PGPASSWORD", "Celina123"),  # mets en variable d'env si tu veux
+        cursor_factory=RealDictCursor,
     )
 
+
+def get_conn():
+    """
+    Connexion dédiée, hors pool (à fermer par l'appelant).
+    """
+    return psycopg2.connect(**conn_params())
+
+
+def configure_pool(minconn=None, maxconn=None, timeout_s=None):
+    """
+    (Re)crée le pool du processus avec ces tailles (None = valeur actuelle).
+    """
+    global _pool, POOL_MIN, POOL_MAX, POOL_TIMEOUT_S
+    with _pool_lock:
+        if minconn is not None:
+            POOL_MIN = minconn
+        if maxconn is not None:
+            POOL_MAX = maxconn
+        if timeout_s is not None:
+            POOL_TIMEOUT_S = timeout_s
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close()
+        _pool = None
+
+
+def get_pool():
+    global _pool, _pool_pid
+    pool = _pool
+    # un processus fils (fork / pool de processus) ne réutilise pas les sockets du parent
+    if pool is not None and _pool_pid == os.getpid():
+        return pool
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ConnectionPool(POOL_MIN, POOL_MAX, timeout_s=POOL_TIMEOUT_S, **conn_params())
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def connection():
+    """
+    with connection() as conn : connexion du pool, commit à la sortie du bloc
+    (rollback sur exception), puis rendue au pool.
+    """
+    return get_pool().connection()
+
+
+def pool_stats():
+    """
+    Compteurs du pool : connexions prises, attentes (nombre, total / max en ms), abandons.
+    """
+    if _pool is None or _pool_pid != os.getpid():
+        return None
+    return _pool.stats()
+
 def board_to_text(board):
     return "\n".join("".join(str(x) for x in row) for row in board)
 
@@ -44,14 +116,10 @@ def create_partie(mode, type_partie, status, joueur_depart, rows=None, cols=None
     RETURNING id_partie;
     """
 
-    conn = get_conn()
-    try:
-        with conn, conn.cursor() as cur:
-            cur.execute(sql, tuple(vals))
-            pid = cur.fetchone()["id_partie"]
-            return pid
-    finally:
-        conn.close()
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(sql, tuple(vals))
+        pid = cur.fetchone()["id_partie"]
+        return pid
 
 
 
@@ -61,43 +129,162 @@ def insert_situation(id_partie, numero_coup, plateau, joueur, precedent=None, su
     VALUES (%s, %s, %s, %s, %s, %s)
     RETURNING id_situation;
     """
-    conn = get_conn()
-    try:
-        with conn, conn.cursor() as cur:
-            cur.execute(sql, (id_partie, numero_coup, plateau, joueur, precedent, suivant))
-            return cur.fetchone()["id_situation"]
-    finally:
-        conn.close()
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(sql, (id_partie, numero_coup, plateau, joueur, precedent, suivant))
+        return cur.fetchone()["id_situation"]
 
 def update_links(precedent_id, suivant_id):
-    conn = get_conn()
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute("UPDATE situation SET suivant=%s WHERE id_situation=%s;", (suivant_id, precedent_id))
+        cur.execute("UPDATE situation SET precedent=%s WHERE id_situation=%s;", (precedent_id, suivant_id))
+
+# un coup = une requête : situation + chaînage + signature (+ fin de partie)
+# paramètres typés explicitement : requêtes partagées avec psycopg 3 (db/aio.py), dont les
+# paramètres liés côté serveur (NULL notamment) n'ont pas de type déduit du texte
+_COMMIT_MOVE_SQL = """
+WITH ins AS (
+    INSERT INTO situation (id_partie, numero_coup, plateau, joueur, precedent, suivant)
+    VALUES (%(id_partie)s::integer, %(numero_coup)s::integer, %(plateau)s::text, %(joueur)s::text,
+            %(precedent)s::integer, NULL)
+    RETURNING id_situation
+), link AS (
+    UPDATE situation SET suivant = (SELECT id_situation FROM ins)
+    WHERE id_situation = %(precedent)s::integer
+), part AS (
+    UPDATE partie SET
+        signature = CASE WHEN %(set_signature)s::boolean THEN %(signature)s::text ELSE signature END,
+        status = COALESCE(%(status)s::text, status),
+        joueur_gagnant = COALESCE(%(joueur_gagnant)s::text, joueur_gagnant),
+        ligne_gagnante = COALESCE(%(ligne_gagnante)s::text, ligne_gagnante)
+    WHERE id_partie = %(id_partie)s::integer
+)
+SELECT id_situation FROM ins;
+"""
+
+# SITUATION_LINKS=ply : ni precedent ni UPDATE de la situation précédente
+_COMMIT_MOVE_PLY_SQL = """
+WITH ins AS (
+    INSERT INTO situation (id_partie, numero_coup, plateau, joueur)
+    VALUES (%(id_partie)s::integer, %(numero_coup)s::integer, %(plateau)s::text, %(joueur)s::text)
+    RETURNING id_situation
+), part AS (
+    UPDATE partie SET
+        signature = CASE WHEN %(set_signature)s::boolean THEN %(signature)s::text ELSE signature END,
+        status = COALESCE(%(status)s::text, status),
+        joueur_gagnant = COALESCE(%(joueur_gagnant)s::text, joueur_gagnant),
+        ligne_gagnante = COALESCE(%(ligne_gagnante)s::text, ligne_gagnante)
+    WHERE id_partie = %(id_partie)s::integer
+)
+SELECT id_situation FROM ins;
+"""
+
+# liens de toutes les situations des parties %(ids)s en une requête (seules les lignes à changer)
+LINK_SITUATIONS_SQL = """
+UPDATE situation s SET precedent = l.precedent, suivant = l.suivant
+FROM (
+    SELECT id_situation,
+           lag(id_situation) OVER w AS precedent,
+           lead(id_situation) OVER w AS suivant
+    FROM situation
+    WHERE id_partie = ANY(%(ids)s::integer[])
+    WINDOW w AS (PARTITION BY id_partie ORDER BY numero_coup)
+) l
+WHERE s.id_situation = l.id_situation
+  AND (s.precedent IS DISTINCT FROM l.precedent OR s.suivant IS DISTINCT FROM l.suivant);
+"""
+
+DDL_SITUATION_PLY = """
+CREATE UNIQUE INDEX IF NOT EXISTS situation_partie_coup ON situation (id_partie, numero_coup);
+CREATE OR REPLACE VIEW situation_liens AS
+SELECT s.*,
+       lag(id_situation) OVER w AS precedent_calcule,
+       lead(id_situation) OVER w AS suivant_calcule
+FROM situation s
+WINDOW w AS (PARTITION BY id_partie ORDER BY numero_coup);
+"""
+
+
+def commit_move(id_partie, numero_coup, plateau, joueur, precedent=None, signature=None,
+                status=None, joueur_gagnant=None, ligne_gagnante=None):
+    """
+    Enregistre un coup en une transaction et un aller-retour : nouvelle situation
+    (chaînée à 'precedent', sauf SITUATION_LINKS=ply), signature de la partie et, si
+    status est donné, fin de partie. Si la signature est déjà prise par une autre partie, le coup est quand
+    même enregistré, sans changer la signature. Retourne l'id_situation.
+    """
+    params = dict(
+        id_partie=id_partie, numero_coup=numero_coup, plateau=plateau, joueur=joueur,
+        precedent=precedent, signature=signature, set_signature=signature is not None,
+        status=status, joueur_gagnant=joueur_gagnant, ligne_gagnante=ligne_gagnante,
+    )
+    sql = _COMMIT_MOVE_PLY_SQL if SITUATION_LINKS == "ply" else _COMMIT_MOVE_SQL
     try:
-        with conn, conn.cursor() as cur:
-            cur.execute("UPDATE situation SET suivant=%s WHERE id_situation=%s;", (suivant_id, precedent_id))
-            cur.execute("UPDATE situation SET precedent=%s WHERE id_situation=%s;", (precedent_id, suivant_id))
-    finally:
-        conn.close()
+        return _commit_move(sql, params)
+    except psycopg2.errors.UniqueViolation:
+        params["set_signature"] = False
+        return _commit_move(sql, params)
+
+
+def _commit_move(sql, params):
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(sql, params)
+        sid = cur.fetchone()["id_situation"]
+        if SITUATION_LINKS == "ply" and params["status"] is not None:
+            cur.execute(LINK_SITUATIONS_SQL, {"ids": [params["id_partie"]]})
+        return sid
+
+
+def link_situations(ids):
+    """
+    Pose precedent / suivant des situations de ces parties, en une requête.
+    """
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(LINK_SITUATIONS_SQL, {"ids": list(ids)})
+        return cur.rowcount
+
+
+def has_ply_index():
+    """
+    L'index unique (id_partie, numero_coup) du mode ply existe-t-il déjà ?
+    """
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('situation_partie_coup') IS NOT NULL AS ok")
+        return cur.fetchone()["ok"]
+
+
+def ensure_ply_index():
+    """
+    Index unique (id_partie, numero_coup) et vue situation_liens (liens calculés à la lecture).
+    """
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT id_partie, numero_coup FROM situation
+            GROUP BY id_partie, numero_coup HAVING count(*) > 1 LIMIT 5
+            """
+        )
+        dups = cur.fetchall()
+        if dups:
+            raise ValueError(f"situations en double (id_partie, numero_coup) : {[tuple(d.values()) for d in dups]}")
+        cur.execute(DDL_SITUATION_PLY)
+
 
 def finish_partie(id_partie, status, joueur_gagnant=None, ligne_gagnante=None, signature=None):
+    """
+    Fin de partie ; les liens precedent / suivant de ses situations sont posés dans la même transaction.
+    """
     sql = """
     UPDATE partie
     SET status=%s, joueur_gagnant=%s, ligne_gagnante=%s, signature=%s
     WHERE id_partie=%s;
     """
-    conn = get_conn()
-    try:
-        with conn, conn.cursor() as cur:
-            cur.execute(sql, (status, joueur_gagnant, ligne_gagnante, signature, id_partie))
-    finally:
-        conn.close()
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(sql, (status, joueur_gagnant, ligne_gagnante, signature, id_partie))
+        cur.execute(LINK_SITUATIONS_SQL, {"ids": [id_partie]})
 
 def delete_partie(id_partie):
-    conn = get_conn()
-    try:
-        with conn, conn.cursor() as cur:
-            cur.execute("DELETE FROM partie WHERE id_partie=%s;", (id_partie,))
-    finally:
-        conn.close()
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute("DELETE FROM partie WHERE id_partie=%s;", (id_partie,))
 
 def mirror_moves_signature(sig: str, cols: int) -> str:
     # sig contient des colonnes en 1..cols
@@ -123,12 +310,8 @@ def update_partie_signature(id_partie, signature):
     SET signature=%s
     WHERE id_partie=%s;
     """
-    conn = get_conn()
-    try:
-        with conn, conn.cursor() as cur:
-            cur.execute(sql, (signature, id_partie))
-    finally:
-        conn.close()
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(sql, (signature, id_partie))
 
 
 def canonical_signature_from_moves(moves, cols: int) -> str:
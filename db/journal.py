@@ -0,0 +1,361 @@
+# db/journal.py
+"""
+Enregistrement différé des coups (write-behind).
+
+append() écrit le coup sur une ligne JSON d'un journal local (ajout seulement,
+flush à chaque coup) puis le met dans une file : l'appelant n'attend pas la base.
+Un thread écrit la file par lots dans situation / partie, une transaction par lot,
+et note dans '<journal>.done' le dernier numéro de coup enregistré. Quand tout est
+enregistré, le journal est vidé.
+
+Au démarrage (start), les coups du journal qui ne sont pas dans '.done' sont
+remis en tête de file : rien n'est perdu si le processus s'arrête avant que la
+file soit vide. L'écriture est idempotente (un coup déjà présent pour
+(id_partie, numero_coup) n'est pas réinséré), un coup rejoué deux fois est sans effet.
+
+La situation précédente est retrouvée en base par (id_partie, numero_coup - 1) :
+l'appelant n'a pas besoin de connaître les id_situation.
+"""
+import json
+import os
+import queue
+import threading
+import time
+
+import psycopg2
+import psycopg2.errors
+from psycopg2.extras import execute_batch
+
+from db.compact import (COMMIT_MOVE_COMPACT_SQL, COMPACT_LENGTHS_SQL, CompactSyncError, check_applied,
+                        check_cols, check_lengths, commit_move_params)
+from db.db import LINK_SITUATIONS_SQL, SITUATION_LINKS, connection
+from db.pool import PoolTimeout
+
+# même effet que db.db.commit_move, sans id_situation connu à l'avance
+_JOURNAL_MOVE_SQL = """
+WITH prev AS (
+    SELECT id_situation FROM situation
+    WHERE id_partie = %(id_partie)s AND numero_coup = %(numero_coup)s - 1
+    ORDER BY id_situation DESC
+    LIMIT 1
+), ins AS (
+    INSERT INTO situation (id_partie, numero_coup, plateau, joueur, precedent, suivant)
+    SELECT %(id_partie)s, %(numero_coup)s, %(plateau)s, %(joueur)s, (SELECT id_situation FROM prev), NULL
+    WHERE NOT EXISTS (
+        SELECT 1 FROM situation WHERE id_partie = %(id_partie)s AND numero_coup = %(numero_coup)s
+    )
+    RETURNING id_situation
+), link AS (
+    UPDATE situation SET suivant = ins.id_situation
+    FROM ins
+    WHERE situation.id_situation = (SELECT id_situation FROM prev)
+), part AS (
+    UPDATE partie SET
+        signature = CASE WHEN %(set_signature)s THEN %(signature)s ELSE signature END,
+        status = COALESCE(%(status)s, status),
+        joueur_gagnant = COALESCE(%(joueur_gagnant)s, joueur_gagnant),
+        ligne_gagnante = COALESCE(%(ligne_gagnante)s, ligne_gagnante)
+    WHERE id_partie = %(id_partie)s
+)
+SELECT 1;
+"""
+
+# SITUATION_LINKS=ply : sans chaînage, l'index unique (id_partie, numero_coup) rend l'insertion idempotente
+_JOURNAL_MOVE_PLY_SQL = """
+WITH ins AS (
+    INSERT INTO situation (id_partie, numero_coup, plateau, joueur)
+    VALUES (%(id_partie)s, %(numero_coup)s, %(plateau)s, %(joueur)s)
+    ON CONFLICT (id_partie, numero_coup) DO NOTHING
+), part AS (
+    UPDATE partie SET
+        signature = CASE WHEN %(set_signature)s THEN %(signature)s ELSE signature END,
+        status = COALESCE(%(status)s, status),
+        joueur_gagnant = COALESCE(%(joueur_gagnant)s, joueur_gagnant),
+        ligne_gagnante = COALESCE(%(ligne_gagnante)s, ligne_gagnante)
+    WHERE id_partie = %(id_partie)s
+)
+SELECT 1;
+"""
+
+_FIELDS = ("id_partie", "numero_coup", "plateau", "joueur", "signature",
+           "status", "joueur_gagnant", "ligne_gagnante")
+
+# base injoignable : le lot reste dans la file et on réessaie plus tard
+_RETRY_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError, PoolTimeout)
+
+
+def _params(rec, set_signature=True):
+    p = {k: rec.get(k) for k in _FIELDS}
+    p["set_signature"] = set_signature and rec.get("signature") is not None
+    return p
+
+
+def _compact_params(rec, rows, cols, set_signature=True):
+    return commit_move_params(
+        rec["id_partie"], rec["numero_coup"], rec["col"], rec["joueur"], rec["plateau"],
+        rows, cols, signature=rec.get("signature"), status=rec.get("status"),
+        joueur_gagnant=rec.get("joueur_gagnant"), ligne_gagnante=rec.get("ligne_gagnante"),
+        set_signature=set_signature,
+    )
+
+
+def _delete_partie(cur, id_partie):
+    cur.execute("DELETE FROM situation WHERE id_partie=%s;", (id_partie,))
+    cur.execute("DELETE FROM partie WHERE id_partie=%s;", (id_partie,))
+
+
+class MoveJournal:
+    def __init__(self, path, batch_size=200, flush_interval_s=0.2, retry_s=2.0, fsync=False,
+                 storage="text", rows=9, cols=9):
+        """
+        batch_size : coups max par transaction.
+        flush_interval_s : attente max avant d'écrire un lot incomplet.
+        fsync : forcer l'écriture disque du journal à chaque coup (plus sûr, plus lent).
+        storage : "text" (une ligne situation par coup) ou "compact" (partie_coups, voir
+                  db/compact.py ; les coups doivent alors avoir leur colonne 'col').
+        """
+        self.path = str(path)
+        self.done_path = self.path + ".done"
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.retry_s = retry_s
+        self.fsync = fsync
+        self.storage = storage
+        self.rows = rows
+        self.cols = cols
+        if storage == "compact":
+            check_cols(cols)
+            self._sql = COMMIT_MOVE_COMPACT_SQL
+            self._params = lambda rec, set_signature=True: _compact_params(rec, rows, cols, set_signature)
+        else:
+            self._sql = _JOURNAL_MOVE_PLY_SQL if SITUATION_LINKS == "ply" else _JOURNAL_MOVE_SQL
+            self._params = _params
+        # liens precedent / suivant posés une fois, avec le coup qui termine la partie
+        self._link_at_end = storage != "compact" and SITUATION_LINKS == "ply"
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()        # fichier journal + numérotation
+        self._idle = threading.Condition()   # attente de flush()
+        self._pending = 0
+        self._seq = 0
+        self._done_seq = 0
+        self._dropped = set()                # parties supprimées (signature en double)
+        self._file = None
+        self._thread = None
+        self._stop = threading.Event()
+
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.errors = 0
+
+    # ----------------- démarrage / arrêt
+    def start(self):
+        """
+        Lance l'écriture de fond, en commençant par les coups du journal pas encore
+        enregistrés (arrêt précédent). Retourne leur nombre ; flush() attend qu'ils soient en base.
+        """
+        pending = self._read_pending()
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._truncate_if_idle()
+
+        with self._idle:
+            self._pending += len(pending)
+        for rec in pending:
+            self._queue.put(rec)
+
+        self._thread = threading.Thread(target=self._run, name="move-journal", daemon=True)
+        self._thread.start()
+        return len(pending)
+
+    def close(self, timeout=10.0):
+        self.flush(timeout)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _read_pending(self):
+        try:
+            with open(self.done_path, encoding="utf-8") as f:
+                self._done_seq = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            self._done_seq = 0
+
+        pending = []
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        break   # dernière ligne tronquée (arrêt pendant l'écriture)
+                    self._seq = max(self._seq, rec["seq"])
+                    if rec["seq"] > self._done_seq:
+                        pending.append(rec)
+        except OSError:
+            pass
+        self._seq = max(self._seq, self._done_seq)
+        return pending
+
+    # ----------------- côté joueur
+    def append(self, id_partie, numero_coup, plateau, joueur, signature=None,
+               status=None, joueur_gagnant=None, ligne_gagnante=None, on_conflict="keep", col=None):
+        """
+        Enregistre un coup sans attendre la base. on_conflict : que faire si la signature
+        est déjà prise par une autre partie ("keep" : garder la partie sans changer
+        sa signature, "delete" : supprimer la partie courante). col : colonne jouée (0..cols-1).
+        """
+        rec = dict(
+            id_partie=id_partie, numero_coup=numero_coup, plateau=plateau, joueur=joueur, col=col,
+            signature=signature, status=status, joueur_gagnant=joueur_gagnant,
+            ligne_gagnante=ligne_gagnante, on_conflict=on_conflict,
+        )
+        with self._lock:
+            self._seq += 1
+            rec["seq"] = self._seq
+            self._file.write(json.dumps(rec, separators=(",", ":")) + "\n")
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            # dans l'ordre des seq : _mark_done(dernier seq du lot) ne saute aucun coup
+            with self._idle:
+                self._pending += 1
+            self._queue.put(rec)
+
+    def flush(self, timeout=None):
+        """
+        Attend que tous les coups de la file soient en base. Retourne False si timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._pending:
+                left = None if deadline is None else deadline - time.monotonic()
+                if left is not None and left <= 0:
+                    return False
+                self._idle.wait(left)
+        return True
+
+    def stats(self):
+        return {
+            "pending": self._pending,
+            "written": self.written,
+            "batches": self.batches,
+            "retries": self.retries,
+            "errors": self.errors,
+        }
+
+    # ----------------- écriture de fond
+    def _run(self):
+        batch = []
+        while not (self._stop.is_set() and not batch and self._queue.empty()):
+            try:
+                if not batch:
+                    batch.append(self._queue.get(timeout=self.flush_interval_s))
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if not batch:
+                continue
+
+            try:
+                self._write_batch(batch)
+            except _RETRY_ERRORS:
+                self.retries += 1
+                time.sleep(self.retry_s)
+                continue   # même lot au prochain tour
+
+            self._mark_done(batch[-1]["seq"])
+            with self._idle:
+                self._pending -= len(batch)
+                if not self._pending:
+                    self._idle.notify_all()
+            batch = []
+            self._truncate_if_idle()
+
+    def _write_batch(self, batch):
+        recs = [r for r in batch if r["id_partie"] not in self._dropped]
+        if recs:
+            try:
+                with connection() as conn, conn.cursor() as cur:
+                    execute_batch(cur, self._sql, [self._params(r) for r in recs])
+                    if self.storage == "compact":
+                        cur.execute(COMPACT_LENGTHS_SQL, {"ids": sorted({r["id_partie"] for r in recs})})
+                        check_lengths(cur.fetchall(), recs)
+                    self._link_finished(cur, recs)
+                written = len(recs)
+            except _RETRY_ERRORS:
+                raise
+            except (psycopg2.Error, CompactSyncError):
+                # signature en double (ou coup invalide) : coup par coup
+                written = self._write_one_by_one(recs)
+            self.written += written
+        self.batches += 1
+
+    def _write_one_by_one(self, recs):
+        """
+        Retourne le nombre de coups enregistrés (hors erreurs et parties supprimées).
+        """
+        written = 0
+        for rec in recs:
+            if rec["id_partie"] in self._dropped:
+                continue
+            try:
+                written += self._write_one(rec)
+            except _RETRY_ERRORS:
+                raise
+            except (psycopg2.Error, CompactSyncError) as e:
+                # y compris l'échec du second essai après une signature en double
+                self.errors += 1
+                print("Journal : coup non enregistré", rec.get("id_partie"), rec.get("numero_coup"), e)
+        return written
+
+    def _write_one(self, rec):
+        """
+        1 si le coup est enregistré, 0 si sa partie a été supprimée (signature en double).
+        """
+        try:
+            with connection() as conn, conn.cursor() as cur:
+                self._execute_one(cur, rec)
+        except psycopg2.errors.UniqueViolation:
+            with connection() as conn, conn.cursor() as cur:
+                if rec.get("on_conflict") == "delete":
+                    _delete_partie(cur, rec["id_partie"])
+                    self._dropped.add(rec["id_partie"])
+                    return 0
+                self._execute_one(cur, rec, set_signature=False)
+        return 1
+
+    def _execute_one(self, cur, rec, set_signature=True):
+        cur.execute(self._sql, self._params(rec, set_signature=set_signature))
+        if self.storage == "compact":
+            check_applied(cur.fetchone(), rec["id_partie"], rec["numero_coup"])
+        self._link_finished(cur, [rec])
+
+    def _link_finished(self, cur, recs):
+        if not self._link_at_end:
+            return
+        ids = sorted({r["id_partie"] for r in recs if r.get("status") is not None})
+        if ids:
+            cur.execute(LINK_SITUATIONS_SQL, {"ids": ids})
+
+    def _mark_done(self, seq):
+        self._done_seq = seq
+        tmp = self.done_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(str(seq))
+        os.replace(tmp, self.done_path)
+
+    def _truncate_if_idle(self):
+        """
+        Tout est en base : on repart d'un journal vide (la numérotation continue).
+        """
+        with self._lock:
+            if self._done_seq < self._seq:
+                return
+            if self._file is not None:
+                self._file.truncate(0)
@@ -0,0 +1,93 @@
+# db/pool.py
+"""
+Pool de connexions PostgreSQL partagé par les threads d'un processus.
+
+psycopg2.pool.ThreadedConnectionPool lève une erreur quand toutes les connexions
+sont prises : ici un sémaphore fait attendre le thread (au plus timeout_s) et
+l'attente est mesurée (nombre d'attentes, temps total / max, abandons).
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from psycopg2 import pool as pg_pool
+
+
+class PoolTimeout(Exception):
+    """Aucune connexion libérée pendant timeout_s."""
+
+
+class ConnectionPool:
+    def __init__(self, minconn, maxconn, timeout_s=10.0, **conn_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout_s = timeout_s
+        self._pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, **conn_kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+
+        self.in_use = 0
+        self.acquired = 0
+        self.waited = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+        self.timeouts = 0
+
+    def getconn(self):
+        if not self._slots.acquire(blocking=False):
+            t0 = time.perf_counter()
+            ok = self._slots.acquire(timeout=self.timeout_s)
+            wait = time.perf_counter() - t0
+            with self._lock:
+                self.waited += 1
+                self.wait_total_s += wait
+                self.wait_max_s = max(self.wait_max_s, wait)
+                if not ok:
+                    self.timeouts += 1
+            if not ok:
+                raise PoolTimeout(f"aucune connexion libre après {self.timeout_s:.1f}s")
+
+        try:
+            conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.in_use += 1
+            self.acquired += 1
+        return conn
+
+    def putconn(self, conn):
+        # connexion cassée (serveur redémarré, etc.) : on ne la remet pas dans le pool
+        self._pool.putconn(conn, close=bool(conn.closed))
+        with self._lock:
+            self.in_use -= 1
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        Connexion du pool le temps du bloc : commit à la sortie, rollback sur exception.
+        """
+        conn = self.getconn()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self.putconn(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "min": self.minconn,
+                "max": self.maxconn,
+                "in_use": self.in_use,
+                "acquired": self.acquired,
+                "waited": self.waited,
+                "wait_total_ms": round(self.wait_total_s * 1000.0, 1),
+                "wait_max_ms": round(self.wait_max_s * 1000.0, 1),
+                "timeouts": self.timeouts,
+            }
+
+    def close(self):
+        self._pool.closeall()
@@ -0,0 +1,108 @@
+# db/positions.py
+"""
+Index des positions : situation.cle_position identifie le plateau d'une situation
+et le joueur qui doit jouer, au miroir gauche-droite près. Deux parties arrivées
+à la même position par des ordres de coups différents ont la même clé.
+
+La colonne est calculée par PostgreSQL (colonne générée, fonction position_canonique) :
+tous les écrivains de situation (coups web, journal, COPY, imports) la remplissent
+sans changement, et l'ajout de la colonne remplit les lignes existantes.
+
+    python -m db.positions           # ajoute la colonne et son index (réécrit la table une fois)
+
+    games_through(board, "J")        # [(id_partie, numero_coup)] : parties passées par cette position
+    position_hash(board, "J")        # même clé calculée en Python
+
+Les parties en stockage compact (partie_coups) n'ont pas de lignes situation et
+ne sont pas indexées.
+"""
+import hashlib
+import time
+import uuid
+
+from db.db import connection
+
+# plateau texte (lignes séparées par des retours à la ligne, "." ou "0" = vide) et
+# joueur qui vient de jouer -> md5 du plus petit des deux plateaux (normal / miroir)
+# suivi du joueur qui doit jouer
+DDL_POSITION_FUNCTION = r"""
+CREATE OR REPLACE FUNCTION position_canonique(plateau TEXT, joueur TEXT) RETURNS UUID
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT md5(LEAST(b COLLATE "C", m COLLATE "C") || ':' || CASE WHEN joueur = 'R' THEN 'J' ELSE 'R' END)::uuid
+    FROM (
+        SELECT string_agg(l, '/' ORDER BY i) AS b, string_agg(reverse(l), '/' ORDER BY i) AS m
+        FROM unnest(regexp_split_to_array(translate(btrim(plateau, E' \r\n'), '.', '0'), '\s+'))
+             WITH ORDINALITY AS t(l, i)
+    ) s
+$$;
+"""
+
+DDL_POSITION_COLUMN = """
+ALTER TABLE situation ADD COLUMN IF NOT EXISTS cle_position UUID
+    GENERATED ALWAYS AS (position_canonique(plateau, joueur)) STORED;
+"""
+
+DDL_POSITION_INDEX = """
+CREATE INDEX IF NOT EXISTS situation_cle_position ON situation (cle_position, id_partie, numero_coup);
+"""
+
+
+def position_hash(board, player):
+    """
+    Clé de la position (plateau liste de listes, 'player' = joueur qui doit jouer),
+    identique à situation.cle_position.
+    """
+    b = "/".join("".join(str(x) for x in row) for row in board)
+    m = "/".join("".join(str(x) for x in reversed(row)) for row in board)
+    return str(uuid.UUID(hashlib.md5(f"{min(b, m)}:{player}".encode()).hexdigest()))
+
+
+def has_position_column():
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'situation' AND column_name = 'cle_position'
+            """
+        )
+        return cur.fetchone() is not None
+
+
+def ensure_position_column():
+    """
+    Fonction, colonne générée et index. Sur une table existante, l'ajout de la
+    colonne réécrit situation (verrou exclusif le temps du calcul).
+    """
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(DDL_POSITION_FUNCTION)
+        cur.execute(DDL_POSITION_COLUMN)
+        cur.execute(DDL_POSITION_INDEX)
+
+
+def games_through(board, player, limit=500):
+    """
+    [(id_partie, numero_coup)] des parties passées par la position (ou son miroir),
+    'player' étant le joueur qui doit jouer.
+    """
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT DISTINCT ON (id_partie) id_partie, numero_coup
+            FROM situation
+            WHERE cle_position = %s
+            ORDER BY id_partie DESC, numero_coup
+            LIMIT %s
+            """,
+            (position_hash(board, player), limit),
+        )
+        return [(int(r["id_partie"]), int(r["numero_coup"])) for r in cur.fetchall()]
+
+
+if __name__ == "__main__":
+    t0 = time.perf_counter()
+    ensure_position_column()
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT count(*) AS n, count(DISTINCT cle_position) AS positions FROM situation")
+        row = cur.fetchone()
+    print(f"✅ {row['n']} situations, {row['positions']} positions distinctes "
+          f"({time.perf_counter() - t0:.1f}s)")
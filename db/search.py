@@ -0,0 +1,86 @@
+# db/search.py
+"""
+Recherche de parties (explorateur) : id exact ou signature, par pages.
+
+- index sur partie.signature : trigrammes (pg_trgm, recherche "contient") si
+  l'extension est disponible, sinon B-tree text_pattern_ops (recherche "commence par") ;
+- pagination par clé : la page suivante part du dernier id affiché
+  (WHERE id_partie < dernier ORDER BY id_partie DESC), sans OFFSET.
+
+    mode = ensure_search_indexes()                 # une fois (CREATE INDEX IF NOT EXISTS)
+    rows, after = search_parties("4455", mode=mode)
+    rows, after = search_parties("4455", after=after, mode=mode)   # page suivante, None à la fin
+
+    python -m db.search            # crée les index
+"""
+import psycopg2
+
+from db.db import connection
+
+PAGE_SIZE = 200
+
+DDL_TRGM = "CREATE INDEX IF NOT EXISTS partie_signature_trgm ON partie USING gin (signature gin_trgm_ops)"
+DDL_PREFIX = "CREATE INDEX IF NOT EXISTS partie_signature_prefix ON partie (signature text_pattern_ops)"
+
+SEARCH_COLUMNS = "id_partie, mode, status, type_partie, signature"
+
+
+def ensure_search_indexes():
+    """
+    Crée l'index de recherche sur les signatures. Retourne "trgm" ou "prefix".
+    """
+    try:
+        with connection() as conn, conn.cursor() as cur:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cur.execute(DDL_TRGM)
+        return "trgm"
+    except psycopg2.Error:
+        # extension absente ou droits insuffisants
+        with connection() as conn, conn.cursor() as cur:
+            cur.execute(DDL_PREFIX)
+        return "prefix"
+
+
+def _like_escape(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_sql(term, mode="prefix"):
+    """
+    (where, params) pour un terme : id exact si le terme est un nombre, ou signature.
+    """
+    term = (term or "").strip()
+    if not term:
+        return "TRUE", {}
+    pattern = _like_escape(term) + "%"
+    if mode == "trgm":
+        pattern = "%" + pattern
+    params = {"pattern": pattern, "id": int(term) if term.isdigit() and len(term) < 10 else None}
+    return "(id_partie = %(id)s OR signature LIKE %(pattern)s)", params
+
+
+def search_parties(term="", after=None, limit=PAGE_SIZE, mode="prefix"):
+    """
+    Une page de parties (id décroissant) après l'id 'after'.
+    Retourne (lignes, after de la page suivante ou None s'il n'y en a plus).
+    """
+    where, params = search_sql(term, mode)
+    params.update(after=after, limit=limit)
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT {SEARCH_COLUMNS}
+            FROM partie
+            WHERE {where} AND (%(after)s::int IS NULL OR id_partie < %(after)s::int)
+            ORDER BY id_partie DESC
+            LIMIT %(limit)s
+            """,
+            params,
+        )
+        rows = cur.fetchall()
+    next_after = int(rows[-1]["id_partie"]) if len(rows) == limit else None
+    return rows, next_after
+
+
+if __name__ == "__main__":
+    print(f"Index de recherche : {ensure_search_indexes()}")
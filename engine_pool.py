@@ -0,0 +1,130 @@
+# engine_pool.py
+"""
+Moteurs de recherche par partie, partagés entre les threads du serveur web.
+
+Chaque partie active a son propre MinimaxAI (et donc sa table de transposition) :
+les appels successifs (coup de l'IA, indice) d'une même partie réutilisent les
+résultats des recherches précédentes, sans interférer avec les autres parties.
+
+- un verrou par partie : deux requêtes sur la même partie cherchent l'une après
+  l'autre, des parties différentes en même temps ;
+- au plus max_games moteurs : au-delà, la partie utilisée le moins récemment est
+  évincée ; une partie inactive depuis idle_s secondes l'est aussi, et release()
+  libère tout de suite le moteur d'une partie terminée ;
+- la recherche parallèle (profondeur >= min_depth) utilise un seul pool de
+  processus pour toutes les parties ; chaque processus y garde un moteur par
+  partie (au plus worker_games), comme les recherches en série.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from ai import MinimaxAI
+from parallel_search import ParallelSearch, make_pool
+
+
+class _GameEngine:
+    def __init__(self, search):
+        self.search = search
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+
+class EnginePool:
+    def __init__(self, rows, cols, tt_mb=8, max_games=16, idle_s=900,
+                 book=None, workers=1, min_depth=6, worker_tt_mb=8, worker_games=4):
+        """
+        tt_mb : table de transposition de chaque partie.
+        workers : processus de la recherche parallèle (None = nombre de coeurs, 1 = aucun).
+        worker_tt_mb, worker_games : table de chaque partie dans un processus de recherche,
+        et nombre de parties gardées par processus (mémoire : workers * worker_games * worker_tt_mb).
+        """
+        self.rows = rows
+        self.cols = cols
+        self.tt_mb = tt_mb
+        self.max_games = max_games
+        self.idle_s = idle_s
+        self.book = book
+        self.workers = workers or os.cpu_count() or 1
+        self.min_depth = min_depth
+        self.worker_tt_mb = worker_tt_mb
+        self.worker_games = worker_games
+
+        self._games = OrderedDict()   # game_id -> _GameEngine, du moins au plus récent
+        self._lock = threading.Lock()
+        self._pool = None
+        self.created = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._games)
+
+    def _new_engine(self, game_id):
+        if self.workers > 1 and self._pool is None:
+            self._pool = make_pool(self.workers)
+        engine = MinimaxAI(self.rows, self.cols, tt_mb=self.tt_mb, book=self.book)
+        search = ParallelSearch(engine, workers=self.workers, min_depth=self.min_depth,
+                                tt_mb=self.worker_tt_mb, pool=self._pool, key=game_id,
+                                worker_games=self.worker_games)
+        self.created += 1
+        return _GameEngine(search)
+
+    def _evict_locked(self, now):
+        idle = [gid for gid, e in self._games.items()
+                if now - e.last_used > self.idle_s and not e.lock.locked()]
+        for gid in idle:
+            del self._games[gid]
+        self.evicted += len(idle)
+        while len(self._games) > self.max_games:
+            self._games.popitem(last=False)
+            self.evicted += 1
+
+    def acquire(self, game_id):
+        """
+        Moteur de la partie (créé au besoin), marqué comme le plus récemment utilisé.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._games.get(game_id)
+            if entry is None:
+                entry = self._games[game_id] = self._new_engine(game_id)
+            else:
+                self._games.move_to_end(game_id)
+            entry.last_used = now
+            self._evict_locked(now)
+        return entry
+
+    def search(self, game_id, board, ai_player, max_depth, time_ms=None):
+        """
+        Même contrat que MinimaxAI.search, avec le moteur de la partie game_id.
+        """
+        entry = self.acquire(game_id)
+        with entry.lock:
+            result = entry.search.search(board, ai_player, max_depth, time_ms=time_ms)
+            entry.last_used = time.monotonic()
+        return result
+
+    def release(self, game_id):
+        """
+        Partie terminée : son moteur (et sa table) est libéré.
+        """
+        with self._lock:
+            if self._games.pop(game_id, None) is not None:
+                self.evicted += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "games": len(self._games),
+                "created": self.created,
+                "evicted": self.evicted,
+                "tt_mb": self.tt_mb,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            self._games.clear()
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,154 @@
+# evaluation.py
+"""
+Heuristique du minimax (fenêtres de 4 cases + colonne centrale), en version
+incrémentale : chaque fenêtre garde son nombre de pions R / J et le score total
+est mis à jour quand un pion est posé ou retiré, au lieu d'être recalculé.
+"""
+
+
+def window_score(ai, op, empty):
+    """
+    Score d'une fenêtre de 4 cases selon le nombre de pions IA / adverses / vides.
+    """
+    if ai > 0 and op > 0:
+        return 0
+    if ai == 4:
+        return 100000
+    if op == 4:
+        return -100000
+    if ai == 3 and empty == 1:
+        return 80
+    if ai == 2 and empty == 2:
+        return 10
+    if op == 3 and empty == 1:
+        return -90
+    if op == 2 and empty == 2:
+        return -12
+    return 0
+
+
+# WINDOW_SCORES[ai * 5 + op] (fenêtres de 4 cases)
+WINDOW_SCORES = tuple(
+    window_score(ai, op, 4 - ai - op) if ai + op <= 4 else 0
+    for ai in range(5) for op in range(5)
+)
+
+CENTER_BONUS = 6
+
+# Une fenêtre est codée par k = nb_R * 5 + nb_J.
+# Variation du score vu par R / par J quand R (k -> k + 5) ou J (k -> k + 1) pose dans la fenêtre.
+_SCORE_R = WINDOW_SCORES
+_SCORE_J = tuple(WINDOW_SCORES[(k % 5) * 5 + k // 5] for k in range(25))
+_DELTAS = {
+    "R": (
+        tuple(_SCORE_R[k + 5] - _SCORE_R[k] if k + 5 < 25 else 0 for k in range(25)),
+        tuple(_SCORE_J[k + 5] - _SCORE_J[k] if k + 5 < 25 else 0 for k in range(25)),
+        5,
+    ),
+    "J": (
+        tuple(_SCORE_R[k + 1] - _SCORE_R[k] if k % 5 < 4 else 0 for k in range(25)),
+        tuple(_SCORE_J[k + 1] - _SCORE_J[k] if k % 5 < 4 else 0 for k in range(25)),
+        1,
+    ),
+}
+
+_CELL_WINDOWS = {}
+
+
+def cell_windows(rows, cols):
+    """
+    Pour chaque case (index r * cols + c), la liste des fenêtres de 4 qui la contiennent.
+    Retourne (nb_fenetres, liste par case). Mis en cache par taille de plateau.
+    """
+    key = (rows, cols)
+    cached = _CELL_WINDOWS.get(key)
+    if cached is not None:
+        return cached
+
+    per_cell = [[] for _ in range(rows * cols)]
+    n = 0
+    for r in range(rows):
+        for c in range(cols):
+            for dr, dc in ((0, 1), (1, 0), (1, 1), (-1, 1)):
+                er, ec = r + 3 * dr, c + 3 * dc
+                if not (0 <= er < rows and 0 <= ec < cols):
+                    continue
+                for i in range(4):
+                    per_cell[(r + i * dr) * cols + (c + i * dc)].append(n)
+                n += 1
+
+    cached = _CELL_WINDOWS[key] = (n, [tuple(w) for w in per_cell])
+    return cached
+
+
+class IncrementalEval:
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.center = cols // 2
+        n, self.cell_windows = cell_windows(rows, cols)
+        self.counts = [0] * n
+        # score du point de vue de R et du point de vue de J
+        self.total = {"R": 0, "J": 0}
+
+    @classmethod
+    def from_board(cls, board, rows, cols):
+        ev = cls(rows, cols)
+        for r in range(rows):
+            for c in range(cols):
+                p = board[r][c]
+                if p != 0:
+                    ev.play(r, c, p)
+        return ev
+
+    def play(self, row, col, player):
+        d_r, d_j, step = _DELTAS[player]
+        counts = self.counts
+        sr = sj = 0
+        for w in self.cell_windows[row * self.cols + col]:
+            k = counts[w]
+            sr += d_r[k]
+            sj += d_j[k]
+            counts[w] = k + step
+
+        total = self.total
+        total["R"] += sr
+        total["J"] += sj
+        if col == self.center:
+            total[player] += CENTER_BONUS
+
+    def undo(self, row, col, player):
+        d_r, d_j, step = _DELTAS[player]
+        counts = self.counts
+        sr = sj = 0
+        for w in self.cell_windows[row * self.cols + col]:
+            k = counts[w] - step
+            sr += d_r[k]
+            sj += d_j[k]
+            counts[w] = k
+
+        total = self.total
+        total["R"] -= sr
+        total["J"] -= sj
+        if col == self.center:
+            total[player] -= CENTER_BONUS
+
+    def gain(self, row, col, player, viewer):
+        """
+        Variation de total[viewer] si 'player' posait en (row, col), sans poser le pion.
+        """
+        d_r, d_j, _step = _DELTAS[player]
+        d = d_r if viewer == "R" else d_j
+        counts = self.counts
+        s = 0
+        for w in self.cell_windows[row * self.cols + col]:
+            s += d[counts[w]]
+        if col == self.center and player == viewer:
+            s += CENTER_BONUS
+        return s
+
+    def score(self, ai_player):
+        """
+        Même valeur que MinimaxAI.heuristic(board, ai_player).
+        """
+        return self.total[ai_player]
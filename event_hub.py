@@ -0,0 +1,128 @@
+# event_hub.py
+"""
+Diffusion des changements d'une partie aux navigateurs abonnés (serveur web,
+Server-Sent Events) : un abonné = une file d'évènements. publish() ne fait rien
+s'il n'y a pas d'abonné ; un abonné trop lent (file pleine) est déconnecté et
+recharge l'état complet en se reconnectant.
+
+Serveur asyncio (Webapp/asgi.py) : subscribe(game_id, AsyncSubscriber(loop)) ;
+publish() peut alors être appelé depuis n'importe quel thread.
+"""
+import asyncio
+import json
+import queue
+import threading
+
+
+class EventHub:
+    def __init__(self, max_queue=64):
+        self.max_queue = max_queue
+        self._subs = {}              # game_id -> [queue.Queue]
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, game_id, q=None):
+        """
+        q : file de l'abonné (queue.Queue bornée par défaut, ou AsyncSubscriber).
+        """
+        q = queue.Queue(self.max_queue) if q is None else q
+        with self._lock:
+            self._subs.setdefault(game_id, []).append(q)
+        return q
+
+    def unsubscribe(self, game_id, q):
+        with self._lock:
+            subs = self._subs.get(game_id)
+            if subs is None:
+                return
+            if q in subs:
+                subs.remove(q)
+            if not subs:
+                del self._subs[game_id]
+
+    def publish(self, game_id, event, data):
+        with self._lock:
+            subs = list(self._subs.get(game_id, ()))
+        if not subs:
+            return 0
+        msg = format_event(event, data)
+        for q in subs:
+            try:
+                q.put_nowait(msg)
+            except queue.Full:
+                self.dropped += 1
+                self.unsubscribe(game_id, q)
+                _close(q)
+        self.published += 1
+        return len(subs)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "games": len(self._subs),
+                "subscribers": sum(len(s) for s in self._subs.values()),
+                "published": self.published,
+                "dropped": self.dropped,
+            }
+
+
+class AsyncSubscriber:
+    """
+    File asyncio d'un abonné, remplie depuis n'importe quel thread ; None = fin du flux.
+    """
+
+    def __init__(self, loop, max_queue=64):
+        self.loop = loop
+        self.max_queue = max_queue
+        self.queue = asyncio.Queue()
+        self._size = 0                 # messages envoyés pas encore lus (mise en file différée)
+        self._lock = threading.Lock()
+
+    def put_nowait(self, msg):
+        with self._lock:
+            if self._size >= self.max_queue:
+                raise queue.Full
+            self._size += 1
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, msg)
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+
+    async def get(self, timeout):
+        """
+        Message suivant, ou "" après timeout secondes sans évènement.
+        """
+        try:
+            msg = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return ""
+        if msg is not None:
+            with self._lock:
+                self._size -= 1
+        return msg
+
+
+def _close(q):
+    """
+    Vide la file et y met None : fin du flux pour cet abonné.
+    """
+    if isinstance(q, AsyncSubscriber):
+        q.close()
+        return
+    try:
+        while True:
+            q.get_nowait()
+    except queue.Empty:
+        pass
+    try:
+        q.put_nowait(None)
+    except queue.Full:
+        pass
+
+
+def format_event(event, data):
+    """
+    Message SSE : 'event: <nom>' + une ligne 'data:' JSON.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
@@ -7,7 +7,6 @@ import traceback
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from psycopg2 import IntegrityError
 
@@ -15,6 +14,11 @@ from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 
 from bga_puppet import import_table_id_connect4
+from db.db import connection, link_situations
+from db.compact import load_compact
+from db.positions import games_through
+from db.search import PAGE_SIZE, SEARCH_COLUMNS, ensure_search_indexes, search_parties
+from signature_index import SignatureIndex, load_index
 
 # ✅ Debug console (errors + logs)
 DEBUG = True
@@ -24,19 +28,8 @@ DEBUG = True
 # DB helpers
 # ============================================================
 
-def get_conn():
-    host = os.getenv("PGHOST", "localhost")
-    port = int(os.getenv("PGPORT", "5432"))
-    dbname = os.getenv("PGDATABASE", "Connect4DB")
-    user = os.getenv("PGUSER", "postgres")
-    password = os.getenv("PGPASSWORD", "Celina123")
-    return psycopg2.connect(
-        host=host, port=port, dbname=dbname, user=user, password=password,
-        cursor_factory=RealDictCursor
-    )
-
 def q_all(sql, params=None):
-    with get_conn() as conn:
+    with connection() as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute(sql, params or ())
             return cur.fetchall()
@@ -46,10 +39,9 @@ def q_one(sql, params=None):
     return rows[0] if rows else None
 
 def exec_sql(sql, params=None):
-    with get_conn() as conn:
+    with connection() as conn:
         with conn.cursor() as cur:
             cur.execute(sql, params or ())
-            conn.commit()
 
 
 # ============================================================
@@ -156,6 +148,28 @@ def replay_from_signature(sig: str, rows: int, cols: int, starting_player: str):
     return board, hist, player
 
 
+def signature_is_mirrored(sig: str, situations, rows: int, cols: int) -> bool:
+    """
+    La signature stockée (canonique) est-elle le miroir des coups des plateaux stockés ?
+    Décidé au premier coup dont les cases occupées ne sont pas symétriques.
+    """
+    try:
+        _board, hist, _player = replay_from_signature(sig, rows, cols, "R")
+    except ValueError:
+        return False
+    plateaux = {st.get("numero_coup"): st.get("plateau") for st in situations}
+    filled = set()
+    for i, (r, c, _p) in enumerate(hist, start=1):
+        filled.add((r, c))
+        mirrored = {(rr, cols - 1 - cc) for rr, cc in filled}
+        if mirrored == filled or plateaux.get(i) is None:
+            continue
+        board = parse_board_text(plateaux[i], rows, cols)
+        stored = {(rr, cc) for rr in range(rows) for cc in range(cols) if board[rr][cc] != 0}
+        return stored == mirrored
+    return False
+
+
 # ============================================================
 # UI: Explorer
 # ============================================================
@@ -183,11 +197,33 @@ class DBExplorer(tk.Toplevel):
 
         self.current_partie_id = None
         self.situations = []
+        self.compact = None
         self.current_idx = 0
         self.show_mirror = tk.BooleanVar(value=False)
         self._ignore_scale_callback = False
         self._last_canvas_size = (0, 0)
 
+        # recherche paginée : terme affiché, id de départ de la page suivante (None = fin)
+        self.search_mode = "prefix"
+        self._search_term = ""
+        self._next_after = None
+        self._loading = False
+        try:
+            self.search_mode = ensure_search_indexes()
+        except Exception:
+            if DEBUG:
+                traceback.print_exc()
+
+        # explorateur d'ouvertures : fichier signature_index.json, sinon construit depuis la base
+        self.moves = ""
+        self.signature_index = load_index(self.rows, self.cols)
+        if self.signature_index is None:
+            try:
+                self.signature_index = SignatureIndex.from_db(self.rows, self.cols)
+            except Exception:
+                if DEBUG:
+                    traceback.print_exc()
+
         self._build_ui()
         self.refresh_parties()
 
@@ -226,6 +262,11 @@ class DBExplorer(tk.Toplevel):
         self.parties_tree.grid(row=2, column=0, sticky="nsew")
         self.parties_tree.bind("<<TreeviewSelect>>", self._on_select_partie)
 
+        # page suivante chargée quand le bas de la liste devient visible
+        self.parties_scroll = ttk.Scrollbar(left, orient="vertical", command=self.parties_tree.yview)
+        self.parties_scroll.grid(row=2, column=1, sticky="ns")
+        self.parties_tree.configure(yscrollcommand=self._on_parties_scroll)
+
         ttk.Separator(left).grid(row=3, column=0, sticky="ew", pady=8)
         ttk.Button(left, text="Importer une partie (.txt)", command=self.import_partie_from_filename).grid(
             row=4, column=0, sticky="ew"
@@ -255,6 +296,8 @@ class DBExplorer(tk.Toplevel):
         self.details_var = tk.StringVar(value="Sélectionne une partie à gauche.")
         ttk.Label(details, text="Détails", font=("Segoe UI", 11, "bold")).grid(row=0, column=0, sticky="w")
         ttk.Label(details, textvariable=self.details_var, justify="left").grid(row=1, column=0, sticky="w")
+        self.openings_var = tk.StringVar(value="")
+        ttk.Label(details, textvariable=self.openings_var, justify="left").grid(row=1, column=1, sticky="nw", padx=(24, 0))
 
         toggles = ttk.Frame(right)
         toggles.grid(row=1, column=0, sticky="ew", pady=(6, 6))
@@ -279,6 +322,9 @@ class DBExplorer(tk.Toplevel):
 
         self.step_label = ttk.Label(controls, text="coup: - / -")
         self.step_label.pack(side="left")
+        ttk.Button(controls, text="Parties par cette position", command=self.show_games_through).pack(
+            side="left", padx=(12, 0)
+        )
 
         nav = ttk.Frame(controls)
         nav.pack(side="right")
@@ -302,27 +348,20 @@ class DBExplorer(tk.Toplevel):
         for item in self.parties_tree.get_children():
             self.parties_tree.delete(item)
 
-        term = (self.search_var.get() or "").strip()
-        if term:
-            rows = q_all(
-                """
-                SELECT id_partie, mode, status, type_partie, signature
-                FROM partie
-                WHERE CAST(id_partie AS TEXT) LIKE %s OR COALESCE(signature,'') ILIKE %s
-                ORDER BY id_partie DESC
-                LIMIT 200
-                """,
-                (f"%{term}%", f"%{term}%"),
-            )
-        else:
-            rows = q_all(
-                """
-                SELECT id_partie, mode, status, type_partie, signature
-                FROM partie
-                ORDER BY id_partie DESC
-                LIMIT 200
-                """
+        self._search_term = (self.search_var.get() or "").strip()
+        self._next_after = None
+        self.load_more_parties(first=True)
+
+    def load_more_parties(self, first=False):
+        if self._loading or (self._next_after is None and not first):
+            return
+        self._loading = True
+        try:
+            rows, self._next_after = search_parties(
+                self._search_term, after=self._next_after, limit=PAGE_SIZE, mode=self.search_mode
             )
+        finally:
+            self._loading = False
 
         for r in rows:
             self.parties_tree.insert(
@@ -336,6 +375,47 @@ class DBExplorer(tk.Toplevel):
                 )
             )
 
+    def show_games_through(self):
+        """
+        Liste de gauche = parties passées par la position affichée (tous ordres de coups, miroir compris).
+        """
+        if not self.situations:
+            return
+        st = self.situations[self.current_idx]
+        board = self._current_board()
+        player = "R" if st.get("joueur") == "J" else "J"
+        try:
+            found = games_through(board, player)
+        except Exception as e:
+            messagebox.showerror("Erreur", f"Recherche par position échouée (python -m db.positions ?):\n{e}")
+            return
+
+        ids = [pid for pid, _numero in found]
+        rows = q_all(
+            f"SELECT {SEARCH_COLUMNS} FROM partie WHERE id_partie = ANY(%s) ORDER BY id_partie DESC",
+            (ids,),
+        ) if ids else []
+        for item in self.parties_tree.get_children():
+            self.parties_tree.delete(item)
+        self._next_after = None
+        for r in rows:
+            self.parties_tree.insert(
+                "", "end",
+                values=(r["id_partie"], r.get("mode"), r.get("status"), r.get("type_partie"),
+                        (r.get("signature") or "")[:30]),
+            )
+        self.openings_var.set(f"{len(rows)} parties passées par cette position")
+
+    def _on_parties_scroll(self, first, last):
+        self.parties_scroll.set(first, last)
+        if self._next_after is not None and float(last) >= 0.9 and not self._loading:
+            self._loading = True     # une seule page en attente
+            self.after_idle(self._load_next_page)
+
+    def _load_next_page(self):
+        self._loading = False
+        self.load_more_parties()
+
     def _on_select_partie(self, _evt=None):
         sel = self.parties_tree.selection()
         if not sel:
@@ -358,18 +438,34 @@ class DBExplorer(tk.Toplevel):
         if not partie:
             raise ValueError(f"Partie {id_partie} introuvable")
 
-        self.situations = q_all(
-            """
-            SELECT id_situation, numero_coup, plateau, joueur
-            FROM situation
-            WHERE id_partie=%s
-            ORDER BY numero_coup ASC
-            """,
-            (id_partie,),
-        )
+        # stockage compact (partie_coups) : plateaux reconstruits à l'affichage
+        self.compact = load_compact(id_partie)
+        if self.compact is not None:
+            self.situations = [
+                {"id_situation": None, "numero_coup": i, "plateau": None, "joueur": p}
+                for i, (_r, _c, p) in enumerate(self.compact.history(), start=1)
+            ]
+        else:
+            self.situations = q_all(
+                """
+                SELECT id_situation, numero_coup, plateau, joueur
+                FROM situation
+                WHERE id_partie=%s
+                ORDER BY numero_coup ASC
+                """,
+                (id_partie,),
+            )
 
         sig = partie.get("signature") or ""
         msig = mirror_moves_signature(sig, self.cols) if sig else ""
+        # coups dans l'orientation des plateaux affichés : l'index est interrogé avec
+        # le préfixe canonique et next_moves remet les colonnes dans cette orientation
+        if self.compact is not None:
+            self.moves = "".join(str(c + 1) for (_r, c, _p) in self.compact.history())
+        else:
+            self.moves = sanitize_signature(sig)
+            if signature_is_mirrored(self.moves, self.situations, self.rows, self.cols):
+                self.moves = mirror_moves_signature(self.moves, self.cols)
         self.details_var.set(
             f"id_partie: {id_partie}\n"
             f"mode: {partie.get('mode')}\n"
@@ -448,7 +544,7 @@ class DBExplorer(tk.Toplevel):
             return
 
         st = self.situations[self.current_idx]
-        board = parse_board_text(st.get("plateau"), self.rows, self.cols)
+        board = self._current_board()
         if self.show_mirror.get():
             board = mirror_board(board)
 
@@ -456,6 +552,25 @@ class DBExplorer(tk.Toplevel):
         self.step_label.config(
             text=f"coup: {st.get('numero_coup')} / {self.situations[-1].get('numero_coup')}"
         )
+        self._show_openings(self.moves[:st.get("numero_coup") or 0])
+
+    def _current_board(self):
+        st = self.situations[self.current_idx]
+        if st.get("plateau") is None and self.compact is not None:
+            return self.compact.board_at(st["numero_coup"])
+        return parse_board_text(st.get("plateau"), self.rows, self.cols)
+
+    def _show_openings(self, prefix):
+        if self.signature_index is None:
+            self.openings_var.set("")
+            return
+        lines = [f"Parties passées par cette position : {self.signature_index.count(prefix)}"]
+        moves = sorted(self.signature_index.next_moves(prefix).items(), key=lambda kv: -kv[1]["games"])
+        for col, m in moves:
+            if self.show_mirror.get():
+                col = self.cols - 1 - col
+            lines.append(f"col {col + 1} : {m['games']} parties, {m['win_rate']:.0%} pour le joueur")
+        self.openings_var.set("\n".join(lines))
 
     def _draw_board(self, board):
         self.canvas.delete("all")
@@ -564,10 +679,9 @@ class DBExplorer(tk.Toplevel):
                 return
             raise
 
-        # Insert situations step-by-step
+        # Insert situations step-by-step (liens posés en une requête à la fin)
         board2 = empty_board(self.rows, self.cols)
         player = self.starting_player
-        prev_sid = None
         numero = 0
 
         for ch in sanitize_signature(sig_raw):
@@ -585,21 +699,16 @@ class DBExplorer(tk.Toplevel):
             numero += 1
             plateau = "\n".join("".join(str(x) if x == 0 else x for x in row) for row in board2)
 
-            sid = q_one(
+            exec_sql(
                 """
-                INSERT INTO situation (id_partie, numero_coup, plateau, joueur, precedent, suivant)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                RETURNING id_situation
+                INSERT INTO situation (id_partie, numero_coup, plateau, joueur)
+                VALUES (%s, %s, %s, %s)
                 """,
-                (id_partie, numero, plateau, player, prev_sid, None),
-            )["id_situation"]
-
-            if prev_sid is not None:
-                exec_sql("UPDATE situation SET suivant=%s WHERE id_situation=%s", (sid, prev_sid))
-
-            prev_sid = sid
+                (id_partie, numero, plateau, player),
+            )
             player = "J" if player == "R" else "R"
 
+        link_situations([id_partie])
         messagebox.showinfo("Import", f"Import OK. id_partie={id_partie}")
         self.refresh_parties()
         self.load_partie(id_partie)
@@ -746,8 +855,16 @@ def load_partie_for_play(id_partie: int, config_path="config.json"):
     )
     last_situation_id = last_row["id_situation"] if last_row else None
 
+    compact = None if sig else load_compact(id_partie)
     if sig:
         board, hist, next_player = replay_from_signature(sig, rows, cols, starting_player)
+    elif compact is not None and (compact.rows, compact.cols) == (rows, cols):
+        hist = compact.history()
+        board = compact.board_at(len(compact))
+        if hist:
+            next_player = "J" if hist[-1][2] == "R" else "R"
+        else:
+            next_player = starting_player
     else:
         last = q_one(
             "SELECT plateau FROM situation WHERE id_partie=%s ORDER BY numero_coup DESC LIMIT 1",
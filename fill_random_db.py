@@ -1,13 +1,27 @@
 # fill_random_db.py
+"""
+Remplit la base avec des parties générées.
+
+    python fill_random_db.py -n 500                          # une partie / un INSERT par coup à la fois
+    python fill_random_db.py -n 100000 --bulk                # parties en mémoire, import par COPY
+    python fill_random_db.py -n 100000 --workers 8           # + génération dans 8 processus
+    python fill_random_db.py -n 5000 --workers 8 --policy eps --epsilon 0.2 --depth 3
+    python fill_random_db.py -n 2000 --workers 8 --policy minimax --depth 4 --random-plies 6
+"""
+import argparse
+import os
 import random
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
 from psycopg2 import IntegrityError
 
 from game import Connect4Game
 from db.db import (
-    create_partie, insert_situation, update_links,
+    create_partie, insert_situation,
     finish_partie, delete_partie,
     canonical_signature_from_history,
 )
+from db.bulk import BulkImporter, build_game_rows
 
 def board_to_text(board):
     # même format que ton db.py (0/R/J)
@@ -20,6 +34,125 @@ def winning_line_to_text(winning_line):
         return None
     return ";".join(f"({r},{c})" for (r, c) in winning_line)
 
+def result_fields(g, winning_line):
+    """
+    (status, joueur_gagnant, ligne_gagnante texte) d'une partie jouée.
+    """
+    if g.result == "Rouge":
+        gagnant = "R"
+        status = "TERMINEE"
+    elif g.result == "Jaune":
+        gagnant = "J"
+        status = "TERMINEE"
+    elif g.result == "Match nul":
+        gagnant = "D"
+        status = "NULLE"   # ou "TERMINEE" selon ton choix
+    else:
+        gagnant = None
+        status = "EN_COURS"
+
+    lg_txt = winning_line_to_text(winning_line) if status == "TERMINEE" else None
+    return status, gagnant, lg_txt
+
+# =======================
+# POLITIQUES DE JEU
+# =======================
+# une politique : policy(game, rnd) -> colonne, avec un attribut name ;
+# doit pouvoir être envoyée à un processus (pickle)
+class RandomPolicy:
+    """
+    Coup uniforme parmi les colonnes jouables.
+    """
+    name = "random"
+
+    def __call__(self, game, rnd):
+        return rnd.choice(game.valid_columns())
+
+
+random_policy = RandomPolicy()
+
+
+class MinimaxPolicy:
+    """
+    Coup de MinimaxAI.search à profondeur 'depth'. Les random_plies premiers coups
+    sont aléatoires (sinon toutes les parties seraient identiques).
+    """
+    name = "minimax"
+
+    def __init__(self, depth=4, random_plies=4, tt_mb=8):
+        self.depth = depth
+        self.random_plies = random_plies
+        self.tt_mb = tt_mb
+        self._ai = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_ai"] = None   # un moteur par processus
+        return state
+
+    def best(self, game):
+        if self._ai is None or (self._ai.rows, self._ai.cols) != (game.rows, game.cols):
+            from ai import MinimaxAI
+            self._ai = MinimaxAI(game.rows, game.cols, tt_mb=self.tt_mb)
+        board = [row[:] for row in game.board]
+        col, _score, _depth = self._ai.search(board, game.current_player, self.depth)
+        return col
+
+    def __call__(self, game, rnd):
+        if len(game.history) < self.random_plies:
+            return random_policy(game, rnd)
+        col = self.best(game)
+        return col if col is not None else random_policy(game, rnd)
+
+
+class EpsilonGreedyPolicy(MinimaxPolicy):
+    """
+    Coup aléatoire avec la probabilité epsilon, sinon le coup de minimax.
+    """
+    name = "eps"
+
+    def __init__(self, epsilon=0.1, depth=2, tt_mb=8):
+        super().__init__(depth=depth, random_plies=0, tt_mb=tt_mb)
+        self.epsilon = epsilon
+
+    def __call__(self, game, rnd):
+        if rnd.random() < self.epsilon:
+            return random_policy(game, rnd)
+        return super().__call__(game, rnd)
+
+
+def make_policy(name="random", depth=4, epsilon=0.1, random_plies=4):
+    if name == "random":
+        return random_policy
+    if name == "minimax":
+        return MinimaxPolicy(depth=depth, random_plies=random_plies)
+    if name == "eps":
+        return EpsilonGreedyPolicy(epsilon=epsilon, depth=depth)
+    raise ValueError(f"Politique inconnue : {name}")
+
+
+def play_game_rows(rows=9, cols=9, starting_player="R", confiance=1, rnd=random, policy=random_policy):
+    """
+    Partie complète jouée par 'policy' (les deux joueurs), en mémoire (pour db.bulk).
+    """
+    g = Connect4Game(rows=rows, cols=cols, starting_player=starting_player)
+    winning_line = None
+    while not g.game_over:
+        if not g.valid_columns():
+            break
+        ok, wl = g.drop(policy(g, rnd))
+        if not ok:
+            break
+        if wl:
+            winning_line = wl
+
+    status, gagnant, lg_txt = result_fields(g, winning_line)
+    return build_game_rows(
+        g.history, rows, cols, mode=f"batch_{policy.name}", type_partie="IA_VS_IA", status=status,
+        joueur_depart=starting_player, joueur_gagnant=gagnant, ligne_gagnante=lg_txt,
+        confiance=confiance,
+    )
+
 def play_one_random_game(rows=9, cols=9, starting_player="R", confiance=1):
     g = Connect4Game(rows=rows, cols=cols, starting_player=starting_player)
 
@@ -35,7 +168,6 @@ def play_one_random_game(rows=9, cols=9, starting_player="R", confiance=1):
         confiance=confiance
     )
 
-    last_sid = None
     winning_line = None
 
     try:
@@ -57,38 +189,19 @@ def play_one_random_game(rows=9, cols=9, starting_player="R", confiance=1):
             plateau = board_to_text(g.board)
             joueur = g.history[-1][2]  # "R" ou "J"
 
-            sid = insert_situation(
+            # precedent / suivant : posés par finish_partie en une requête
+            insert_situation(
                 id_partie=pid,
                 numero_coup=num,
                 plateau=plateau,
                 joueur=joueur,
-                precedent=last_sid,
-                suivant=None
             )
 
-            if last_sid is not None:
-                update_links(last_sid, sid)
-            last_sid = sid
-
         # 3) signature canonique
         sig = canonical_signature_from_history(g.history, cols)
 
-        # 4) statut + gagnant
-        if g.result == "Rouge":
-            gagnant = "R"
-            status = "TERMINEE"
-        elif g.result == "Jaune":
-            gagnant = "J"
-            status = "TERMINEE"
-        elif g.result == "Match nul":
-            gagnant = "D"
-            status = "NULLE"   # ou "TERMINEE" selon ton choix
-        else:
-            gagnant = None
-            status = "EN_COURS"
-
-        # 5) ligne gagnante (texte) si victoire
-        lg_txt = winning_line_to_text(winning_line) if status == "TERMINEE" else None
+        # 4) statut + gagnant + ligne gagnante (texte) si victoire
+        status, gagnant, lg_txt = result_fields(g, winning_line)
 
         finish_partie(
             id_partie=pid,
@@ -120,5 +233,153 @@ def fill(n=500, rows=9, cols=9, starting_player="R", confiance=1):
 
     print(f"🎉 Terminé: {ok} parties insérées (essais totaux={tries})")
 
+def fill_bulk(n=500, rows=9, cols=9, starting_player="R", confiance=1, batch_size=2000, seed=None):
+    """
+    Comme fill, mais parties générées en mémoire et importées par COPY (db.bulk),
+    un lot de batch_size parties par transaction.
+    """
+    rnd = random.Random(seed)
+    importer = BulkImporter(batch_size=batch_size)
+    t0 = time.perf_counter()
+
+    def progress(inserted, duplicates):
+        rate = inserted / max(1e-9, time.perf_counter() - t0)
+        print(f"✅ {inserted}/{n} parties insérées (doublons={duplicates}, {rate:.0f} parties/s)")
+
+    while importer.inserted < n:
+        todo = n - importer.inserted
+        games = (play_game_rows(rows, cols, starting_player, confiance, rnd) for _ in range(todo))
+        importer.ingest(games, on_batch=progress)
+
+    print(f"🎉 Terminé: {importer.inserted} parties, {importer.situations} situations "
+          f"en {time.perf_counter() - t0:.1f}s")
+
+# =======================
+# GÉNÉRATION PARALLÈLE
+# =======================
+def _play_chunk(policy, n, seed, rows, cols, starting_player, confiance):
+    """
+    Tâche worker : n parties. Retourne ([GameRows], temps CPU du processus en s).
+    """
+    rnd = random.Random(seed)
+    t0 = time.process_time()
+    games = [play_game_rows(rows, cols, starting_player, confiance, rnd, policy) for _ in range(n)]
+    return games, time.process_time() - t0
+
+
+def generate_parallel(n, workers=None, policy=random_policy, rows=9, cols=9, starting_player="R",
+                      confiance=1, chunk=200, seed=None, pool=None, seen=None, stats=None):
+    """
+    Génère des parties dans un pool de processus et les rend au fil de l'eau (GameRows),
+    sans doublon de signature canonique (ensemble 'seen', en mémoire), jusqu'à en avoir
+    rendu n (ou que l'appelant arrête d'itérer).
+    stats : dict rempli avec played / duplicates / cpu_s / wall_s, cumulés d'un appel
+    à l'autre si on repasse le même dict (fill_parallel, plusieurs tours).
+    """
+    from parallel_search import make_pool
+
+    workers = workers or os.cpu_count() or 1
+    seen = set() if seen is None else seen
+    stats = {} if stats is None else stats
+    for key, zero in (("played", 0), ("duplicates", 0), ("cpu_s", 0.0), ("wall_s", 0.0)):
+        stats.setdefault(key, zero)
+    wall0 = stats["wall_s"]
+    seeds = random.Random(seed)
+    own_pool = pool is None
+    pool = pool or make_pool(workers)
+    t0 = time.perf_counter()
+
+    def submit():
+        return pool.submit(_play_chunk, policy, chunk, seeds.getrandbits(64),
+                           rows, cols, starting_player, confiance)
+
+    running = {submit() for _ in range(2 * workers)}
+    produced = 0
+    try:
+        while produced < n:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                games, cpu_s = fut.result()
+                stats["played"] += len(games)
+                stats["cpu_s"] += cpu_s
+                for g in games:
+                    if produced >= n:
+                        break
+                    sig = g.partie["signature"]
+                    if sig in seen:
+                        stats["duplicates"] += 1
+                        continue
+                    seen.add(sig)
+                    produced += 1
+                    yield g
+                if produced < n:
+                    running.add(submit())
+            stats["wall_s"] = wall0 + time.perf_counter() - t0
+    finally:
+        for fut in running:
+            fut.cancel()
+        if own_pool:
+            pool.shutdown(wait=True, cancel_futures=True)
+        stats["wall_s"] = wall0 + time.perf_counter() - t0
+
+
+def fill_parallel(n=500, workers=None, policy=random_policy, rows=9, cols=9, starting_player="R",
+                  confiance=1, batch_size=2000, chunk=200, seed=None):
+    """
+    Parties jouées dans un pool de processus, dédoublonnées en mémoire puis importées
+    par COPY (db.bulk). Les signatures déjà en base sont écartées par ON CONFLICT et
+    remplacées par de nouvelles parties.
+    """
+    from parallel_search import make_pool
+
+    workers = workers or os.cpu_count() or 1
+    importer = BulkImporter(batch_size=batch_size)
+    seen = set()
+    stats = {}
+    pool = make_pool(workers)
+    t0 = time.perf_counter()
+
+    def progress(inserted, duplicates):
+        rate = stats["played"] / max(1e-9, time.perf_counter() - t0)
+        print(f"✅ {inserted}/{n} parties insérées (doublons mémoire={stats['duplicates']}, "
+              f"base={duplicates}, {rate:.0f} parties/s)")
+
+    try:
+        while importer.inserted < n:
+            games = generate_parallel(n - importer.inserted, workers, policy, rows, cols,
+                                      starting_player, confiance, chunk,
+                                      seed=None if seed is None else seed + importer.inserted,
+                                      pool=pool, seen=seen, stats=stats)
+            importer.ingest(games, on_batch=progress)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    wall = time.perf_counter() - t0
+    per_core = stats["played"] / max(1e-9, stats["cpu_s"])
+    print(f"🎉 Terminé: {importer.inserted} parties ({policy.name}, {workers} processus) en {wall:.1f}s : "
+          f"{stats['played'] / wall:.0f} parties/s au total, {per_core:.0f} parties/s par cœur")
+    return importer.inserted
+
+
 if __name__ == "__main__":
-    fill(n=500, rows=9, cols=9, starting_player="R", confiance=1)
+    parser = argparse.ArgumentParser(description="Remplit la base avec des parties générées")
+    parser.add_argument("-n", type=int, default=500, help="parties à insérer")
+    parser.add_argument("--bulk", action="store_true", help="import par lots (COPY) au lieu d'un INSERT par coup")
+    parser.add_argument("--batch", type=int, default=2000, help="parties par lot (--bulk / --workers)")
+    parser.add_argument("--workers", type=int, default=0, help="génération dans N processus (implique --bulk)")
+    parser.add_argument("--policy", choices=("random", "minimax", "eps"), default="random")
+    parser.add_argument("--depth", type=int, default=4, help="profondeur minimax (minimax / eps)")
+    parser.add_argument("--epsilon", type=float, default=0.1, help="part de coups aléatoires (eps)")
+    parser.add_argument("--random-plies", type=int, default=4, help="premiers coups aléatoires (minimax)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.workers or args.policy != "random":
+        policy = make_policy(args.policy, depth=args.depth, epsilon=args.epsilon,
+                             random_plies=args.random_plies)
+        fill_parallel(n=args.n, workers=args.workers or None, policy=policy, rows=9, cols=9,
+                      starting_player="R", confiance=1, batch_size=args.batch, seed=args.seed)
+    elif args.bulk:
+        fill_bulk(n=args.n, rows=9, cols=9, starting_player="R", confiance=1, batch_size=args.batch)
+    else:
+        fill(n=args.n, rows=9, cols=9, starting_player="R", confiance=1)
@@ -0,0 +1,126 @@
+# game_store.py
+"""
+Parties en mémoire du serveur web (état de jeu par id_partie), avec une taille bornée.
+
+- au plus max_games parties : au-delà, les parties terminées utilisées le moins
+  récemment sont évincées d'abord, puis, s'il le faut encore, les plus anciennes
+  parties en cours ;
+- une partie sans requête depuis idle_s secondes (salle abandonnée) est évincée ;
+- une partie évincée n'est pas perdue : elle est en base et get_game_state la
+  recharge (load_game_from_db) à la requête suivante.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class GameStore:
+    def __init__(self, max_games=1000, idle_s=3600):
+        self.max_games = max_games
+        self.idle_s = idle_s
+        self._games = OrderedDict()   # game_id -> état, du moins au plus récemment utilisé
+        self._used = {}               # game_id -> time.monotonic() de la dernière requête
+        self._lock = threading.Lock()
+        self.loaded = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._games)
+
+    def __contains__(self, game_id):
+        return game_id in self._games
+
+    def get(self, game_id):
+        """
+        État de la partie (ou None), marqué comme le plus récemment utilisé.
+        """
+        now = time.monotonic()
+        with self._lock:
+            game = self._games.get(game_id)
+            if game is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._games.move_to_end(game_id)
+            self._used[game_id] = now
+            return game
+
+    def put(self, game_id, game, loaded=False):
+        """
+        Ajoute la partie (loaded : relue en base). Si une autre requête l'a ajoutée
+        entre-temps, c'est celle-là qui est gardée et retournée.
+        """
+        now = time.monotonic()
+        with self._lock:
+            current = self._games.get(game_id)
+            if current is not None:
+                self._games.move_to_end(game_id)
+                self._used[game_id] = now
+                return current
+            self._games[game_id] = game
+            self._used[game_id] = now
+            if loaded:
+                self.loaded += 1
+            self._evict_locked(now, keep=game_id)
+            return game
+
+    def discard(self, game_id):
+        with self._lock:
+            self._used.pop(game_id, None)
+            return self._games.pop(game_id, None)
+
+    def _evict_locked(self, now, keep=None):
+        # salles abandonnées : l'ordre LRU est aussi l'ordre des dernières requêtes
+        while self._games:
+            gid = next(iter(self._games))
+            if gid == keep or now - self._used[gid] <= self.idle_s:
+                break
+            self._drop_locked(gid)
+            self.expired += 1
+
+        excess = len(self._games) - self.max_games
+        if excess <= 0:
+            return
+        finished, others = [], []
+        for gid, g in self._games.items():
+            if gid != keep:
+                (finished if g.get("game_over") else others).append(gid)
+        for gid in (finished + others)[:excess]:
+            self._drop_locked(gid)
+            self.evicted += 1
+
+    def _drop_locked(self, game_id):
+        del self._games[game_id]
+        del self._used[game_id]
+
+    def stats(self):
+        with self._lock:
+            games = list(self._games.values())
+            finished = sum(1 for g in games if g.get("game_over"))
+            return {
+                "games": len(games),
+                "finished": finished,
+                "max_games": self.max_games,
+                "hits": self.hits,
+                "misses": self.misses,
+                "loaded": self.loaded,
+                "evicted": self.evicted,
+                "expired": self.expired,
+                "approx_kb": round(sum(_size_of(g) for g in games) / 1024, 1),
+            }
+
+
+def _size_of(obj):
+    """
+    Taille approximative (octets) d'un état : dict / list / str imbriqués.
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_size_of(k) + _size_of(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(_size_of(v) for v in obj)
+    return size
@@ -0,0 +1,164 @@
+# migrate_compact.py
+"""
+Convertit les parties stockées en lignes situation (plateau texte par coup) vers
+partie_coups (db/compact.py) et affiche la place gagnée.
+
+Les coups sont retrouvés en comparant les plateaux de deux situations successives ;
+la partie reconstruite est vérifiée coup par coup contre le texte stocké. Une partie
+incohérente (coup manquant, plusieurs pions posés, plateau différent) n'est pas convertie,
+ni une partie de plus de MAX_COLS colonnes (un caractère par coup).
+
+    python migrate_compact.py --dry-run            # vérification + estimation, rien n'est écrit
+    python migrate_compact.py                      # écrit partie_coups
+    python migrate_compact.py --drop-situations    # + supprime les lignes situation converties
+"""
+import argparse
+
+from db.compact import MAX_COLS, CompactGame, ensure_compact_table, parse_plateau
+from db.db import connection
+
+
+def moves_from_situations(situations, rows, cols):
+    """
+    [(row, col, joueur)] depuis les situations (ordonnées par numero_coup), ou None si incohérent.
+    """
+    prev = [[0] * cols for _ in range(rows)]
+    history = []
+    for i, st in enumerate(situations, start=1):
+        if int(st["numero_coup"] or 0) != i:
+            return None
+        board = parse_plateau(st["plateau"], rows, cols)
+        diff = [(r, c) for r in range(rows) for c in range(cols) if board[r][c] != prev[r][c]]
+        if len(diff) != 1:
+            return None
+        r, c = diff[0]
+        if prev[r][c] != 0:
+            return None
+        history.append((r, c, board[r][c]))
+        prev = board
+    return history
+
+
+def verify(game, situations, rows, cols):
+    return all(
+        game.board_at(i) == parse_plateau(st["plateau"], rows, cols)
+        for i, st in enumerate(situations, start=1)
+    )
+
+
+def table_bytes(cur, table):
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL AS ok", (table,))
+    if not cur.fetchone()["ok"]:
+        return 0
+    cur.execute("SELECT pg_total_relation_size(%s) AS n", (table,))
+    return int(cur.fetchone()["n"])
+
+
+def migrate(dry_run=False, drop_situations=False):
+    stats = {"parties": 0, "converties": 0, "rejetees": 0, "deja": 0,
+             "octets_situation": 0, "octets_compact": 0}
+    if not dry_run:
+        ensure_compact_table()
+
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT p.id_partie, COALESCE(p.rows, 9) AS rows, COALESCE(p.cols, 9) AS cols,
+                   (pc.id_partie IS NOT NULL) AS deja
+            FROM partie p
+            LEFT JOIN partie_coups pc USING (id_partie)
+            WHERE EXISTS (SELECT 1 FROM situation s WHERE s.id_partie = p.id_partie)
+            ORDER BY p.id_partie
+            """
+            if not dry_run else
+            """
+            SELECT p.id_partie, COALESCE(p.rows, 9) AS rows, COALESCE(p.cols, 9) AS cols,
+                   FALSE AS deja
+            FROM partie p
+            WHERE EXISTS (SELECT 1 FROM situation s WHERE s.id_partie = p.id_partie)
+            ORDER BY p.id_partie
+            """
+        )
+        parties = cur.fetchall()
+
+    for partie in parties:
+        stats["parties"] += 1
+        if partie["deja"]:
+            stats["deja"] += 1
+            continue
+        pid, rows, cols = partie["id_partie"], partie["rows"], partie["cols"]
+        if cols > MAX_COLS:
+            stats["rejetees"] += 1
+            print(f"Partie {pid} non convertie ({cols} colonnes)")
+            continue
+
+        with connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT numero_coup, plateau, pg_column_size(s.*) AS taille
+                FROM situation s
+                WHERE id_partie = %s
+                ORDER BY numero_coup, id_situation
+                """,
+                (pid,),
+            )
+            situations = cur.fetchall()
+
+            history = moves_from_situations(situations, rows, cols)
+            game = CompactGame.from_history(history, rows, cols) if history is not None else None
+            if game is None or not verify(game, situations, rows, cols):
+                stats["rejetees"] += 1
+                print(f"Partie {pid} non convertie (situations incohérentes)")
+                continue
+
+            stats["converties"] += 1
+            stats["octets_situation"] += sum(int(st["taille"]) for st in situations)
+            # en-tête de ligne + id + 2 textes + bytea, comme pg_column_size
+            stats["octets_compact"] += 24 + 4 + len(game.coups) + len(game.joueurs) + len(game.snapshots) + 3
+            if dry_run:
+                continue
+
+            cur.execute(
+                """
+                INSERT INTO partie_coups (id_partie, coups, joueurs, snapshots)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (id_partie) DO NOTHING
+                """,
+                (pid, game.coups, game.joueurs, game.snapshots),
+            )
+            if drop_situations:
+                cur.execute("DELETE FROM situation WHERE id_partie = %s", (pid,))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migration situation -> partie_coups (stockage compact)")
+    parser.add_argument("--dry-run", action="store_true", help="vérifier et estimer sans rien écrire")
+    parser.add_argument("--drop-situations", action="store_true",
+                        help="supprimer les lignes situation des parties converties")
+    args = parser.parse_args()
+
+    with connection() as conn, conn.cursor() as cur:
+        before = table_bytes(cur, "situation") + table_bytes(cur, "partie_coups")
+
+    stats = migrate(dry_run=args.dry_run, drop_situations=args.drop_situations)
+
+    print(f"{stats['parties']} parties : {stats['converties']} converties, "
+          f"{stats['deja']} déjà compactes, {stats['rejetees']} rejetées")
+    old, new = stats["octets_situation"], stats["octets_compact"]
+    if old:
+        print(f"Lignes : {old / 1024:.1f} Ko en situation -> {new / 1024:.1f} Ko en partie_coups "
+              f"({100.0 * (old - new) / old:.1f} % gagnés)")
+
+    if not args.dry_run:
+        with connection() as conn, conn.cursor() as cur:
+            after = table_bytes(cur, "situation") + table_bytes(cur, "partie_coups")
+        print(f"Tables (index compris) : {before / 1024:.1f} Ko -> {after / 1024:.1f} Ko")
+        if not args.drop_situations:
+            print("(les lignes situation sont conservées : --drop-situations pour libérer la place)")
+        else:
+            print("(VACUUM FULL situation pour rendre la place au système)")
+
+
+if __name__ == "__main__":
+    main()
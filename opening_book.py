@@ -0,0 +1,349 @@
+# opening_book.py
+"""
+Bibliothèque d'ouvertures : meilleur coup précalculé pour les positions des
+premiers coups, indexé par position canonique (le plateau ou son miroir
+gauche-droite, le plus petit des deux). Un coup trouvé pour une position vaut
+aussi, en miroir, pour la position symétrique.
+
+Construction hors ligne, à partir des parties de la table partie (imports BGA,
+fill_random_db, parties web) et/ou de toutes les positions des premiers coups :
+
+    python opening_book.py --plies 8 --depth 10              # positions vues en base, recherche profonde
+    python opening_book.py --plies 8 --tree 4 --depth 10     # + toutes les positions jusqu'à 4 coups
+    python opening_book.py --plies 8 --from-stats            # coup le plus gagnant en base, sans recherche
+
+Si situation.cle_position existe (python -m db.positions), les positions vues en
+base sont comptées par PostgreSQL (positions_from_index) au lieu de rejouer chaque
+signature ; les parties en stockage compact n'y sont pas (pas de lignes situation).
+
+Fichier JSON : {"rows", "cols", "max_ply", "entries": {clé: [col, score, profondeur]}}.
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+from bitboard import BitBoard
+from game import Connect4Game
+
+DEFAULT_PATH = Path(__file__).resolve().parent / "opening_book.json"
+
+
+def mirror_board(board):
+    return [row[::-1] for row in board]
+
+
+def _raw_key(board, player, rows, cols):
+    bb = BitBoard.from_board(board, rows, cols)
+    n = cols * (rows + 1)
+    return (((bb.bits["R"] << n) | bb.bits["J"]) << 1) | (player == "J")
+
+
+def position_key(board, player, rows, cols):
+    """
+    (clé canonique en hexadécimal, miroir) : miroir est vrai si la clé est celle
+    du plateau retourné, auquel cas les colonnes du livre sont à retourner aussi.
+    """
+    key = _raw_key(board, player, rows, cols)
+    mkey = _raw_key(mirror_board(board), player, rows, cols)
+    if mkey < key:
+        return format(mkey, "x"), True
+    return format(key, "x"), False
+
+
+class OpeningBook:
+    def __init__(self, rows, cols, max_ply, entries=None):
+        self.rows = rows
+        self.cols = cols
+        self.max_ply = max_ply
+        self.entries = entries if entries is not None else {}
+        self.hits = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        entries = {k: tuple(v) for k, v in data["entries"].items()}
+        return cls(int(data["rows"]), int(data["cols"]), int(data["max_ply"]), entries)
+
+    def save(self, path=DEFAULT_PATH):
+        data = {
+            "rows": self.rows,
+            "cols": self.cols,
+            "max_ply": self.max_ply,
+            "entries": {k: list(v) for k, v in sorted(self.entries.items())},
+        }
+        Path(path).write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+
+    def add(self, board, player, col, score, depth):
+        key, mirrored = position_key(board, player, self.rows, self.cols)
+        if mirrored:
+            col = self.cols - 1 - col
+        self.entries[key] = (col, score, depth)
+
+    def lookup(self, board, player):
+        """
+        (col, score, profondeur) pour 'player' à jouer, ou None hors livre
+        (autre taille de plateau, trop de pions posés, position inconnue).
+        """
+        if len(board) != self.rows or len(board[0]) != self.cols:
+            return None
+        ply = sum(1 for row in board for x in row if x != 0)
+        if ply >= self.max_ply:
+            return None
+
+        key, mirrored = position_key(board, player, self.rows, self.cols)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        col, score, depth = entry
+        if mirrored:
+            col = self.cols - 1 - col
+        if board[0][col] != 0:
+            return None
+        self.hits += 1
+        return col, score, depth
+
+
+def load_book(rows, cols, path=DEFAULT_PATH):
+    """
+    Livre du fichier 'path' s'il existe et correspond à la taille du plateau, sinon None.
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        book = OpeningBook.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        print("Livre d'ouvertures illisible :", e)
+        return None
+    if (book.rows, book.cols) != (rows, cols):
+        return None
+    return book
+
+
+# =======================
+# CONSTRUCTION
+# =======================
+def games_from_db(rows, cols):
+    """
+    (signature, joueur_depart, joueur_gagnant) des parties en base de cette taille.
+    """
+    from db.db import connection
+
+    sql = """
+    SELECT signature, joueur_depart, joueur_gagnant
+    FROM partie
+    WHERE signature ~ '^[0-9]+$'
+      AND COALESCE(rows, 9) = %s AND COALESCE(cols, 9) = %s;
+    """
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(sql, (rows, cols))
+        for row in cur:
+            yield row["signature"], row["joueur_depart"] or "R", row["joueur_gagnant"]
+
+
+def _new_position(game):
+    return {
+        "board": [row[:] for row in game.board],
+        "player": game.current_player,
+        "ply": len(game.history),
+        "count": 0,
+        "moves": {},
+    }
+
+
+# une ligne par (position, position suivante) des max_ply premiers coups : parties,
+# victoires et nulles du joueur qui joue le coup, et un couple de plateaux de la même partie
+# (position de départ vide pour le premier coup)
+POSITION_MOVES_SQL = """
+SELECT s.cle_position AS cle, n.cle_position AS suivante,
+       min(n.numero_coup) - 1 AS ply,
+       min(ARRAY[COALESCE(s.plateau, ''), n.plateau]) AS plateaux,
+       min(n.joueur) AS joueur,
+       count(*) AS parties,
+       count(*) FILTER (WHERE p.joueur_gagnant = n.joueur) AS victoires,
+       count(*) FILTER (WHERE p.joueur_gagnant = 'D') AS nulles
+FROM situation n
+JOIN partie p ON p.id_partie = n.id_partie
+LEFT JOIN situation s ON s.id_partie = n.id_partie AND s.numero_coup = n.numero_coup - 1
+WHERE n.numero_coup <= %(max_ply)s
+  AND COALESCE(p.rows, 9) = %(rows)s AND COALESCE(p.cols, 9) = %(cols)s
+GROUP BY s.cle_position, n.cle_position
+"""
+
+
+def positions_from_index(rows, cols, max_ply, positions=None):
+    """
+    Comme collect_positions(games_from_db(...)), calculé en base avec situation.cle_position :
+    un couple de plateaux par (position, coup) est rejoué en Python, pas chaque partie.
+    """
+    from db.compact import parse_plateau
+    from db.db import connection
+
+    positions = {} if positions is None else positions
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(POSITION_MOVES_SQL, {"max_ply": max_ply, "rows": rows, "cols": cols})
+        for row in cur:
+            before, after = (parse_plateau(t, rows, cols) for t in row["plateaux"])
+            played = [c for r in range(rows) for c in range(cols) if before[r][c] == 0 and after[r][c] != 0]
+            if len(played) != 1:
+                continue   # situations incohérentes
+            col, player = played[0], row["joueur"]
+
+            key, mirrored = position_key(before, player, rows, cols)
+            pos = positions.get(key)
+            if pos is None:
+                pos = positions[key] = {"board": before, "player": player, "ply": row["ply"],
+                                        "count": 0, "moves": {}}
+            n = int(row["parties"])
+            pos["count"] += n
+            stats = pos["moves"].setdefault(cols - 1 - col if mirrored else col, [0, 0, 0])
+            stats[0] += n
+            stats[1] += int(row["victoires"])
+            stats[2] += int(row["nulles"])
+    return positions
+
+
+def collect_positions(games, rows, cols, max_ply, positions=None):
+    """
+    Rejoue les signatures (colonnes 1..cols) et compte, par position canonique des
+    max_ply premiers coups : nombre de parties et, par coup joué (colonne canonique),
+    [parties, victoires du joueur qui joue, nulles].
+    """
+    positions = {} if positions is None else positions
+    for signature, starting_player, winner in games:
+        g = Connect4Game(rows=rows, cols=cols, starting_player=starting_player)
+        for ch in signature[:max_ply]:
+            col = int(ch) - 1
+            if not (0 <= col < cols) or g.game_over:
+                break
+            key, mirrored = position_key(g.board, g.current_player, rows, cols)
+            pos = positions.get(key)
+            if pos is None:
+                pos = positions[key] = _new_position(g)
+            pos["count"] += 1
+
+            stats = pos["moves"].setdefault(cols - 1 - col if mirrored else col, [0, 0, 0])
+            stats[0] += 1
+            if winner == g.current_player:
+                stats[1] += 1
+            elif winner == "D":
+                stats[2] += 1
+
+            ok, _line = g.drop(col)
+            if not ok:
+                break
+    return positions
+
+
+def tree_positions(rows, cols, plies, positions=None, starting_player="R"):
+    """
+    Ajoute toutes les positions (non terminées) atteignables en moins de 'plies' coups.
+    """
+    positions = {} if positions is None else positions
+    frontier = [Connect4Game(rows=rows, cols=cols, starting_player=starting_player)]
+    seen = set()
+    for _ply in range(plies):
+        next_frontier = []
+        for g in frontier:
+            key, _mirrored = position_key(g.board, g.current_player, rows, cols)
+            if key in seen:
+                continue
+            seen.add(key)
+            positions.setdefault(key, _new_position(g))
+            for col in g.valid_columns():
+                child = Connect4Game(rows=rows, cols=cols, starting_player=starting_player)
+                child.board = [row[:] for row in g.board]
+                child.current_player = g.current_player
+                child.history = list(g.history)
+                child.drop(col)
+                if not child.game_over:
+                    next_frontier.append(child)
+        frontier = next_frontier
+    return positions
+
+
+def _stats_move(pos):
+    def rate(item):
+        _col, (n, wins, draws) = item
+        return (wins + 0.5 * draws) / n, n
+    col, _stats = max(pos["moves"].items(), key=rate)
+    return col
+
+
+def build_book(positions, rows, cols, max_ply, depth=10, time_ms=None,
+               min_count=1, from_stats=False, verbose=False):
+    """
+    Un coup par position : recherche profonde (MinimaxAI.search), ou avec from_stats
+    le coup au meilleur taux de victoire dans les parties en base.
+    Les positions vues moins de min_count fois (hors arbre complet) sont ignorées.
+    """
+    from ai import MinimaxAI
+
+    book = OpeningBook(rows, cols, max_ply)
+    ai = None if from_stats else MinimaxAI(rows, cols, tt_mb=64)
+
+    todo = [p for p in positions.values()
+            if p["ply"] < max_ply and (p["count"] == 0 or p["count"] >= min_count)]
+    todo.sort(key=lambda p: (p["ply"], -p["count"]))
+
+    t0 = time.perf_counter()
+    for i, pos in enumerate(todo, start=1):
+        if from_stats:
+            if not pos["moves"]:
+                continue
+            # colonne déjà canonique : plateau canonique = plateau stocké ou son miroir
+            key, mirrored = position_key(pos["board"], pos["player"], rows, cols)
+            col = _stats_move(pos)
+            book.entries[key] = (col, 0, 0)
+            continue
+
+        col, score, done = ai.search(pos["board"], pos["player"], depth, time_ms=time_ms)
+        if col is None:
+            continue
+        book.add(pos["board"], pos["player"], col, score, done)
+        if verbose and (i % 50 == 0 or i == len(todo)):
+            print(f"{i}/{len(todo)} positions ({time.perf_counter() - t0:.0f}s)")
+    return book
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construit la bibliothèque d'ouvertures")
+    parser.add_argument("--rows", type=int, default=9)
+    parser.add_argument("--cols", type=int, default=9)
+    parser.add_argument("--plies", type=int, default=8, help="coups couverts par le livre")
+    parser.add_argument("--tree", type=int, default=0, help="ajoute toutes les positions jusqu'à N coups")
+    parser.add_argument("--no-db", action="store_true", help="ne pas lire les parties en base")
+    parser.add_argument("--min-count", type=int, default=2, help="parties minimum par position (base)")
+    parser.add_argument("--depth", type=int, default=10)
+    parser.add_argument("--time-ms", type=int, default=None, help="budget par position")
+    parser.add_argument("--from-stats", action="store_true", help="coup le plus gagnant en base, sans recherche")
+    parser.add_argument("--out", default=str(DEFAULT_PATH))
+    args = parser.parse_args()
+
+    positions = {}
+    if not args.no_db:
+        from db.positions import has_position_column
+
+        if has_position_column():
+            positions_from_index(args.rows, args.cols, args.plies, positions)
+        else:
+            collect_positions(games_from_db(args.rows, args.cols), args.rows, args.cols, args.plies, positions)
+        print(f"{len(positions)} positions canoniques lues en base")
+    if args.tree:
+        tree_positions(args.rows, args.cols, min(args.tree, args.plies), positions)
+        print(f"{len(positions)} positions avec l'arbre complet jusqu'à {args.tree} coups")
+
+    book = build_book(positions, args.rows, args.cols, args.plies, depth=args.depth,
+                      time_ms=args.time_ms, min_count=args.min_count,
+                      from_stats=args.from_stats, verbose=True)
+    book.save(args.out)
+    size = Path(args.out).stat().st_size
+    print(f"✅ {len(book)} positions -> {args.out} ({size / 1024:.1f} Ko)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# parallel_search.py
+"""
+Recherche à la racine répartie sur plusieurs processus (un coup racine = une tâche).
+
+Chaque processus garde un MinimaxAI (et donc une table de transposition) par
+clé de recherche (l'id de la partie dans le serveur web), d'une tâche à l'autre :
+les parties qui partagent un pool de processus ne mélangent pas leurs tables,
+et un processus garde au plus worker_games moteurs (le moins récent est libéré).
+Comme MinimaxAI.search, la recherche approfondit une profondeur à la fois. À
+chaque itération, le premier coup (le meilleur de l'itération précédente) est
+cherché seul avec la fenêtre complète, puis tous les autres en parallèle avec
+alpha = son score : seuls les coups strictement meilleurs reviennent avec un
+score exact. On garde le premier meilleur dans l'ordre de la racine, donc le
+même coup que MinimaxAI.search, quel que soit l'ordre d'arrivée des tâches.
+
+Avec un seul worker (ou une profondeur < min_depth), la recherche se fait dans le
+processus courant avec MinimaxAI.search : résultat déterministe.
+"""
+import os
+import time
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from ai import MinimaxAI, SearchTimeout, move_first
+
+# moteurs de chaque processus worker : clé -> MinimaxAI, du moins au plus récent
+_worker_engines = OrderedDict()
+
+
+def _worker_ai(key, rows, cols, tt_mb, worker_games):
+    ai = _worker_engines.get(key)
+    if ai is None or (ai.rows, ai.cols) != (rows, cols):
+        ai = _worker_engines[key] = MinimaxAI(rows, cols, tt_mb=tt_mb)
+    _worker_engines.move_to_end(key)
+    while len(_worker_engines) > worker_games:
+        _worker_engines.popitem(last=False)
+    return ai
+
+
+def _search_child(rows, cols, tt_mb, board, ai_player, col, depth, time_ms, alpha=-10**18,
+                  key=None, worker_games=4):
+    """
+    Tâche worker : score de 'col' joué par ai_player, cherché à depth - 1
+    dans la fenêtre (alpha, +inf) avec le moteur de 'key'.
+    Retourne (col, score ou None si budget épuisé, noeuds).
+    """
+    ai = _worker_ai(key, rows, cols, tt_mb, worker_games)
+
+    r = ai.next_open_row(board, col)
+    board[r][col] = ai_player
+    nodes0 = ai.nodes
+    ai.deadline = None if time_ms is None else time.perf_counter() + time_ms / 1000.0
+    try:
+        score = ai.minimax(board, depth - 1, alpha, 10**18, False, ai_player, last_move=(r, col))
+    except SearchTimeout:
+        score = None
+    finally:
+        ai.deadline = None
+    return col, score, ai.nodes - nodes0
+
+
+def make_pool(workers):
+    # "spawn" : pas de fork d'un serveur multi-thread
+    ctx = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+
+
+class ParallelSearch:
+    def __init__(self, engine, workers=None, min_depth=6, tt_mb=16, pool=None, key=None,
+                 worker_games=4):
+        """
+        engine : MinimaxAI utilisé pour les petites profondeurs et en mono-worker.
+        workers : nombre de processus (défaut : nombre de coeurs).
+        min_depth : profondeur demandée à partir de laquelle on passe en parallèle.
+        tt_mb : taille de la table de transposition de chaque worker, par clé.
+        pool : ProcessPoolExecutor partagé avec d'autres recherches (non arrêté par shutdown).
+        key : clé des moteurs de cette recherche dans les workers (ex. id de partie) ;
+              à donner dès que le pool est partagé.
+        worker_games : moteurs (clés) gardés au plus par chaque worker.
+        """
+        self.engine = engine
+        self.workers = workers or os.cpu_count() or 1
+        self.min_depth = min_depth
+        self.tt_mb = tt_mb
+        self.key = key
+        self.worker_games = worker_games
+        self.nodes = 0
+        self._pool = pool
+        self._owns_pool = pool is None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = make_pool(self.workers)
+        return self._pool
+
+    def shutdown(self, wait=True):
+        """
+        wait=False : ne pas attendre les tâches déjà en cours (fermeture de l'interface).
+        """
+        if self._pool is not None and self._owns_pool:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+
+    def submit_root(self, board, ai_player, cols, depth, time_ms=None, alpha=-10**18):
+        """
+        Lance une tâche par colonne racine ; chaque future renvoie (col, score, noeuds).
+        """
+        pool = self._get_pool()
+        rows, ncols = self.engine.rows, self.engine.cols
+        return [
+            pool.submit(_search_child, rows, ncols, self.tt_mb,
+                        [row[:] for row in board], ai_player, col, depth, time_ms, alpha,
+                        self.key, self.worker_games)
+            for col in cols
+        ]
+
+    def search(self, board, ai_player, max_depth, time_ms=None):
+        """
+        Même contrat que MinimaxAI.search : (col, score, profondeur terminée).
+        """
+        hit = self.engine.book_move(board, ai_player)
+        if hit is not None:
+            return hit
+
+        if self.workers <= 1 or max_depth < self.min_depth:
+            nodes0 = self.engine.nodes
+            result = self.engine.search(board, ai_player, max_depth, time_ms=time_ms)
+            self.nodes += self.engine.nodes - nodes0
+            return result
+
+        root = self.engine.ordered_valid_cols(board, ai_player, maximizing=True)
+        if not root:
+            return None, None, 0
+
+        start = time.perf_counter()
+        best_col, best_score, done = root[0], None, 0
+
+        for depth in range(1, max_depth + 1):
+            # la profondeur 1 est toujours terminée
+            left_ms = None
+            if time_ms is not None and done:
+                left_ms = time_ms - (time.perf_counter() - start) * 1000.0
+                if left_ms <= 0:
+                    break
+
+            order = move_first(root, best_col if done else -1)
+            first = self.submit_root(board, ai_player, order[:1], depth, left_ms)[0]
+            col, pv_score, nodes = first.result()
+            self.nodes += nodes
+            if pv_score is None:
+                break
+
+            if left_ms is not None:
+                left_ms = time_ms - (time.perf_counter() - start) * 1000.0
+            futures = self.submit_root(board, ai_player, order[1:], depth, left_ms, alpha=pv_score)
+            wait(futures)
+
+            it_col, it_score = col, pv_score
+            complete = True
+            for f in futures:   # dans l'ordre de la racine
+                col, score, nodes = f.result()
+                self.nodes += nodes
+                if score is None:
+                    complete = False
+                elif score > it_score:
+                    it_col, it_score = col, score
+            if not complete:
+                break
+
+            best_col, best_score, done = it_col, it_score, depth
+            if abs(best_score) >= 10**7:
+                break
+
+        return best_col, best_score, done
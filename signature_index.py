@@ -0,0 +1,191 @@
+# signature_index.py
+"""
+Explorateur d'ouvertures sur les signatures canoniques des parties en base.
+
+Une signature est la suite des colonnes jouées (1..cols) ; sa forme canonique
+(la plus petite de la signature et de son miroir) commence par la forme
+canonique de chacun de ses préfixes. Les signatures canoniques triées forment
+donc un trie implicite : les parties qui passent par un préfixe (ou par son
+miroir) occupent un intervalle contigu, trouvé par deux recherches binaires,
+et les résultats sont des sommes cumulées lues aux bornes de l'intervalle.
+
+    index = SignatureIndex.from_db(9, 9)        # ou SignatureIndex.load(path)
+    index.count("5546")                          # parties qui passent par ce préfixe
+    index.next_moves("5546")                     # {col: {"games", "wins", "draws", "win_rate"}}
+    index.games("5546", limit=50)                # [(id_partie, signature canonique)]
+
+    python signature_index.py --out signature_index.json
+
+Fichier JSON : {"rows", "cols", "ids", "signatures", "results"} ; results : un
+caractère par partie, "1" victoire du joueur de départ, "2" de l'autre, "D" nulle, "-" aucun.
+"""
+import argparse
+import json
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+DEFAULT_PATH = Path(__file__).resolve().parent / "signature_index.json"
+
+
+def mirror_signature(sig, cols):
+    return "".join(str(cols + 1 - int(ch)) for ch in sig)
+
+
+def canonical(sig, cols):
+    """
+    (signature canonique, miroir) : miroir est vrai si c'est la signature retournée.
+    """
+    msig = mirror_signature(sig, cols)
+    return (msig, True) if msig < sig else (sig, False)
+
+
+def result_code(joueur_depart, joueur_gagnant):
+    if joueur_gagnant == "D":
+        return "D"
+    if joueur_gagnant in ("R", "J"):
+        return "1" if joueur_gagnant == (joueur_depart or "R") else "2"
+    return "-"
+
+
+class SignatureIndex:
+    def __init__(self, rows, cols, entries=()):
+        """
+        entries : (id_partie, signature, code résultat), signatures en colonnes 1..cols.
+        """
+        self.rows = rows
+        self.cols = cols
+        items = sorted((canonical(sig, cols)[0], pid, res) for pid, sig, res in entries if sig)
+        self.signatures = [s for s, _pid, _res in items]
+        self.ids = array("q", (pid for _s, pid, _res in items))
+        self.results = "".join(res for _s, _pid, res in items)
+        # cumuls : victoires du joueur de départ, de l'autre joueur, nulles sur [0, i)
+        self._cum = {code: array("l", [0]) for code in "12D"}
+        for res in self.results:
+            for code, cum in self._cum.items():
+                cum.append(cum[-1] + (res == code))
+
+    def __len__(self):
+        return len(self.signatures)
+
+    # ----------------- requêtes
+    def _range(self, key, lo=0, hi=None):
+        hi = len(self.signatures) if hi is None else hi
+        start = bisect_left(self.signatures, key, lo, hi)
+        # "\x7f" est après tous les chiffres : fin des signatures commençant par key
+        end = bisect_left(self.signatures, key + "\x7f", start, hi)
+        return start, end
+
+    def _totals(self, lo, hi):
+        return {code: cum[hi] - cum[lo] for code, cum in self._cum.items()}
+
+    def count(self, prefix):
+        """
+        Nombre de parties passées par ce préfixe (ou son miroir).
+        """
+        lo, hi = self._range(canonical(prefix, self.cols)[0])
+        return hi - lo
+
+    def next_moves(self, prefix):
+        """
+        Par colonne jouée après le préfixe (0..cols-1, dans l'orientation du préfixe) :
+        parties, victoires et nulles du joueur qui joue ce coup, taux de victoire
+        (nulle = 1/2). Préfixe symétrique (colonnes centrales) : colonne canonique seulement.
+        """
+        key, mirrored = canonical(prefix, self.cols)
+        lo, hi = self._range(key)
+        mover = "1" if len(prefix) % 2 == 0 else "2"
+        out = {}
+        for c in range(1, self.cols + 1):
+            clo, chi = self._range(key + str(c), lo, hi)
+            n = chi - clo
+            if n == 0:
+                continue
+            t = self._totals(clo, chi)
+            col = (self.cols - c if mirrored else c - 1)
+            out[col] = {
+                "games": n,
+                "wins": t[mover],
+                "draws": t["D"],
+                "win_rate": round((t[mover] + 0.5 * t["D"]) / n, 3),
+            }
+        return out
+
+    def games(self, prefix, limit=100):
+        """
+        (id_partie, signature canonique) des parties passées par ce préfixe.
+        """
+        lo, hi = self._range(canonical(prefix, self.cols)[0])
+        hi = min(hi, lo + limit)
+        return [(self.ids[i], self.signatures[i]) for i in range(lo, hi)]
+
+    # ----------------- fichier / base
+    def save(self, path=DEFAULT_PATH):
+        data = {"rows": self.rows, "cols": self.cols, "ids": list(self.ids),
+                "signatures": self.signatures, "results": self.results}
+        Path(path).write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        return cls(int(data["rows"]), int(data["cols"]),
+                   zip(data["ids"], data["signatures"], data["results"]))
+
+    @classmethod
+    def from_db(cls, rows, cols):
+        return cls(rows, cols, entries_from_db(rows, cols))
+
+
+def entries_from_db(rows, cols):
+    """
+    (id_partie, signature, code résultat) des parties en base de cette taille.
+    """
+    from db.db import connection
+
+    sql = """
+    SELECT id_partie, signature, joueur_depart, joueur_gagnant
+    FROM partie
+    WHERE signature ~ '^[0-9]+$'
+      AND COALESCE(rows, 9) = %s AND COALESCE(cols, 9) = %s;
+    """
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(sql, (rows, cols))
+        for row in cur:
+            yield (int(row["id_partie"]), row["signature"],
+                   result_code(row["joueur_depart"], row["joueur_gagnant"]))
+
+
+def load_index(rows, cols, path=DEFAULT_PATH):
+    """
+    Index du fichier 'path' s'il existe et correspond à la taille du plateau, sinon None.
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        index = SignatureIndex.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        print("Index des signatures illisible :", e)
+        return None
+    if (index.rows, index.cols) != (rows, cols):
+        return None
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construit l'index des signatures (explorateur d'ouvertures)")
+    parser.add_argument("--rows", type=int, default=9)
+    parser.add_argument("--cols", type=int, default=9)
+    parser.add_argument("--out", default=str(DEFAULT_PATH))
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    index = SignatureIndex.from_db(args.rows, args.cols)
+    index.save(args.out)
+    size = Path(args.out).stat().st_size
+    print(f"✅ {len(index)} parties -> {args.out} ({size / 1024:.1f} Ko, {time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+import random
+
+from ai import MinimaxAI
+from bitboard import BitBoard
+from evaluation import IncrementalEval
+from game import Connect4Game
+from transposition import EXACT, LOWER, TranspositionTable
+
+
+def random_position(rnd, rows=9, cols=9, max_moves=40):
+    """Partie aléatoire non terminée (on annule le coup gagnant s'il y en a un)."""
+    g = Connect4Game(rows=rows, cols=cols, starting_player="R")
+    for _ in range(rnd.randint(0, max_moves)):
+        valid = g.valid_columns()
+        if not valid:
+            break
+        g.drop(rnd.choice(valid))
+        if g.game_over:
+            g.undo()
+            break
+    return g
+
+
+def root_scores(ai, board, player, depth):
+    out = []
+    for col in ai.ordered_valid_cols(board, player, maximizing=True):
+        r = ai.next_open_row(board, col)
+        board[r][col] = player
+        out.append((col, ai.minimax(board, depth - 1, -10**18, 10**18, False, player, last_move=(r, col))))
+        board[r][col] = 0
+    return out
+
+
+def test_bitboard_roundtrip():
+    rnd = random.Random(1)
+    for _ in range(50):
+        g = random_position(rnd)
+        bb = BitBoard.from_board(g.board, g.rows, g.cols)
+        assert bb.to_board() == g.board
+        assert bb.winner() == g.winner_on_board(g.board)
+
+
+def test_bitboard_backend_same_scores():
+    rnd = random.Random(3)
+    for _ in range(8):
+        g = random_position(rnd, max_moves=20)
+        p = g.current_player
+        a = MinimaxAI(9, 9, backend="list")
+        b = MinimaxAI(9, 9, backend="bitboard", pvs=False, mirror=False)
+        c = MinimaxAI(9, 9, backend="bitboard")
+        assert root_scores(a, g.board, p, 3) == root_scores(b, g.board, p, 3)
+        assert a.nodes == b.nodes
+        assert root_scores(c, g.board, p, 3) == root_scores(a, g.board, p, 3)
+
+
+def test_winner_from_move_matches_full_scan():
+    rnd = random.Random(4)
+    ai = MinimaxAI(9, 9, backend="list")
+    for _ in range(200):
+        g = random_position(rnd, max_moves=60)
+        for col in g.valid_columns():
+            r = g.next_open_row(col)
+            for p in ("R", "J"):
+                g.board[r][col] = p
+                assert ai.winner_from_move(g.board, r, col) == ai.winner_on_board(g.board)
+                g.board[r][col] = 0
+
+
+def test_incremental_eval_matches_heuristic():
+    rnd = random.Random(5)
+    for rows, cols in ((9, 9), (6, 7), (8, 9)):
+        ai = MinimaxAI(rows, cols, backend="list")
+        for _ in range(100):
+            g = random_position(rnd, rows, cols, max_moves=rows * cols)
+            ev = IncrementalEval.from_board(g.board, rows, cols)
+            for p in ("R", "J"):
+                assert ev.score(p) == ai.heuristic(g.board, p)
+
+            # make / unmake : on revient exactement au même score
+            before = dict(ev.total)
+            played = []
+            for _ in range(rnd.randint(1, 6)):
+                valid = [c for c in range(cols) if g.board[0][c] == 0]
+                if not valid:
+                    break
+                col = rnd.choice(valid)
+                r = g.next_open_row(col)
+                p = rnd.choice("RJ")
+                gains = {v: ev.gain(r, col, p, v) + ev.score(v) for v in "RJ"}
+                g.board[r][col] = p
+                ev.play(r, col, p)
+                assert gains == ev.total
+                played.append((r, col, p))
+                assert ev.score("R") == ai.heuristic(g.board, "R")
+                assert ev.score("J") == ai.heuristic(g.board, "J")
+            for r, col, p in reversed(played):
+                g.board[r][col] = 0
+                ev.undo(r, col, p)
+            assert ev.total == before
+
+
+class _NoTT(MinimaxAI):
+    def tt_lookup(self, key, depth, alpha, beta):
+        return None, alpha, beta, -1
+
+
+def test_tt_bounds_keep_search_exact():
+    rnd = random.Random(6)
+    for _ in range(4):
+        g = random_position(rnd, max_moves=25)
+        p = g.current_player
+        for backend, pvs in (("bitboard", True), ("bitboard", False), ("list", False)):
+            with_tt = root_scores(MinimaxAI(9, 9, backend=backend, pvs=pvs), g.board, p, 4)
+            without = root_scores(_NoTT(9, 9, backend=backend, pvs=pvs), g.board, p, 4)
+            assert with_tt == without
+
+
+def test_bitboard_key_matches_board_key():
+    rnd = random.Random(7)
+    ai = MinimaxAI(9, 9)
+    for _ in range(50):
+        g = random_position(rnd)
+        bb = BitBoard.from_board(g.board, 9, 9)
+        assert bb.key == ai.board_key(g.board)
+        valid = bb.valid_cols()
+        if valid:
+            key = bb.key
+            bb.play(valid[0], "R")
+            bb.undo(valid[0], "R")
+            assert bb.key == key
+
+
+def test_tt_replacement_policy():
+    tt = TranspositionTable(size_mb=1)
+    assert tt.memory_bytes() <= 1024 * 1024
+    a = 5
+    b = a + tt.buckets          # même bucket
+    c = a + 2 * tt.buckets
+
+    tt.store(a, 6, EXACT, 10, 3)
+    tt.store(b, 2, LOWER, 20, 1)    # moins profond : entrée always-replace
+    assert tt.probe(a) == (6, EXACT, 10, 3)
+    assert tt.probe(b) == (2, LOWER, 20, 1)
+
+    tt.store(c, 1, EXACT, 30, 0)    # écrase b, garde a
+    assert tt.probe(a) is not None
+    assert tt.probe(b) is None
+    assert tt.probe(c) == (1, EXACT, 30, 0)
+
+    tt.store(b, 8, EXACT, 40, 2)    # plus profond : prend la place de a
+    assert tt.probe(b) == (8, EXACT, 40, 2)
+    assert tt.probe(a) is None
+    assert len(tt) == 2
+
+    tt.clear()
+    assert len(tt) == 0 and tt.probe(b) is None
+
+
+def test_search_matches_fixed_depth_and_respects_budget():
+    rnd = random.Random(8)
+    for _ in range(4):
+        g = random_position(rnd, max_moves=20)
+        p = g.current_player
+        scores = root_scores(MinimaxAI(9, 9), g.board, p, 4)
+        best = max(s for _c, s in scores)
+
+        col, score, depth = MinimaxAI(9, 9).search(g.board, p, max_depth=4)
+        assert depth == 4 or abs(score) >= 10**7
+        if depth == 4:
+            assert score == best and (col, best) in scores
+
+    g = random_position(random.Random(9), max_moves=10)
+    ai = MinimaxAI(9, 9)
+    col, _score, depth = ai.search(g.board, g.current_player, max_depth=40, time_ms=50)
+    assert col in g.valid_columns() and 1 <= depth < 40
+    assert ai.deadline is None
+
+
+def test_parallel_search_matches_search():
+    from parallel_search import ParallelSearch
+
+    rnd = random.Random(10)
+    ps = ParallelSearch(MinimaxAI(9, 9), workers=2, min_depth=3)
+    try:
+        for _ in range(3):
+            g = random_position(rnd, max_moves=20)
+            p = g.current_player
+            expected = MinimaxAI(9, 9).search(g.board, p, max_depth=4)
+            assert ps.search(g.board, p, max_depth=4) == expected
+    finally:
+        ps.shutdown()
+
+
+def test_opening_book_mirror_and_search(tmp_path):
+    from opening_book import OpeningBook, build_book, collect_positions, position_key, tree_positions
+
+    positions = tree_positions(6, 7, 2)
+    collect_positions([("4455", "R", "R"), ("1234", "R", "J")], 6, 7, 3, positions)
+    book = build_book(positions, 6, 7, max_ply=3, depth=4)
+    assert len(book) == len({k for k, p in positions.items() if p["ply"] < 3})
+
+    g = Connect4Game(rows=6, cols=7, starting_player="R")
+    g.drop(1)
+    m = Connect4Game(rows=6, cols=7, starting_player="R")
+    m.drop(5)
+    assert position_key(g.board, "J", 6, 7)[0] == position_key(m.board, "J", 6, 7)[0]
+
+    col, score, depth = book.lookup(g.board, "J")
+    assert book.lookup(m.board, "J") == (6 - col, score, depth)
+    assert (col, score, depth) == MinimaxAI(6, 7).search(g.board, "J", max_depth=4)
+
+    ai = MinimaxAI(6, 7, book=book)
+    assert ai.search(g.board, "J", max_depth=8) == (col, score, depth) and ai.nodes == 0
+
+    # au-delà de max_ply : recherche normale
+    g.drop(3)
+    g.drop(3)
+    assert book.lookup(g.board, "J") is None
+
+    path = tmp_path / "book.json"
+    book.save(path)
+    assert OpeningBook.load(path).entries == book.entries
+
+
+def test_mirror_key_and_mirrored_search():
+    rnd = random.Random(11)
+    ai = MinimaxAI(9, 9)
+    for _ in range(30):
+        g = random_position(rnd, max_moves=20)
+        mirror = [row[::-1] for row in g.board]
+        assert BitBoard.from_board(g.board, 9, 9).mkey == ai.board_key(mirror)
+
+    for _ in range(4):
+        g = random_position(rnd, max_moves=16)
+        p = g.current_player
+        mirror = [row[::-1] for row in g.board]
+        ai = MinimaxAI(9, 9)
+        col, score, depth = ai.search(g.board, p, max_depth=5)
+        # même table : le miroir est retrouvé et le coup retourné
+        mcol, mscore, mdepth = ai.search(mirror, p, max_depth=5)
+        assert mscore == score and mdepth == depth
+        assert (8 - mcol, score) in root_scores(MinimaxAI(9, 9, mirror=False), g.board, p, depth)
+
+
+def test_engine_pool_per_game_cache_and_eviction():
+    import threading
+
+    from engine_pool import EnginePool
+
+    pool = EnginePool(9, 9, tt_mb=1, max_games=2, idle_s=60, workers=1)
+    rnd = random.Random(12)
+    games = [random_position(rnd, max_moves=16) for _ in range(3)]
+    expected = [MinimaxAI(9, 9).search(g.board, g.current_player, max_depth=4) for g in games]
+
+    results = {}
+
+    def run(i):
+        g = games[i]
+        results[i] = pool.search(i, g.board, g.current_player, max_depth=4)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in (0, 1)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert [results[0], results[1]] == expected[:2]
+
+    # même partie : même moteur, table déjà remplie
+    engine = pool.acquire(1).search.engine
+    assert len(engine.tt) > 0
+    probes, hits = engine.tt.probes, engine.tt.hits
+    assert pool.search(1, games[1].board, games[1].current_player, max_depth=4) == expected[1]
+    assert engine.tt.hits - hits > (engine.tt.probes - probes) // 2
+
+    # 3e partie : la partie 0 (la moins récente) est évincée
+    assert pool.search(2, games[2].board, games[2].current_player, max_depth=4) == expected[2]
+    assert len(pool) == 2 and pool.acquire(1).search.engine is engine
+    pool.release(1)
+    assert pool.stats()["games"] == 1 and pool.stats()["evicted"] == 2
+
+
+def test_engine_pool_parallel_workers_keep_one_engine_per_game():
+    import parallel_search
+    from engine_pool import EnginePool
+
+    rnd = random.Random(13)
+    games = [random_position(rnd, max_moves=16) for _ in range(2)]
+    expected = [MinimaxAI(9, 9).search(g.board, g.current_player, max_depth=4) for g in games]
+
+    pool = EnginePool(9, 9, tt_mb=1, max_games=4, workers=2, min_depth=3, worker_tt_mb=1)
+    try:
+        for _ in range(2):
+            for i, g in enumerate(games):
+                # (col, score) : sur un gain forcé, la recherche parallèle s'arrête plus tôt
+                assert pool.search(i, g.board, g.current_player, max_depth=4)[:2] == expected[i][:2]
+        assert pool.acquire(0).search.key == 0 and pool.acquire(1).search.key == 1
+    finally:
+        pool.shutdown()
+
+    # côté worker : un moteur par clé, au plus worker_games, le moins récent libéré
+    parallel_search._worker_engines.clear()
+    g = games[0]
+    col = g.valid_columns()[0]
+    for key in (10, 11, 10, 12):
+        parallel_search._search_child(9, 9, 1, [row[:] for row in g.board], g.current_player,
+                                      col, 2, None, key=key, worker_games=2)
+    assert list(parallel_search._worker_engines) == [10, 12]
+    parallel_search._worker_engines.clear()
+
+
+def test_signature_index_matches_scan():
+    from signature_index import SignatureIndex, canonical, result_code
+
+    rnd = random.Random(22)
+    entries = []
+    for pid in range(300):
+        sig = "".join(str(rnd.choice((4, 5, 5, 6, 3))) for _ in range(rnd.randint(1, 8)))
+        entries.append((pid, sig, result_code("R", rnd.choice(("R", "J", "D", None)))))
+    index = SignatureIndex(9, 9, entries)
+
+    for prefix in ("", "5", "55", "4", "6", "45", "65", "5543"):
+        key = canonical(prefix, 9)[0]
+        passing = [e for e in entries if canonical(e[1], 9)[0].startswith(key)]
+        assert index.count(prefix) == len(passing)
+        assert sorted(pid for pid, _s in index.games(prefix, limit=1000)) == sorted(e[0] for e in passing)
+        assert sum(m["games"] for m in index.next_moves(prefix).values()) == \
+            sum(1 for e in passing if len(e[1]) > len(prefix))
+
+    # miroir : mêmes statistiques, colonnes retournées
+    assert index.next_moves("4") == {8 - c: m for c, m in index.next_moves("6").items()}
+
+
+def test_validate_game_replays_and_flags_corruption():
+    from db.db import board_to_text, canonical_signature_from_history
+    from validate_games import validate_game
+
+    rnd = random.Random(25)
+    g = Connect4Game(rows=9, cols=9, starting_player="R")
+    boards = []
+    while not g.game_over:
+        _ok, line = g.drop(rnd.choice(g.valid_columns()))
+        boards.append(board_to_text(g.board))
+    winner = g.history[-1][2] if line else "D"
+    game = {
+        "id_partie": 1, "rows": 9, "cols": 9, "joueur_depart": "R",
+        "signature": canonical_signature_from_history(g.history, 9),   # éventuellement miroir
+        "joueur_gagnant": winner, "status": "TERMINEE" if line else "NULLE",
+        "ligne_gagnante": str([[r, c] for r, c in line]) if line else None,
+        "numeros": list(range(1, len(boards) + 1)), "plateaux": boards,
+        "joueurs": [p for _r, _c, p in g.history],
+    }
+    assert validate_game(game) == []
+
+    broken = dict(game, plateaux=boards[:3] + [boards[2]] + boards[4:])
+    assert [(i["type"], i["coup"]) for i in validate_game(broken)] == [("plateau", 4)]
+    if line:
+        other = "J" if winner == "R" else "R"
+        assert {i["type"] for i in validate_game(dict(game, joueur_gagnant=other))} == {"gagnant"}
+        assert {i["type"] for i in validate_game(dict(game, ligne_gagnante="[[0, 0]]"))} == {"ligne"}
@@ -0,0 +1,102 @@
+import random
+
+import pytest
+
+from game import Connect4Game
+from test_ai import random_position
+
+
+def test_compact_game_rebuilds_every_ply():
+    from db.compact import SNAPSHOT_EVERY, CompactGame
+
+    rnd = random.Random(14)
+    for _ in range(20):
+        g = random_position(rnd, max_moves=60)
+        cg = CompactGame.from_history(g.history, 9, 9)
+        assert len(cg.snapshots) == len(g.history) // SNAPSHOT_EVERY * 24
+        assert cg.history() == [tuple(h) for h in g.history]
+        assert cg.board_at(len(cg)) == g.board
+        replay = Connect4Game(rows=9, cols=9, starting_player="R")
+        for ply, (_r, c, _p) in enumerate(g.history, start=1):
+            replay.drop(c)
+            assert cg.board_at(ply) == replay.board
+
+
+def test_compact_move_out_of_sync_is_not_lost():
+    from db.compact import CompactGame, CompactSyncError, check_applied, check_lengths, commit_move_params
+
+    check_applied({"applied": 1, "stored": 2}, 1, 3)
+    check_applied({"applied": 0, "stored": 3}, 1, 3)   # coup rejoué
+    for stored in (None, 1):
+        with pytest.raises(CompactSyncError):
+            check_applied({"applied": 0, "stored": stored}, 1, 3)
+
+    recs = [{"id_partie": 1, "numero_coup": 4}, {"id_partie": 1, "numero_coup": 5}, {"id_partie": 2, "numero_coup": 1}]
+    check_lengths([{"id_partie": 1, "stored": 5}, {"id_partie": 2, "stored": 1}], recs)
+    with pytest.raises(CompactSyncError):
+        check_lengths([{"id_partie": 1, "stored": 4}, {"id_partie": 2, "stored": 1}], recs)
+
+    with pytest.raises(ValueError):
+        commit_move_params(1, 1, 9, "R", "", 9, 10)
+    with pytest.raises(ValueError):
+        CompactGame(9, 10)
+
+
+def test_position_hash_ignores_move_order_and_mirror():
+    from db.positions import position_hash
+
+    def play(cols):
+        g = Connect4Game(rows=9, cols=9, starting_player="R")
+        for c in cols:
+            g.drop(c)
+        return g.board
+
+    a = play([4, 3, 2, 5])
+    b = play([2, 5, 4, 3])                 # autre ordre, même plateau
+    m = play([4, 5, 6, 3])                 # miroir de a
+    assert position_hash(a, "R") == position_hash(b, "R") == position_hash(m, "R")
+    assert position_hash(a, "R") != position_hash(a, "J")
+    assert position_hash(a, "R") != position_hash(play([4, 3, 2, 6]), "R")
+
+
+def test_journal_counts_failed_retry_after_duplicate_signature(tmp_path, monkeypatch):
+    from contextlib import contextmanager
+
+    import psycopg2.errors
+
+    from db import journal
+
+    calls = []
+
+    class Cursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, sql, params=None):
+            calls.append(params["set_signature"])
+            if params["set_signature"]:
+                raise psycopg2.errors.UniqueViolation("signature en double")
+            raise psycopg2.errors.CheckViolation("coup refusé")
+
+    @contextmanager
+    def connection():
+        yield type("Conn", (), {"cursor": lambda self: Cursor()})()
+
+    def execute_batch(cur, sql, params):
+        raise psycopg2.errors.UniqueViolation("signature en double")
+
+    monkeypatch.setattr(journal, "connection", connection)
+    monkeypatch.setattr(journal, "execute_batch", execute_batch)
+
+    j = journal.MoveJournal(tmp_path / "moves.jsonl", flush_interval_s=0.01)
+    j.start()
+    j.append(1, 1, "plateau", "R", signature="5")
+    j.append(1, 2, "plateau", "J", signature="55")
+    assert j.flush(timeout=5)   # le thread d'écriture est toujours vivant
+    assert calls == [True, False, True, False]
+    assert j.stats()["errors"] == 2 and j.stats()["pending"] == 0
+    assert j.stats()["written"] == 0
+    j.close()
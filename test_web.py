@@ -0,0 +1,122 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Webapp"))
+
+
+def test_game_store_evicts_finished_first_and_idle_games():
+    from game_store import GameStore
+
+    store = GameStore(max_games=3, idle_s=3600)
+    store.put(1, {"game_over": False})
+    store.put(2, {"game_over": True})
+    store.put(3, {"game_over": False})
+    assert store.get(1) is not None
+    store.put(4, {"game_over": False})
+    assert 2 not in store and len(store) == 3      # terminée évincée avant la plus ancienne
+    store.put(5, {"game_over": False})
+    assert 3 not in store and 1 in store           # puis la moins récemment utilisée
+
+    first = store.get(1)
+    assert store.put(1, {"game_over": False}, loaded=True) is first
+
+    store.idle_s = 0
+    store._used[1] -= 1
+    store.put(6, {})
+    assert 1 not in store and store.stats()["expired"] >= 1
+
+
+def test_asgi_move_and_state_endpoints(monkeypatch):
+    pytest.importorskip("starlette")
+    pytest.importorskip("httpx")
+    from starlette.testclient import TestClient
+
+    import asgi
+
+    # base en mémoire : création de partie et coups enregistrés
+    moves = []
+
+    async def q_one(sql, params=()):
+        assert sql == asgi.web.CREATE_PARTIE_SQL
+        return {"id_partie": 7}
+
+    async def commit_move(id_partie, numero_coup, plateau, joueur, **kw):
+        moves.append((id_partie, numero_coup, joueur, kw.get("signature")))
+        return len(moves)
+
+    monkeypatch.setattr(asgi.aio, "q_one", q_one)
+    monkeypatch.setattr(asgi.aio, "commit_move", commit_move)
+    monkeypatch.setattr(asgi, "STORAGE", "text")
+    monkeypatch.setattr(asgi, "server", asgi.web.make_server())
+
+    client = TestClient(asgi.app)
+    g = client.post("/api/new", json={"mode": "IA", "difficulty": "easy", "starting_player": "R"}).json()
+    assert g["id_partie"] == 7 and g["ai_player"] == "J"
+
+    assert client.post("/api/ai_move", json={"game_id": 7}).json()["error"] == "Ce n'est pas au tour de l'IA"
+    s = client.post("/api/play", json={"game_id": 7, "col": 4}).json()
+    assert s["signature"] == "5" and s["current_player"] == "J" and s["board"][8][4] == "R"
+    s = client.post("/api/ai_move", json={"game_id": 7}).json()
+    assert s["current_player"] == "R" and len(s["signature"]) == 2
+    assert moves == [(7, 1, "R", "5"), (7, 2, "J", s["signature"])]
+
+    r = client.get("/api/state", params={"game_id": 7})
+    assert r.json()["version"] == s["version"]
+    assert client.get("/api/state", params={"game_id": 7},
+                      headers={"If-None-Match": r.headers["etag"]}).status_code == 304
+    assert client.get("/api/state", params={"game_id": 7, "since_version": s["version"]}).json() == {
+        "changed": False, "version": s["version"]}
+    assert client.post("/api/play", json={"game_id": 7, "col": 99}).json()["error"] == "Colonne invalide"
+
+
+def test_evicted_game_reloads_settings_seats_and_move_count():
+    import game_logic as web
+    from db.compact import CompactGame
+    from event_hub import EventHub
+    from game_store import GameStore
+
+    server = web.GameServer(GameStore(max_games=1), EventHub(), ai_pool=None)
+
+    def partie_row(g, pid, signature):
+        # ligne partie telle qu'écrite par CREATE_PARTIE_SQL puis SEATS_SQL
+        _sig, params = web.create_partie_params(g)
+        names = ["mode", "type_partie", "status", "joueur_depart", "signature", "rows", "cols",
+                 "nb_colonnes", "confiance", "ai_depth", "ai_time_ms"]
+        row = dict(zip(names, params), id_partie=pid, signature=signature,
+                   joueur_gagnant=None, ligne_gagnante=None)
+        row["client_r"], row["client_j"], _pid = web.seats_params(g)
+        return row
+
+    # partie "hard" contre l'IA : profondeur et budget reviennent avec la partie
+    ia = web.new_game_state({"mode": "IA", "difficulty": "hard"})
+    server.start_game(ia, 1, "init_a")
+    reloaded = web.state_from_rows(partie_row(ia, 1, "init_a"), None, None)
+    assert (reloaded["ai_depth"], reloaded["ai_time_ms"]) == (12, 1500)
+
+    # partie en ligne : deux places prises, quatre coups, puis évincée par une autre partie
+    g = web.new_game_state({"mode": "ONLINE"})
+    server.start_game(g, 2, "init_b")
+    assert server.register_client(g, "a") and server.register_client(g, "b")
+    records = []
+    for col in (4, 4, 3, 5):
+        _row, _line, _joueur, record = web.place_move(col, g)
+        web.next_turn(g)
+        records.append(record)
+    server.start_game(web.new_game_state({"mode": "ONLINE"}), 3, "init_c")
+    assert 2 not in server.games
+
+    # signature en base restée au 2e coup (collision UNIQUE, set_signature=False)
+    last_sit = {"id_situation": 40, "numero_coup": 4, "plateau": records[-1]["plateau"],
+                "plateaux": [r["plateau"] for r in records]}
+    cg = CompactGame(9, 9, "5546", "".join(r["joueur"] for r in records))
+    for last, compact in ((last_sit, None), (None, cg)):
+        s = web.state_from_rows(partie_row(g, 2, "55"), last, compact)
+        assert s["board"] == g["board"] and s["current_player"] == g["current_player"]
+        assert (s["move_count"], s["signature"]) == (4, "5546")
+        assert (s["client_r"], s["client_j"]) == (g["client_r"], g["client_j"])
+        assert server.register_client(s, "a") is False
+        with pytest.raises(ValueError):
+            server.register_client(s, "c")
+        assert web.place_move(0, s)[3]["numero"] == 5
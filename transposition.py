@@ -0,0 +1,123 @@
+# transposition.py
+"""
+Clés Zobrist 64 bits et table de transposition de taille fixe.
+
+- Clé Zobrist : XOR d'un nombre aléatoire par (joueur, case occupée). Poser ou
+  retirer un pion = un seul XOR, la clé se maintient donc en O(1) pendant la recherche.
+  La clé du plateau miroir (gauche-droite) se maintient de la même façon : la
+  recherche range une position et son miroir sous la même clé (la plus petite).
+- Table : tableaux (module array) alloués une fois pour toutes, rangés en buckets
+  de 2 entrées : la 1re garde la recherche la plus profonde (depth-preferred),
+  la 2e est toujours remplacée (always-replace). La mémoire ne grossit plus avec
+  le nombre de parties jouées.
+"""
+import random
+from array import array
+
+EXACT = 0
+LOWER = 1   # score >= valeur (coupure beta)
+UPPER = 2   # score <= valeur (aucun coup n'a dépassé alpha)
+
+# octets par entrée : clé (Q) + valeur (q) + profondeur (b) + drapeau (b) + coup (b)
+ENTRY_BYTES = 8 + 8 + 1 + 1 + 1
+
+_ZOBRIST = {}
+
+
+def zobrist_keys(rows, cols):
+    """
+    {"R": (...), "J": (...)} : un entier 64 bits par bit du bitboard
+    (index col * (rows + 1) + hauteur). Tirage déterministe par taille de plateau.
+    """
+    key = (rows, cols)
+    table = _ZOBRIST.get(key)
+    if table is None:
+        rnd = random.Random(rows * 1000 + cols)
+        n = cols * (rows + 1)
+        table = _ZOBRIST[key] = {
+            "R": tuple(rnd.getrandbits(64) for _ in range(n)),
+            "J": tuple(rnd.getrandbits(64) for _ in range(n)),
+        }
+    return table
+
+
+def mirror_zobrist_keys(rows, cols):
+    """
+    Comme zobrist_keys, mais indexé par le bit de la case symétrique (gauche-droite) :
+    XOR des entrées des pions posés = clé Zobrist du plateau miroir.
+    """
+    key = (rows, cols, "miroir")
+    table = _ZOBRIST.get(key)
+    if table is None:
+        z = zobrist_keys(rows, cols)
+        h = rows + 1
+        table = _ZOBRIST[key] = {
+            p: tuple(z[p][(cols - 1 - i // h) * h + i % h] for i in range(cols * h))
+            for p in ("R", "J")
+        }
+    return table
+
+
+# clé du "camp" : qui est l'IA et est-ce à elle de jouer
+_rnd = random.Random(0xC4C4)
+SIDE_KEYS = {
+    (p, maximizing): _rnd.getrandbits(64)
+    for p in ("R", "J") for maximizing in (False, True)
+}
+del _rnd
+
+
+class TranspositionTable:
+    def __init__(self, size_mb=16):
+        self.size_mb = size_mb
+        buckets = 1
+        while buckets * 4 * ENTRY_BYTES <= size_mb * 1024 * 1024:
+            buckets *= 2
+        self.buckets = buckets
+        self.mask = buckets - 1
+        self.probes = 0
+        self.hits = 0
+        self.clear()
+
+    def clear(self):
+        n = self.buckets * 2
+        self.keys = array("Q", [0]) * n
+        self.values = array("q", [0]) * n
+        self.depths = array("b", [-1]) * n   # -1 = entrée vide
+        self.flags = array("b", [0]) * n
+        self.moves = array("b", [-1]) * n
+        self.filled = 0
+
+    def __len__(self):
+        return self.filled
+
+    def memory_bytes(self):
+        return self.buckets * 2 * ENTRY_BYTES
+
+    def probe(self, key):
+        """
+        Retourne (depth, flag, value, move) ou None.
+        """
+        self.probes += 1
+        i = (key & self.mask) << 1
+        keys = self.keys
+        if keys[i] != key or self.depths[i] < 0:
+            i += 1
+            if keys[i] != key or self.depths[i] < 0:
+                return None
+        self.hits += 1
+        return self.depths[i], self.flags[i], self.values[i], self.moves[i]
+
+    def store(self, key, depth, flag, value, move=-1):
+        i = (key & self.mask) << 1
+        old_depth = self.depths[i]
+        # entrée 0 : on garde la plus profonde ; sinon entrée 1 (toujours remplacée)
+        if not (old_depth < 0 or self.keys[i] == key or depth >= old_depth):
+            i += 1
+        if self.depths[i] < 0:
+            self.filled += 1
+        self.keys[i] = key
+        self.depths[i] = depth
+        self.flags[i] = flag
+        self.values[i] = value
+        self.moves[i] = move
@@ -2,17 +2,21 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import json
+import atexit
 from pathlib import Path
 import random
 import os
 
 from game import Connect4Game
 from ai import MinimaxAI
+from parallel_search import ParallelSearch
+from opening_book import load_book
 from db.db import (
-    canonical_signature_from_history, create_partie, insert_situation, update_links,
+    SITUATION_LINKS, canonical_signature_from_history, create_partie, insert_situation, update_links,
     finish_partie, delete_partie, board_to_text, moves_signature,
     update_partie_signature
 )
+from db.journal import MoveJournal
 from psycopg2 import IntegrityError
 
 
@@ -61,12 +65,22 @@ class Connect4UI(tk.Tk):
 
         # ---- Game + AI ----
         self.game = Connect4Game(self.rows, self.cols, self.starting_player)
-        self.ai = MinimaxAI(self.rows, self.cols)
+        self.ai = MinimaxAI(self.rows, self.cols, book=load_book(self.rows, self.cols))
+        # colonnes racines réparties sur tous les coeurs à partir de la profondeur 6
+        self.ai_parallel = ParallelSearch(self.ai, min_depth=6)
 
         self.db_enabled = True
         self.db_partie_id = None
         self.db_last_situation_id = None
 
+        # UI_MOVE_JOURNAL=chemin : coups écrits en base en arrière-plan (write-behind)
+        self.db_journal = None
+        journal_path = os.getenv("UI_MOVE_JOURNAL")
+        if journal_path:
+            self.db_journal = MoveJournal(journal_path)
+            self.db_journal.start()
+            atexit.register(self.db_journal.close)
+
         # ---- état UI / IA ----
         self.game_id = 0
         self.paused = False
@@ -77,6 +91,7 @@ class Connect4UI(tk.Tk):
         self.ai_iter_depth = 0
         self.ai_iter_cols = []
         self.ai_iter_col_idx = 0
+        self.ai_futures = None
         self.ai_scores = [None for _ in range(self.cols)]
 
         self._build_ui()
@@ -230,8 +245,18 @@ class Connect4UI(tk.Tk):
             except Exception:
                 pass
             self.ai_thinking_job = None
+        if self.ai_futures is not None:
+            for f in self.ai_futures:
+                f.cancel()
+            self.ai_futures = None
         self.thinking_var.set("")
 
+    def destroy(self):
+        # fermeture de la fenêtre : arrêter la recherche et les processus workers
+        self._cancel_ai_thinking()
+        self.ai_parallel.shutdown(wait=False)
+        super().destroy()
+
     def schedule_ai_if_needed(self):
         if self.game.game_over or self.paused:
             return
@@ -294,6 +319,12 @@ class Connect4UI(tk.Tk):
             self.status_var.set("Match nul")
             return
 
+        # position connue du livre d'ouvertures : pas de recherche
+        hit = self.ai.book_move(self.game.board, self.game.current_player)
+        if hit is not None:
+            self.play_move(hit[0])
+            return
+
         self.ai_scores = [None for _ in range(self.cols)]
         for c in self.ai_iter_cols:
             self.ai_scores[c] = 0
@@ -323,6 +354,19 @@ class Connect4UI(tk.Tk):
             self.ai_thinking_job = self.after(10, lambda: self._mm_step_depth(max_depth))
             return
 
+        # profondeur >= 6 : toutes les colonnes de l'itération en parallèle
+        if (self.ai_iter_col_idx == 0 and self.ai_parallel.workers > 1
+                and self.ai_iter_depth >= self.ai_parallel.min_depth):
+            try:
+                self.ai_futures = self.ai_parallel.submit_root(
+                    self.game.board, self.game.current_player, self.ai_iter_cols, self.ai_iter_depth
+                )
+            except Exception as e:
+                self._mm_serial_fallback(max_depth, e)
+                return
+            self.ai_thinking_job = self.after(45, lambda: self._mm_poll_parallel(max_depth))
+            return
+
         col = self.ai_iter_cols[self.ai_iter_col_idx]
         self.ai_iter_col_idx += 1
 
@@ -340,13 +384,51 @@ class Connect4UI(tk.Tk):
                 alpha=-10**9,
                 beta=10**9,
                 maximizing=False,
-                ai_player=ai_player
+                ai_player=ai_player,
+                last_move=(r, col)
             )
 
         self.ai_scores[col] = score
         self.draw_column_numbers()
         self.ai_thinking_job = self.after(45, lambda: self._mm_step_depth(max_depth))
 
+    def _mm_poll_parallel(self, max_depth):
+        if self.game.game_over or self.paused or self.ai_futures is None:
+            self._cancel_ai_thinking()
+            return
+
+        try:
+            for f in self.ai_futures:
+                if f.done() and not f.cancelled():
+                    col, score, _nodes = f.result()
+                    self.ai_scores[col] = score
+        except Exception as e:
+            self._mm_serial_fallback(max_depth, e)
+            return
+        self.draw_column_numbers()
+
+        if all(f.done() for f in self.ai_futures):
+            self.ai_futures = None
+            self.ai_iter_col_idx = len(self.ai_iter_cols)
+            self.ai_thinking_job = self.after(10, lambda: self._mm_step_depth(max_depth))
+        else:
+            self.ai_thinking_job = self.after(45, lambda: self._mm_poll_parallel(max_depth))
+
+    def _mm_serial_fallback(self, max_depth, err):
+        """
+        Pool de processus en échec (worker mort, pickling...) : on l'arrête, on reste
+        en série pour la suite et on joue le coup de self.ai.search.
+        """
+        print("Recherche parallèle indisponible, recherche en série :", err)
+        self._cancel_ai_thinking()
+        self.ai_parallel.shutdown(wait=False)
+        self.ai_parallel.workers = 1
+
+        col, _score, _depth = self.ai.search(self.game.board, self.game.current_player, max_depth)
+        if col is None:
+            col = self._mm_pick_best_move()
+        self.play_move(col)
+
     def _mm_pick_best_move(self):
         valid = self.game.valid_columns()
         if not valid:
@@ -409,8 +491,10 @@ class Connect4UI(tk.Tk):
                 self.db_last_situation_id = None
 
                 # Mettre tout de suite la signature canonique du 1er coup
-                sig0 = canonical_signature_from_history(self.game.history, self.cols)
-                update_partie_signature(self.db_partie_id, sig0)
+                # (en écriture différée : avec le coup, dans le journal)
+                if self.db_journal is None:
+                    sig0 = canonical_signature_from_history(self.game.history, self.cols)
+                    update_partie_signature(self.db_partie_id, sig0)
 
             except IntegrityError:
                 # Cas rare: si ton create_partie / update_signature déclenche un conflit
@@ -424,7 +508,9 @@ class Connect4UI(tk.Tk):
                 self.db_last_situation_id = None
 
         # ✅ DB: sauvegarder la situation après chaque coup
-        if self.db_enabled and self.db_partie_id is not None:
+        if self.db_enabled and self.db_partie_id is not None and self.db_journal is not None:
+            self._journal_move(winning)
+        elif self.db_enabled and self.db_partie_id is not None:
             num = len(self.game.history)  # 1er coup => 1
             plateau_txt = board_to_text(self.game.board)
             joueur = self.game.history[-1][2]  # "R" ou "J"
@@ -434,10 +520,11 @@ class Connect4UI(tk.Tk):
                 numero_coup=num,
                 plateau=plateau_txt,
                 joueur=joueur,
-                precedent=self.db_last_situation_id,
+                precedent=self.db_last_situation_id if SITUATION_LINKS == "stored" else None,
                 suivant=None
             )
-            if self.db_last_situation_id is not None:
+            # SITUATION_LINKS=ply : chaînage posé par finish_partie en fin de partie
+            if self.db_last_situation_id is not None and SITUATION_LINKS == "stored":
                 update_links(self.db_last_situation_id, new_id)
             self.db_last_situation_id = new_id
 
@@ -470,8 +557,8 @@ class Connect4UI(tk.Tk):
                 self.highlight_winner(winning)
             self.draw_column_numbers()
 
-            # ✅ DB: clôturer la partie
-            if self.db_enabled and self.db_partie_id is not None:
+            # ✅ DB: clôturer la partie (déjà dans le journal en écriture différée)
+            if self.db_enabled and self.db_partie_id is not None and self.db_journal is None:
                 sig = canonical_signature_from_history(self.game.history, self.cols)
 
                 if self.game.result == "Match nul":
@@ -503,6 +590,39 @@ class Connect4UI(tk.Tk):
         self.status_var.set("Rouge" if self.game.current_player == "R" else "Jaune")
         self.schedule_ai_if_needed()
 
+    def _journal_move(self, winning):
+        """
+        Coup (et fin de partie) mis dans le journal : pas d'attente de la base.
+        La signature n'est envoyée qu'au premier et au dernier coup : une partie
+        abandonnée ne garde pas un préfixe qui bloquerait les parties suivantes.
+        Signature finale déjà prise (partie ou symétrie déjà en base) -> la partie est
+        supprimée ; au premier coup, la partie est gardée sans signature.
+        """
+        finish = {}
+        if self.game.game_over:
+            if self.game.result == "Match nul":
+                finish = dict(status="NULLE")
+            else:
+                finish = dict(
+                    status="TERMINEE",
+                    joueur_gagnant="R" if self.game.result == "Rouge" else "J",
+                    ligne_gagnante=";".join(f"({r},{c})" for (r, c) in (winning or [])),
+                )
+
+        sig = None
+        if len(self.game.history) == 1 or self.game.game_over:
+            sig = canonical_signature_from_history(self.game.history, self.cols)
+
+        self.db_journal.append(
+            self.db_partie_id,
+            len(self.game.history),
+            board_to_text(self.game.board),
+            self.game.history[-1][2],
+            signature=sig,
+            on_conflict="delete" if self.game.game_over else "keep",
+            **finish
+        )
+
     # ============================================================
     # DRAW
     # ============================================================
@@ -711,6 +831,7 @@ class Connect4UI(tk.Tk):
 
             self.game.set_params(r, c, sp)
             self.ai.reset_params(r, c)
+            self.ai.book = load_book(r, c)
 
             self.ai_scores = [None for _ in range(self.cols)]
             self.paused = False
@@ -836,6 +957,9 @@ class Connect4UI(tk.Tk):
         if pick_partie_id_dialog is None or load_partie_for_play is None:
             messagebox.showerror("Erreur", "Le module explorer_tool n'est pas disponible.")
             return
+        if self.db_journal is not None:
+            # les derniers coups joués doivent être en base avant de relire
+            self.db_journal.flush(timeout=5)
 
         if self.paused:
             messagebox.showinfo("Info", "Reprends la partie avant de charger.")
@@ -0,0 +1,380 @@
+# validate_games.py
+"""
+Audit des parties en base : chaque partie est rejouée depuis sa signature (ou ses
+coups partie_coups) et comparée à ce qui est stocké.
+
+- coups : colonne hors plateau ou pleine, coup joué après la fin de la partie ;
+- situations : numérotation 1..n, nombre de coups, plateau après chaque coup
+  (signature lue dans les deux sens : les signatures canoniques peuvent être miroir) ;
+- partie_coups : signature, snapshots ;
+- résultat : joueur_gagnant, status, ligne_gagnante (4 pions alignés du gagnant).
+
+Les parties sont lues par un curseur serveur (une requête, lignes par paquets),
+vérifiées par paquets dans un pool de processus ; chaque anomalie est une ligne
+JSON du rapport : {"id_partie", "type", "coup", "detail"}.
+
+    python validate_games.py                           # toutes les parties, un processus par coeur
+    python validate_games.py --workers 8 --out rapport.jsonl
+    python validate_games.py --from-id 120000 --limit 5000
+"""
+import argparse
+import json
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from bitboard import BitBoard
+from db.compact import CompactGame
+
+_SIGNATURE_RE = re.compile(r"^[0-9]*$")
+_INT_RE = re.compile(r"-?\d+")
+
+
+# =======================
+# REJEU
+# =======================
+def normalize_plateau(text):
+    """
+    Texte de plateau comparable à replay() : lignes sans blancs autour, "." -> "0".
+    """
+    if text is None:
+        return None
+    return "\n".join(line.strip() for line in text.strip().splitlines()).replace(".", "0")
+
+
+def replay(moves, players, rows, cols, texts=False):
+    """
+    Rejoue les colonnes 'moves' (0..cols-1), players[i] = couleur du coup i.
+    Retourne un dict : history [(row, col, joueur)], winner / win_ply (premier alignement),
+    full, error (type, coup, détail) ou None, et avec texts=True le plateau texte après chaque coup.
+    """
+    bb = BitBoard(rows, cols)
+    stride = cols + 1
+    cells = list("\n".join(["0" * cols] * rows))
+    out = {"history": [], "winner": None, "win_ply": None, "full": False, "error": None,
+           "texts": [] if texts else None}
+    for ply, (col, player) in enumerate(zip(moves, players), start=1):
+        if not (0 <= col < cols):
+            out["error"] = ("coup_invalide", ply, f"colonne {col + 1} hors plateau")
+            break
+        if not bb.can_play(col):
+            out["error"] = ("coup_invalide", ply, f"colonne {col + 1} pleine")
+            break
+        if out["winner"] is not None:
+            out["error"] = ("coup_apres_fin", ply, f"partie gagnée au coup {out['win_ply']}")
+            break
+        row = bb.play(col, player)
+        out["history"].append((row, col, player))
+        cells[row * stride + col] = player
+        if texts:
+            out["texts"].append("".join(cells))
+        if bb.is_win(bb.bits[player]):
+            out["winner"], out["win_ply"] = player, ply
+    out["full"] = bb.count == rows * cols
+    out["board"] = bb.to_board()
+    return out
+
+
+def alternate(first, n):
+    other = "J" if first == "R" else "R"
+    return [first if i % 2 == 0 else other for i in range(n)]
+
+
+def parse_line(text):
+    """
+    Cases d'une ligne gagnante, quel que soit son format ("[[r, c], ...]", "(r,c);(r,c)").
+    """
+    nums = [int(x) for x in _INT_RE.findall(text or "")]
+    return [(nums[i], nums[i + 1]) for i in range(0, len(nums) - 1, 2)]
+
+
+def line_ok(cells, board, winner):
+    """
+    Au moins 4 cases consécutives alignées, toutes au gagnant.
+    """
+    if len(cells) < 4:
+        return False
+    rows, cols = len(board), len(board[0])
+    cells = sorted(cells)
+    dr, dc = cells[1][0] - cells[0][0], cells[1][1] - cells[0][1]
+    if (dr, dc) == (0, 0) or abs(dr) > 1 or abs(dc) > 1:
+        return False
+    for (r0, c0), (r1, c1) in zip(cells, cells[1:]):
+        if (r1 - r0, c1 - c0) != (dr, dc):
+            return False
+    return all(0 <= r < rows and 0 <= c < cols and board[r][c] == winner for r, c in cells)
+
+
+# =======================
+# VÉRIFICATION D'UNE PARTIE
+# =======================
+def validate_game(g):
+    """
+    Anomalies d'une partie (dict lu par GAMES_SQL) : [{"id_partie", "type", "coup", "detail"}].
+    """
+    pid = g["id_partie"]
+    rows, cols = g["rows"], g["cols"]
+    issues = []
+
+    def issue(kind, ply=None, detail=""):
+        issues.append({"id_partie": pid, "type": kind, "coup": ply, "detail": detail})
+
+    sig = g.get("signature") or ""
+    if sig.startswith("init"):
+        sig = ""
+    if not _SIGNATURE_RE.match(sig):
+        issue("signature", None, f"signature non numérique {sig[:40]!r}")
+        sig = ""
+    sig_moves = [int(ch) - 1 for ch in sig]
+    mirrored = [cols - 1 - c for c in sig_moves]
+    depart = (g.get("joueur_depart") or "R").upper()
+
+    numeros = g.get("numeros") or []
+    oriented = True   # orientation réelle des coups connue
+    if g.get("coups") is not None:
+        # stockage compact : coups réels et couleurs
+        moves = [int(ch) - 1 for ch in g["coups"]]
+        players = list(g.get("coups_joueurs") or "")
+        if len(players) != len(moves):
+            issue("compact", None, f"{len(moves)} coups, {len(players)} couleurs")
+            players = alternate(depart, len(moves))
+        if sig and min(sig_moves, mirrored) != min(moves, [cols - 1 - c for c in moves]):
+            issue("signature", None, "signature différente des coups partie_coups")
+        res = replay(moves, players, rows, cols)
+        if res["error"] is None:
+            expected = CompactGame.from_history(res["history"], rows, cols).snapshots
+            if bytes(g.get("snapshots") or b"") != expected:
+                issue("compact", None, "snapshots différents du rejeu")
+    elif numeros:
+        if numeros != list(range(1, len(numeros) + 1)):
+            issue("numerotation", None, f"numero_coup {numeros[:10]}...")
+        plateaux = [normalize_plateau(p) for p in g["plateaux"]]
+        players = list(g.get("joueurs") or [])
+        if len(sig_moves) != len(plateaux):
+            issue("longueur", None, f"signature {len(sig_moves)} coups, {len(plateaux)} situations")
+        if len(players) != len(sig_moves) or any(p not in ("R", "J") for p in players):
+            players = alternate(depart, len(sig_moves))
+
+        # sens de la signature : celui qui reproduit les plateaux stockés
+        best = None
+        for candidate in (sig_moves, mirrored):
+            res = replay(candidate, players, rows, cols, texts=True)
+            bad = next((i for i, (a, b) in enumerate(zip(res["texts"], plateaux)) if a != b), None)
+            if bad is None:
+                best = (res, None)
+                break
+            if best is None or bad > best[1]:
+                best = (res, bad)
+        res, bad = best
+        if bad is not None:
+            issue("plateau", bad + 1, "plateau stocké différent du rejeu de la signature")
+    else:
+        # ni situation ni partie_coups : signature seule, sens inconnu
+        res = replay(sig_moves, alternate(depart, len(sig_moves)), rows, cols)
+        oriented = False
+
+    if res["error"] is not None:
+        kind, ply, detail = res["error"]
+        issue(kind, ply, detail)
+
+    # résultat
+    expected = res["winner"] or ("D" if res["full"] else None)
+    stored = g.get("joueur_gagnant")
+    if stored != expected:
+        issue("gagnant", res["win_ply"], f"stocké {stored!r}, rejeu {expected!r}")
+
+    status = g.get("status")
+    if expected in ("R", "J") and status != "TERMINEE":
+        issue("statut", None, f"partie gagnée, status {status!r}")
+    elif expected is None and status in ("TERMINEE", "NULLE"):
+        issue("statut", None, f"partie non terminée, status {status!r}")
+
+    if expected in ("R", "J") and stored == expected:
+        cells = parse_line(g.get("ligne_gagnante"))
+        board = res["board"]
+        ok = line_ok(cells, board, expected)
+        if not ok and not oriented:
+            ok = line_ok([(r, cols - 1 - c) for r, c in cells], board, expected)
+        if not ok:
+            issue("ligne", res["win_ply"], f"ligne_gagnante {str(g.get('ligne_gagnante'))[:60]!r}")
+    return issues
+
+
+def validate_chunk(games):
+    """
+    Tâche worker : (parties vérifiées, anomalies).
+    """
+    issues = []
+    for g in games:
+        try:
+            issues.extend(validate_game(g))
+        except Exception as e:   # ligne illisible : anomalie, pas arrêt de l'audit
+            issues.append({"id_partie": g.get("id_partie"), "type": "erreur", "coup": None,
+                           "detail": f"{type(e).__name__}: {e}"})
+    return len(games), issues
+
+
+# =======================
+# LECTURE EN BASE
+# =======================
+GAMES_SQL = """
+SELECT p.id_partie, p.signature, p.joueur_depart, p.joueur_gagnant, p.ligne_gagnante, p.status,
+       COALESCE(p.rows, 9) AS rows, COALESCE(p.cols, 9) AS cols,
+       s.numeros, s.plateaux, s.joueurs{compact_cols}
+FROM partie p
+{situations}{compact_join}
+WHERE p.id_partie >= %(from_id)s
+ORDER BY p.id_partie
+{limit}
+"""
+
+# situations de chaque partie lues par l'index (id_partie, numero_coup) : un lot
+# --from-id / --limit ne lit que ses parties et le curseur rend la première ligne tout de suite
+SITUATIONS_LATERAL = """LEFT JOIN LATERAL (
+    SELECT array_agg(numero_coup ORDER BY numero_coup) AS numeros,
+           array_agg(plateau ORDER BY numero_coup) AS plateaux,
+           array_agg(joueur ORDER BY numero_coup) AS joueurs
+    FROM situation
+    WHERE situation.id_partie = p.id_partie
+) s ON true"""
+
+# sans cet index (une recherche par partie = un parcours de situation) : un seul
+# parcours, agrégé seulement pour les id du lot
+SITUATIONS_RANGE = """LEFT JOIN (
+    SELECT id_partie,
+           array_agg(numero_coup ORDER BY numero_coup) AS numeros,
+           array_agg(plateau ORDER BY numero_coup) AS plateaux,
+           array_agg(joueur ORDER BY numero_coup) AS joueurs
+    FROM situation
+    WHERE id_partie >= %(from_id)s AND (%(to_id)s::integer IS NULL OR id_partie <= %(to_id)s::integer)
+    GROUP BY id_partie
+) s ON s.id_partie = p.id_partie"""
+
+LAST_ID_SQL = """
+SELECT max(id_partie) AS to_id FROM (
+    SELECT id_partie FROM partie WHERE id_partie >= %(from_id)s ORDER BY id_partie LIMIT %(limit)s
+) lot
+"""
+
+
+def iter_games(from_id=0, limit=None, itersize=2000):
+    """
+    Parties en dict simples (envoyables aux processus), lues par un curseur serveur.
+    """
+    from psycopg2.extras import RealDictCursor
+
+    from db.db import connection
+
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('partie_coups') IS NOT NULL AS ok, "
+                        "to_regclass('situation_partie_coup') IS NOT NULL AS indexed")
+            found = cur.fetchone()
+            compact, indexed = found["ok"], found["indexed"]
+            to_id = None
+            if limit and not indexed:
+                cur.execute(LAST_ID_SQL, {"from_id": from_id, "limit": limit})
+                to_id = cur.fetchone()["to_id"]
+        sql = GAMES_SQL.format(
+            situations=SITUATIONS_LATERAL if indexed else SITUATIONS_RANGE,
+            compact_cols=", pc.coups, pc.joueurs AS coups_joueurs, pc.snapshots" if compact else "",
+            compact_join="\nLEFT JOIN partie_coups pc ON pc.id_partie = p.id_partie" if compact else "",
+            limit="LIMIT %(limit)s" if limit else "",
+        )
+        with conn.cursor(name="validate_games", cursor_factory=RealDictCursor) as cur:
+            cur.itersize = itersize
+            cur.execute(sql, {"from_id": from_id, "limit": limit, "to_id": to_id})
+            for row in cur:
+                g = dict(row)
+                if g.get("snapshots") is not None:
+                    g["snapshots"] = bytes(g["snapshots"])
+                yield g
+
+
+def _chunks(games, size):
+    chunk = []
+    for g in games:
+        chunk.append(g)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def validate_all(games, workers=None, chunk=500, on_issue=None, on_progress=None):
+    """
+    Vérifie les parties de l'itérable dans un pool de processus.
+    Retourne {"parties", "corrompues", "anomalies": Counter par type, "wall_s"}.
+    """
+    from parallel_search import make_pool
+
+    workers = workers or os.cpu_count() or 1
+    stats = {"parties": 0, "corrompues": 0, "anomalies": Counter(), "wall_s": 0.0}
+    t0 = time.perf_counter()
+
+    def collect(n, issues):
+        stats["parties"] += n
+        stats["corrompues"] += len({i["id_partie"] for i in issues})
+        for i in issues:
+            stats["anomalies"][i["type"]] += 1
+            if on_issue:
+                on_issue(i)
+        if on_progress:
+            on_progress(stats)
+
+    chunks = _chunks(games, chunk)
+    if workers == 1:
+        for c in chunks:
+            collect(*validate_chunk(c))
+    else:
+        with make_pool(workers) as pool:
+            # au plus 2 paquets en attente par processus : la lecture suit le rythme des workers
+            running = set()
+            for c in chunks:
+                running.add(pool.submit(validate_chunk, c))
+                if len(running) >= 2 * workers:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        collect(*fut.result())
+            for fut in running:
+                collect(*fut.result())
+    stats["wall_s"] = time.perf_counter() - t0
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit des parties en base (rejeu + comparaison)")
+    parser.add_argument("--workers", type=int, default=0, help="processus (0 = nombre de coeurs)")
+    parser.add_argument("--chunk", type=int, default=500, help="parties par tâche")
+    parser.add_argument("--from-id", type=int, default=0)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--out", default="rapport_parties.jsonl", help="anomalies, une ligne JSON chacune")
+    args = parser.parse_args()
+
+    last = [0.0]
+
+    def progress(stats):
+        now = time.perf_counter()
+        if now - last[0] >= 5:
+            last[0] = now
+            print(f"{stats['parties']} parties vérifiées, {stats['corrompues']} avec anomalies")
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        def write(i):
+            f.write(json.dumps(i, ensure_ascii=False) + "\n")
+
+        stats = validate_all(iter_games(args.from_id, args.limit), workers=args.workers or None,
+                             chunk=args.chunk, on_issue=write, on_progress=progress)
+
+    rate = stats["parties"] / stats["wall_s"] if stats["wall_s"] else 0.0
+    print(f"✅ {stats['parties']} parties en {stats['wall_s']:.1f}s ({rate:.0f}/s), "
+          f"{stats['corrompues']} avec anomalies -> {args.out}")
+    for kind, n in stats["anomalies"].most_common():
+        print(f"  {kind:<15} {n}")
+
+
+if __name__ == "__main__":
+    main()